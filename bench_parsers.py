@@ -0,0 +1,262 @@
+"""
+Micro-benchmark et équivalence des analyseurs de cartes
+Les trois implémentations historiques (boucle de replace de CardPredictor.count_total_cards,
+count_cards imbriqué de PredictionScheduler.check_card_distribution, regex à lookahead de
+SimplePredictor.verify_prediction) sont conservées ici comme références figées et comparées à
+game_parser.parse_game_message sur un corpus de formes de messages: couleurs emoji et simples,
+sélecteurs de variation, groupes malformés.
+
+Mesures: ns/message par implémentation et désaccords (groupes trouvés, cartes par groupe)
+avec game_parser. Un analyseur candidat plus rapide doit battre game_parser sans désaccord:
+    python bench_parsers.py --messages 20000 --output parsers.json
+    python bench_parsers.py --candidate mon_module:parse_rapide
+"""
+import argparse
+import importlib
+import json
+import random
+import re
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+from game_parser import parse_game_message
+from game_stream import EMOJI_SELECTOR, GameStream
+
+# (groupes trouvés, cartes du premier groupe, cartes du deuxième groupe)
+Counts = Tuple[bool, int, int]
+NO_GROUPS: Counts = (False, 0, 0)
+
+
+class Implementation(NamedTuple):
+    name: str
+    parse: Callable[[str], Counts]
+
+
+# --- Références historiques (copies fidèles, sans journalisation) ---
+
+LEGACY_GROUP_RE = re.compile(r"\(([^)]*)\)")
+LEGACY_SIMPLE_GROUP_PATTERNS = [
+    r'(\d+)\(([^)]+)\)\s*-\s*[✅🔰]*\s*(\d+)\(([^)]+)\)',
+    r'\(([^)]+)\)\s*-\s*[✅🔰]*\s*\(([^)]+)\)'
+]
+
+
+def legacy_count_total_cards(symbols_str: str) -> int:
+    """CardPredictor.count_total_cards: emoji remplacés par un marqueur, puis couleurs simples"""
+    emoji_symbols = ['♠️', '♥️', '♦️', '♣️']
+    simple_symbols = ['♠', '♥', '♦', '♣']
+    temp_str = symbols_str
+    emoji_count = 0
+    for emoji in emoji_symbols:
+        count = temp_str.count(emoji)
+        emoji_count += count
+        temp_str = temp_str.replace(emoji, 'X')
+    simple_count = 0
+    for symbol in simple_symbols:
+        simple_count += temp_str.count(symbol)
+    return emoji_count + simple_count
+
+
+def legacy_card_predictor(message: str) -> Counts:
+    groups = LEGACY_GROUP_RE.findall(message)
+    if len(groups) < 2:
+        return NO_GROUPS
+    return True, legacy_count_total_cards(groups[0]), legacy_count_total_cards(groups[1])
+
+
+def legacy_scheduler(message: str) -> Counts:
+    """PredictionScheduler.check_card_distribution: fonction de comptage redéfinie à chaque appel"""
+    groups = re.findall(r"\(([^)]*)\)", message)
+    if len(groups) < 2:
+        return NO_GROUPS
+
+    def count_cards(symbols_str: str) -> int:
+        emoji_symbols = ['♠️', '♥️', '♦️', '♣️']
+        simple_symbols = ['♠', '♥', '♦', '♣']
+        temp_str = symbols_str
+        emoji_count = 0
+        for emoji in emoji_symbols:
+            count = temp_str.count(emoji)
+            emoji_count += count
+            temp_str = temp_str.replace(emoji, 'X')
+        simple_count = 0
+        for symbol in simple_symbols:
+            simple_count += temp_str.count(symbol)
+        return emoji_count + simple_count
+
+    return True, count_cards(groups[0]), count_cards(groups[1])
+
+
+def legacy_simple_predictor(message: str) -> Counts:
+    """SimplePredictor.verify_prediction: groupes autour de « - », puis regex emoji / lookahead"""
+    first_group = second_group = None
+    for pattern in LEGACY_SIMPLE_GROUP_PATTERNS:
+        match = re.search(pattern, message)
+        if match:
+            groups = match.groups()
+            if len(groups) == 4:
+                first_group, second_group = groups[1], groups[3]
+            elif len(groups) == 2:
+                first_group, second_group = groups[0], groups[1]
+            break
+    if not first_group or not second_group:
+        return NO_GROUPS
+    cards_first = len(re.findall(r'[♠♥♦♣]️', first_group)) + len(re.findall(r'[♠♥♦♣](?!️)', first_group))
+    cards_second = len(re.findall(r'[♠♥♦♣]️', second_group)) + len(re.findall(r'[♠♥♦♣](?!️)', second_group))
+    return True, cards_first, cards_second
+
+
+def legacy_per_message(message: str) -> Counts:
+    """Coût historique d'un message: chaque prédicteur relançait sa propre analyse"""
+    legacy_simple_predictor(message)
+    legacy_scheduler(message)
+    return legacy_card_predictor(message)
+
+
+def counts_from_result(result: Any) -> Counts:
+    """Adapte un GameResult (ou tout objet de même interface) au format comparé"""
+    if result.first_group is None or result.second_group is None:
+        return NO_GROUPS
+    return True, result.first_count, result.second_count
+
+
+def current_parser(message: str) -> Counts:
+    return counts_from_result(parse_game_message(message))
+
+
+REFERENCE = Implementation('game_parser', current_parser)
+IMPLEMENTATIONS = [
+    REFERENCE,
+    Implementation('legacy CardPredictor.count_total_cards', legacy_card_predictor),
+    Implementation('legacy PredictionScheduler.count_cards', legacy_scheduler),
+    Implementation('legacy SimplePredictor lookahead', legacy_simple_predictor),
+    Implementation('legacy, les trois analyses par message', legacy_per_message),
+]
+
+
+# --- Corpus ---
+
+def _malformed_shapes(rng: random.Random, number: int) -> List[Tuple[str, str]]:
+    suit = rng.choice('♠♥♦♣')
+    other = rng.choice('♠♥♦♣')
+    VS, TS = EMOJI_SELECTOR, '\ufe0e'  # Sélecteurs de variation emoji / texte
+    return [
+        ('mixed_selectors', f"#N{number}. 3(A{suit}{VS}K{other}) - ✅ 5(9{suit}8{other}{VS})"),
+        ('double_selector', f"#N{number}. 3(A{suit}{VS}{VS}K{other}{VS}) - ✅ 5(9{suit}{VS}8{other}{VS})"),
+        ('text_selector', f"#N{number}. 3(A{suit}{TS}K{other}{TS}) - ✅ 5(9{suit}{TS}8{other}{TS})"),
+        ('ten_cards', f"#N{number}. 0(10{suit}{VS}10{other}{VS}) - ✅ 0(10{suit}K{other})"),
+        ('empty_group', f"#N{number}. 0() - ✅ 5(9{suit}8{other})"),
+        ('single_group', f"#N{number}. ✅ 5(9{suit}8{other})"),
+        ('three_groups', f"#N{number}. 3(A{suit}K{other}) - ✅ 5(9{suit}8{other}) (7{suit})"),
+        ('unclosed_group', f"#N{number}. 3(A{suit}K{other} - ✅ 5(9{suit}8{other})"),
+        ('spaced_group', f"#N{number}. 3( A{suit} K{other} ) - ✅ 5( 9{suit} 8{other} )"),
+        ('no_separator', f"#N{number}. 3(A{suit}K{other})✅5(9{suit}8{other})"),
+        ('heart_emoji', f"#N{number}. 3(A❤{VS}K{other}) - ✅ 5(9❤{VS}8{other})"),
+        ('white_suits', f"#N{number}. 3(A♡K♤) - ✅ 5(9♢8♧)"),
+        ('no_tag', f"#N{number}. 3(A{suit}K{other}) - 5(9{suit}8{other})"),
+        ('no_number', f"3(A{suit}K{other}) - ✅ 5(9{suit}8{other})"),
+        ('text_only', f"Jeu {number} en cours, résultats bientôt"),
+    ]
+
+
+def build_corpus(size: int, seed: int = 0, malformed_rate: float = 0.3) -> List[Tuple[str, str]]:
+    """(forme, texte): messages réalistes de game_stream et formes malformées, dans un ordre reproductible"""
+    rng = random.Random(seed)
+    stream = GameStream(seed=seed).events(size)
+    corpus = []
+    for number, event in enumerate(stream, start=1):
+        if len(corpus) >= size:
+            break
+        if rng.random() < malformed_rate:
+            corpus.append(rng.choice(_malformed_shapes(rng, number)))
+        else:
+            shape = 'stream_plain' if EMOJI_SELECTOR not in event.text else 'stream_emoji'
+            corpus.append((shape, event.text))
+    return corpus
+
+
+# --- Mesures ---
+
+def time_implementation(parse: Callable[[str], Counts], texts: List[str], repeat: int = 5) -> float:
+    """Meilleur temps sur repeat passes, en ns par message"""
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter_ns()
+        for text in texts:
+            parse(text)
+        elapsed = time.perf_counter_ns() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best / len(texts) if texts else 0.0
+
+
+def find_disagreements(parse: Callable[[str], Counts], corpus: List[Tuple[str, str]],
+                       reference: Callable[[str], Counts] = current_parser) -> Dict[str, Any]:
+    by_shape: Dict[str, int] = {}
+    examples = []
+    for shape, text in corpus:
+        expected, actual = reference(text), parse(text)
+        if expected != actual:
+            by_shape[shape] = by_shape.get(shape, 0) + 1
+            if len(examples) < 5 or not any(example['shape'] == shape for example in examples):
+                examples.append({'shape': shape, 'text': text, 'expected': expected, 'actual': actual})
+    return {'total': sum(by_shape.values()), 'by_shape': by_shape, 'examples': examples[:20]}
+
+
+def load_candidate(spec: str) -> Implementation:
+    """'module:fonction' retournant un GameResult (ou objet de même interface) pour un texte"""
+    module_name, _, function_name = spec.partition(':')
+    function = getattr(importlib.import_module(module_name), function_name or 'parse_game_message')
+    return Implementation(f"candidate {spec}", lambda text: counts_from_result(function(text)))
+
+
+def run(corpus: List[Tuple[str, str]], implementations: List[Implementation], repeat: int = 5) -> Dict[str, Any]:
+    texts = [text for _, text in corpus]
+    shapes: Dict[str, int] = {}
+    for shape, _ in corpus:
+        shapes[shape] = shapes.get(shape, 0) + 1
+    results = []
+    for implementation in implementations:
+        results.append({
+            'name': implementation.name,
+            'ns_per_message': round(time_implementation(implementation.parse, texts, repeat), 1),
+            'disagreements': find_disagreements(implementation.parse, corpus)
+        })
+    reference_ns = results[0]['ns_per_message']
+    for result in results:
+        result['vs_game_parser'] = round(result['ns_per_message'] / reference_ns, 2) if reference_ns else None
+    return {'messages': len(corpus), 'shapes': shapes, 'repeat': repeat, 'implementations': results}
+
+
+def print_report(results: Dict[str, Any]):
+    print(f"📊 {results['messages']} messages, {len(results['shapes'])} formes")
+    for result in results['implementations']:
+        disagreements = result['disagreements']
+        flag = '✅' if disagreements['total'] == 0 else '⚠️'
+        print(f"{flag} {result['name']:45s} {result['ns_per_message']:>10.1f} ns/message "
+              f"(x{result['vs_game_parser']}) désaccords: {disagreements['total']}")
+        for shape, count in sorted(disagreements['by_shape'].items()):
+            print(f"      {shape:20s} {count}")
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description="Micro-benchmark et équivalence des analyseurs de cartes")
+    parser.add_argument('--messages', type=int, default=20000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--malformed-rate', type=float, default=0.3)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--candidate', action='append', default=[], help="module:fonction à comparer")
+    parser.add_argument('--output', help="Résultats JSON")
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.messages, args.seed, args.malformed_rate)
+    implementations = IMPLEMENTATIONS + [load_candidate(spec) for spec in args.candidate]
+    results = run(corpus, implementations, args.repeat)
+    print_report(results)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"✅ Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,416 @@
+"""
+Banc d'essai hors ligne: rejoue un transcript du canal stats dans le vrai pipeline
+handle_messages → file de travail → SimplePredictor, puis CardPredictor et
+PredictionScheduler.verify_prediction_from_message, avec un client Telegram factice
+qui enregistre envois et modifications.
+
+Mesures: débit (messages/s), p50/p99 par étape, allocations, octets écrits sur disque.
+Résultats en JSON, comparables entre versions (--compare).
+
+Usage:
+    python bench_replay.py --games 2000 --output bench.json
+    python bench_replay.py --transcript stat_channel.jsonl --compare bench.json
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib
+import json
+import logging
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from telethon.tl.types import InputPeerChannel, InputPeerChat, InputPeerUser, PeerChannel, PeerChat
+from telethon.utils import get_peer_id, resolve_id
+
+from game_stream import GameStream
+
+REPO_DIR = os.path.dirname(os.path.abspath(__file__))
+UNLIMITED_RATE = 1e9
+
+
+class FakeMessage:
+    """Message Telegram minimal: attributs lus par les gestionnaires et la file d'envoi"""
+    __slots__ = ("id", "chat_id", "message", "edit_date")
+
+    def __init__(self, message_id: int, chat_id: int, text: str, edit_date: Optional[datetime] = None):
+        self.id = message_id
+        self.chat_id = chat_id
+        self.message = text
+        self.edit_date = edit_date
+
+
+class FakeEvent:
+    """Événement NewMessage / MessageEdited tel que lu par handle_messages"""
+    __slots__ = ("chat_id", "message")
+
+    def __init__(self, message: FakeMessage):
+        self.chat_id = message.chat_id
+        self.message = message
+
+
+class FakeTelegramClient:
+    """Remplaçant en mémoire de TelegramClient: enregistre envois et modifications, sans réseau
+
+    Les entités résolues sont de vrais InputPeer Telethon (non hachables), comme en production:
+    la file d'envoi reçoit les mêmes types que face à Telegram.
+    """
+
+    def __init__(self):
+        self.sent: List[FakeMessage] = []
+        self.edited: List[tuple] = []
+        self._ids: Dict[Any, int] = {}
+
+    def _next_id(self, chat_id: int) -> int:
+        self._ids[chat_id] = self._ids.get(chat_id, 0) + 1
+        return self._ids[chat_id]
+
+    async def send_message(self, chat: Any, text: str, **kwargs) -> FakeMessage:
+        chat_id = get_peer_id(chat)
+        message = FakeMessage(self._next_id(chat_id), chat_id, text)
+        self.sent.append(message)
+        return message
+
+    async def edit_message(self, chat: Any, message_id: int, text: str, **kwargs) -> FakeMessage:
+        chat_id = get_peer_id(chat)
+        self.edited.append((chat_id, message_id, text))
+        return FakeMessage(message_id, chat_id, text, edit_date=datetime.now())
+
+    async def get_entity(self, chat: Any) -> Any:
+        return await self.get_input_entity(chat)
+
+    async def get_input_entity(self, chat: Any) -> Any:
+        real_id, peer_type = resolve_id(get_peer_id(chat))
+        if peer_type is PeerChannel:
+            return InputPeerChannel(real_id, 0)
+        if peer_type is PeerChat:
+            return InputPeerChat(real_id)
+        return InputPeerUser(real_id, 0)
+
+    async def get_messages(self, chat: Any, *args, **kwargs) -> list:
+        return []
+
+    def get_stats(self) -> Dict[str, int]:
+        return {'sent': len(self.sent), 'edited': len(self.edited)}
+
+
+class StageTimer:
+    """Durées brutes par étape (ns) pour les percentiles; enveloppe fonctions et coroutines"""
+
+    def __init__(self):
+        self.samples: Dict[str, List[int]] = {}
+
+    def record(self, stage: str, elapsed_ns: int):
+        self.samples.setdefault(stage, []).append(elapsed_ns)
+
+    def wrap(self, stage: str, func: Callable) -> Callable:
+        if asyncio.iscoroutinefunction(func):
+            async def timed_async(*args, **kwargs):
+                started = time.perf_counter_ns()
+                try:
+                    return await func(*args, **kwargs)
+                finally:
+                    self.record(stage, time.perf_counter_ns() - started)
+            return timed_async
+
+        def timed(*args, **kwargs):
+            started = time.perf_counter_ns()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.record(stage, time.perf_counter_ns() - started)
+        return timed
+
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        return {stage: summarize(samples) for stage, samples in sorted(self.samples.items())}
+
+
+def percentile(sorted_samples: List[int], fraction: float) -> int:
+    index = min(len(sorted_samples) - 1, max(0, int(round(fraction * (len(sorted_samples) - 1)))))
+    return sorted_samples[index]
+
+
+def summarize(samples: List[int]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        'count': len(ordered),
+        'mean_us': round(sum(ordered) / len(ordered) / 1000, 3) if ordered else 0.0,
+        'p50_us': round(percentile(ordered, 0.50) / 1000, 3) if ordered else 0.0,
+        'p99_us': round(percentile(ordered, 0.99) / 1000, 3) if ordered else 0.0,
+        'max_us': round(ordered[-1] / 1000, 3) if ordered else 0.0
+    }
+
+
+class _NullWriter:
+    """Sortie standard muette sans appel système: les print() ne comptent pas dans les octets écrits"""
+
+    def write(self, text: str) -> int:
+        return len(text)
+
+    def flush(self):
+        pass
+
+
+def read_io_bytes() -> Optional[int]:
+    """Octets passés à write() par le processus (Linux, /proc/self/io), threads compris"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('wchar:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def directory_size(path: str) -> int:
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.path.getsize(os.path.join(root, name))
+            except OSError:
+                pass
+    return total
+
+
+# --- Transcripts ---
+
+def load_transcript(path: str) -> List[Dict[str, Any]]:
+    """Transcript JSON lines: {"id": ID du message, "text": texte, "edit": true pour une modification,
+    "edit_date": date ISO optionnelle}"""
+    entries = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                entry = json.loads(line)
+                entries.append({'id': int(entry['id']), 'text': entry['text'], 'edit': bool(entry.get('edit')),
+                                'edit_date': entry.get('edit_date')})
+    return entries
+
+
+def synthetic_transcript(games: int, seed: int = 0) -> List[Dict[str, Any]]:
+    """Transcript synthétique (game_stream): modifications ⏰/🕐, rafales, désordre, trous de numérotation"""
+    return GameStream(seed=seed).transcript(games)
+
+
+# --- Banc d'essai ---
+
+def import_bot_module(workdir: str):
+    """Importe le module principal dans un répertoire de travail jetable (données, session, config)
+
+    Le TelegramClient construit à l'import exige API_ID/API_HASH: identifiants factices si absents,
+    le client n'est jamais connecté (remplacé par FakeTelegramClient via use_client)
+    """
+    os.chdir(workdir)
+    os.environ.setdefault('SESSION_NAME', os.path.join(workdir, 'bench_session'))
+    for name, dummy in (('API_ID', '1'), ('API_HASH', 'bench')):
+        if not os.environ.get(name):
+            os.environ[name] = dummy
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    return importlib.import_module('deployer_v2024_render_main')
+
+
+async def replay_pipeline(bot, entries: List[Dict[str, Any]], timer: StageTimer) -> Dict[str, Any]:
+    """Rejoue le transcript via handle_messages et la file de travail du module principal"""
+    from outbound import TokenBucket
+
+    fake = FakeTelegramClient()
+    bot.use_client(fake)
+    bot.load_config()
+    bot.configure_shards()
+    channel = bot.detected_stat_channel
+    for shard in bot.shard_router:
+        shard.live.set()  # Pas de rattrapage hors ligne
+
+    # Étapes chronométrées: réception, traitement complet, décisions du SimplePredictor
+    predictor = bot.primary_shard.predictor
+    predictor.should_predict = timer.wrap('simple_predictor.should_predict', predictor.should_predict)
+    predictor.verify_prediction = timer.wrap('simple_predictor.verify_prediction', predictor.verify_prediction)
+    predictor.persist = timer.wrap('simple_predictor.persist', predictor.persist)
+    process = bot.work_queue.process
+
+    async def timed_process(item):
+        started = time.perf_counter_ns()
+        try:
+            return await process(item)
+        finally:
+            now = time.perf_counter_ns()
+            timer.record('process_queued_message', now - started)
+            timer.record('end_to_end', int((time.monotonic() - item.received_at) * 1e9))
+    bot.work_queue.process = timed_process
+    handle = timer.wrap('handle_messages', bot.handle_messages)
+
+    # Pas de limite de débit face au client factice: seul le coût du traitement est mesuré
+    bot.outbound.global_bucket = TokenBucket(UNLIMITED_RATE, UNLIMITED_RATE)
+    bot.outbound.chat_rate = bot.outbound.chat_burst = UNLIMITED_RATE
+    bot.persistence_writer.start()
+    bot.outbound.start()
+    bot.work_queue.start()
+    started = time.perf_counter()
+    for entry in entries:
+        edit_date = entry.get('edit_date')
+        if isinstance(edit_date, str):
+            edit_date = datetime.fromisoformat(edit_date)
+        elif edit_date is None and entry['edit']:
+            edit_date = datetime.now()
+        await handle(FakeEvent(FakeMessage(entry['id'], channel, entry['text'], edit_date)))
+        # Contre-pression: laisser les travailleurs avancer plutôt que d'abandonner des messages
+        while bot.work_queue.depth >= bot.work_queue.maxsize // (2 * bot.work_queue.workers):
+            await asyncio.sleep(0)
+    await bot.work_queue.stop(timeout=600)
+    elapsed = time.perf_counter() - started
+
+    for shard in bot.shard_router:
+        shard.edits.flush()
+    await bot.outbound.stop(timeout=600)
+    await bot.persistence_writer.flush()
+    await bot.persistence_writer.stop()
+    return {
+        'seconds': round(elapsed, 4),
+        'messages_per_s': round(len(entries) / elapsed, 1) if elapsed else 0.0,
+        'work_queue': bot.work_queue.get_stats(),
+        'edit_tracker': bot.edit_tracker.get_stats(),
+        'telegram': fake.get_stats(),
+        'predictions': predictor.get_statistics()
+    }
+
+
+def replay_card_predictor(entries: List[Dict[str, Any]], timer: StageTimer) -> Dict[str, Any]:
+    """CardPredictor et PredictionScheduler.verify_prediction_from_message sur le même transcript"""
+    from predictor import CardPredictor
+    from scheduler import PredictionScheduler
+
+    fake = FakeTelegramClient()
+    card_predictor = CardPredictor()
+    scheduler = PredictionScheduler(fake, card_predictor, 0, 0)
+    should_predict = timer.wrap('card_predictor.should_predict', card_predictor.should_predict)
+    verify = timer.wrap('card_predictor.verify_prediction', card_predictor.verify_prediction)
+    verify_from_message = timer.wrap('scheduler.verify_prediction_from_message',
+                                     scheduler.verify_prediction_from_message)
+    started = time.perf_counter()
+    for entry in entries:
+        should_predict(entry['text'])
+        verify(entry['text'])
+        verify_from_message(entry['text'], sorted(card_predictor.pending))
+    elapsed = time.perf_counter() - started
+    return {
+        'seconds': round(elapsed, 4),
+        'messages_per_s': round(len(entries) / elapsed, 1) if elapsed else 0.0,
+        'predictions': card_predictor.get_statistics(),
+        'prediction_status_size': len(card_predictor.prediction_status),
+        'processed_messages_size': len(card_predictor.processed_messages)
+    }
+
+
+def run(entries: List[Dict[str, Any]], trace_alloc: bool = False, log_level: str = 'WARNING') -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix='bench_replay_')
+    previous_dir = os.getcwd()
+    timer = StageTimer()
+    try:
+        with contextlib.redirect_stdout(_NullWriter()):
+            bot = import_bot_module(workdir)
+            logging.getLogger(bot.__name__).setLevel(log_level)
+            if trace_alloc:
+                tracemalloc.start()
+            blocks_before = sys.getallocatedblocks()
+            io_before = read_io_bytes()
+            pipeline = asyncio.run(replay_pipeline(bot, entries, timer))
+            io_pipeline = read_io_bytes()
+            card = replay_card_predictor(entries, timer)
+            io_after = read_io_bytes()
+            allocations = {'allocated_blocks_delta': sys.getallocatedblocks() - blocks_before}
+            if trace_alloc:
+                current, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                allocations.update({'traced_current_bytes': current, 'traced_peak_bytes': peak})
+        disk = {'data_dir_bytes': directory_size(workdir)}
+        if io_before is not None:
+            disk.update({'pipeline_write_bytes': io_pipeline - io_before,
+                         'card_predictor_write_bytes': io_after - io_pipeline})
+        return {
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'messages': len(entries),
+            'trace_alloc': trace_alloc,
+            'pipeline': pipeline,
+            'card_predictor': card,
+            'stages': timer.summary(),
+            'allocations': allocations,
+            'disk': disk,
+            'workdir': workdir
+        }
+    finally:
+        os.chdir(previous_dir)
+
+
+def compare(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    """Lignes de comparaison p50/p99 et débit (ratio actuel / référence)"""
+    lines = []
+    for section in ('pipeline', 'card_predictor'):
+        old, new = baseline.get(section, {}).get('messages_per_s'), current[section]['messages_per_s']
+        if old:
+            lines.append(f"{section:45s} débit {old:>12.1f} → {new:>12.1f} msg/s (x{new / old:.2f})")
+    for stage, stats in current['stages'].items():
+        old = baseline.get('stages', {}).get(stage)
+        if not old:
+            continue
+        for key in ('p50_us', 'p99_us'):
+            if old[key]:
+                lines.append(f"{stage:45s} {key} {old[key]:>10.3f} → {stats[key]:>10.3f} µs (x{stats[key] / old[key]:.2f})")
+    return lines
+
+
+def print_report(results: Dict[str, Any]):
+    print(f"📊 {results['messages']} messages rejoués")
+    for section in ('pipeline', 'card_predictor'):
+        print(f"⚡ {section}: {results[section]['messages_per_s']} msg/s ({results[section]['seconds']}s)")
+    for stage, stats in results['stages'].items():
+        print(f"⏱️ {stage:45s} p50 {stats['p50_us']:>10.3f} µs  p99 {stats['p99_us']:>10.3f} µs  (n={stats['count']})")
+    print(f"🧠 Allocations: {results['allocations']}")
+    print(f"💾 Disque: {results['disk']}")
+    print(f"📨 Telegram factice: {results['pipeline']['telegram']}")
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description="Banc d'essai de rejeu du canal stats")
+    parser.add_argument('--transcript', help="Transcript JSON lines (id, text, edit); synthétique sinon")
+    parser.add_argument('--games', type=int, default=2000, help="Jeux du transcript synthétique")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace-alloc', action='store_true', help="tracemalloc (ralentit les mesures de temps)")
+    parser.add_argument('--log-level', default='WARNING', help="Niveau des journaux du module principal")
+    parser.add_argument('--output', help="Fichier JSON des résultats")
+    parser.add_argument('--compare', help="Résultats JSON de référence")
+    args = parser.parse_args(argv)
+
+    entries = load_transcript(args.transcript) if args.transcript else synthetic_transcript(args.games, args.seed)
+    baseline = None
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+    if args.output:
+        args.output = os.path.abspath(args.output)
+
+    results = run(entries, trace_alloc=args.trace_alloc, log_level=args.log_level)
+    results['source'] = args.transcript or f"synthetic(games={args.games}, seed={args.seed})"
+    print_report(results)
+    if baseline is not None:
+        print("🔁 Comparaison avec la référence:")
+        for line in compare(results, baseline):
+            print(f"   {line}")
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+        print(f"✅ Résultats écrits dans {args.output}")
+
+
+if __name__ == "__main__":
+    main()
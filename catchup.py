@@ -0,0 +1,93 @@
+"""
+Rattrapage au redémarrage des messages du canal stats publiés pendant l'arrêt
+Le curseur (dernier message traité) est persisté; au démarrage les messages suivants sont relus
+par lots d'identifiants puis rejoués dans l'ordre avant de passer aux événements en direct
+"""
+import json
+import os
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+DEFAULT_BATCH_SIZE = 100  # Limite Telegram par requête de messages
+DEFAULT_CATCHUP_LIMIT = 5000  # Messages relus au plus par rattrapage
+EMPTY_BATCHES_TO_STOP = 2  # Lots entièrement vides consécutifs marquant la fin de l'historique
+
+
+class CatchupCursor:
+    """Dernier message traité du canal stats, écrit de façon différée par l'écrivain de fond"""
+
+    def __init__(self, path: str, writer=None):
+        self.path = path
+        self.writer = writer
+        self.channel_id: Optional[int] = None
+        self.last_message_id: Optional[int] = None
+        self.last_game_number: Optional[int] = None
+        self._load()
+
+    def _load(self):
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.channel_id = data.get('channel_id')
+                self.last_message_id = data.get('last_message_id')
+                self.last_game_number = data.get('last_game_number')
+        except Exception as e:
+            print(f"❌ Erreur chargement curseur {self.path}: {e}")
+
+    def for_channel(self, channel_id: int) -> Optional[int]:
+        """Dernier message traité de ce canal (None si le canal configuré a changé)"""
+        return self.last_message_id if self.channel_id == channel_id else None
+
+    def advance(self, channel_id: int, message_id: int, game_number: Optional[int] = None):
+        """Avance le curseur (jamais en arrière: les modifications de messages anciens ne le déplacent pas)"""
+        if self.channel_id == channel_id and self.last_message_id is not None and message_id <= self.last_message_id:
+            return
+        self.channel_id = channel_id
+        self.last_message_id = message_id
+        if game_number is not None:
+            self.last_game_number = game_number
+        if self.writer is not None:
+            # Clé propre à chaque curseur: deux shards ne s'écrasent pas dans la même fenêtre
+            self.writer.mark_dirty(f'catchup_cursor:{self.path}', self.to_dict, self._write)
+        else:
+            self._write(self.to_dict())
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'channel_id': self.channel_id,
+            'last_message_id': self.last_message_id,
+            'last_game_number': self.last_game_number
+        }
+
+    def _write(self, data: Dict[str, Any]):
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            print(f"❌ Erreur écriture curseur {self.path}: {e}")
+
+
+async def iter_missed_messages(client, channel: Any, after_id: int, limit: int = DEFAULT_CATCHUP_LIMIT,
+                               batch_size: int = DEFAULT_BATCH_SIZE) -> AsyncIterator[List[Any]]:
+    """Lots ordonnés des messages d'identifiant > after_id
+
+    La lecture se fait par plages d'identifiants (get_messages(ids=...)), autorisée aussi aux comptes bot
+    qui ne peuvent pas parcourir l'historique; les identifiants supprimés reviennent vides et sont ignorés.
+    """
+    next_id = after_id + 1
+    fetched = 0
+    empty_batches = 0
+    while fetched < limit and empty_batches < EMPTY_BATCHES_TO_STOP:
+        ids = list(range(next_id, next_id + min(batch_size, limit - fetched)))
+        next_id = ids[-1] + 1
+        messages = [message for message in await client.get_messages(channel, ids=ids)
+                    if message is not None and getattr(message, 'message', None) is not None]
+        if not messages:
+            empty_batches += 1
+            continue
+        empty_batches = 0
+        fetched += len(messages)
+        yield messages
@@ -6,17 +6,36 @@ Logique des As optimisée : 1 As premier groupe + 0 As deuxième groupe
 """
 
 import os
+import io
 import asyncio
-import re
+import contextvars
 import logging
 import sys
 import json
-import yaml
 import time
 from datetime import datetime, timedelta
 from telethon import TelegramClient, events
 from aiohttp import web
 
+from catchup import DEFAULT_CATCHUP_LIMIT, CatchupCursor, iter_missed_messages
+from edit_tracker import EditTracker
+from entity_cache import EntityCache
+from game_parser import as_game_result, count_aces, extract_suits, parse_game_message
+from game_state import GameStateMachine, KeyedLocks
+from message_registry import EditCoalescer, PredictionMessageRegistry
+from metrics import MetricsRegistry, monitor_loop_lag
+from outbound import PRIORITY_ADMIN, OutboundQueue
+from pending_index import PendingPredictionIndex
+from prediction_counters import PredictionCounters
+from persistence import PersistenceWriter
+from profiling import DEFAULT_TOP_N, DEFAULT_WINDOW_SECONDS, RuntimeProfiler
+from prediction_journal import PredictionJournal
+from retention import DEFAULT_GAME_WINDOW, DEFAULT_LOG_SIZE, PredictionArchive, RetentionPolicy, ring_buffer
+from session_store import DEFAULT_SESSION_NAME, StartupTimer, cleanup_stale_sessions, make_session
+from shards import ShardRouter, parse_channel_pairs
+from work_queue import DEFAULT_QUEUE_SIZE, DEFAULT_WORKERS, MessageWorkQueue, QueuedMessage
+from sqlite_manager import SQLitePredictionStore
+
 # Configuration des logs optimisée pour Render.com
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +44,17 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Rattrapage en cours dans la tâche courante: ses journaux détaillés sont écartés sans toucher
+# au niveau du logger partagé (les événements en direct et les autres tables continuent de journaliser)
+replaying = contextvars.ContextVar('replaying', default=False)
+
+class ReplayQuietFilter(logging.Filter):
+    """Écarte les journaux sous WARNING émis depuis un rattrapage"""
+    def filter(self, record):
+        return record.levelno >= logging.WARNING or not replaying.get()
+
+logger.addFilter(ReplayQuietFilter())
+
 # Variables d'environnement
 API_ID = int(os.getenv('API_ID', '0'))
 API_HASH = os.getenv('API_HASH', '')
@@ -32,6 +62,38 @@ BOT_TOKEN = os.getenv('BOT_TOKEN', '')
 ADMIN_ID = int(os.getenv('ADMIN_ID', '0'))
 PORT = int(os.getenv('PORT', '10000'))
 prediction_interval = int(os.getenv('PREDICTION_INTERVAL', '1'))
+RETENTION_GAMES = int(os.getenv('RETENTION_GAMES', str(DEFAULT_GAME_WINDOW)))
+RETENTION_LOG_SIZE = int(os.getenv('RETENTION_LOG_SIZE', str(DEFAULT_LOG_SIZE)))
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'yaml')  # 'yaml' ou 'sqlite'
+WORKERS = int(os.getenv('WORKERS', str(DEFAULT_WORKERS)))
+WORK_QUEUE_SIZE = int(os.getenv('WORK_QUEUE_SIZE', str(DEFAULT_QUEUE_SIZE)))
+CATCHUP_LIMIT = int(os.getenv('CATCHUP_LIMIT', str(DEFAULT_CATCHUP_LIMIT)))
+CHANNEL_PAIRS = os.getenv('CHANNEL_PAIRS', '')  # Tables supplémentaires: 'stat:display,stat:display'
+SESSION_NAME = os.getenv('SESSION_NAME', DEFAULT_SESSION_NAME)
+SESSION_STRING = os.getenv('SESSION_STRING', '')
+PROFILE_TOKEN = os.getenv('PROFILE_TOKEN', '')  # Active l'endpoint HTTP /profile
+
+# Temps de démarrage mesuré jusqu'au premier message traité
+startup_timer = StartupTimer()
+
+# Métriques exposées sur /metrics (format texte Prometheus)
+metrics = MetricsRegistry()
+MESSAGES_RECEIVED = metrics.counter('bot_messages_received_total', 'Messages des canaux stats suivis reçus')
+MESSAGES_IGNORED = metrics.counter('bot_messages_ignored_total', 'Messages écartés avant traitement', ['reason'])
+PREDICTIONS_TRIGGERED = metrics.counter('bot_predictions_triggered_total', 'Prédictions créées')
+PREDICTIONS_VERIFIED = metrics.counter('bot_predictions_verified_total', 'Prédictions réussies par décalage', ['offset'])
+PREDICTIONS_EXPIRED = metrics.counter('bot_predictions_expired_total', 'Prédictions en échec (jeu prédit+3 dépassé)')
+PARSE_SECONDS = metrics.histogram('bot_parse_seconds', 'Durée de l\'analyse d\'un message')
+DECIDE_SECONDS = metrics.histogram('bot_decide_seconds', 'Durée du déclenchement et de la vérification')
+PERSIST_SECONDS = metrics.histogram('bot_persist_seconds', 'Durée de la journalisation d\'une transition')
+SEND_SECONDS = metrics.histogram('bot_send_seconds', 'Durée d\'un appel d\'envoi Telegram réussi')
+BROADCAST_SECONDS = metrics.histogram('bot_message_to_broadcast_seconds',
+                                      'Réception du message déclencheur → prédiction envoyée')
+LOOP_LAG = metrics.gauge('bot_event_loop_lag_seconds', 'Retard de réveil de la boucle asyncio')
+VERIFIED_OFFSETS = {'✅0️⃣': '0', '✅1️⃣': '1', '✅2️⃣': '2', '✅3️⃣': '3'}
+
+# Minuteurs d'étapes toujours actifs + cProfile à la demande (/profile on|off|dump)
+profiler = RuntimeProfiler()
 
 # Variables d'état globales - Configuration automatique
 detected_stat_channel = -1002646551216  # Canal stats pré-configuré
@@ -40,112 +102,256 @@ prediction_status = {}
 last_predictions = []
 status_log = []
 
-# Client Telegram
-session_name = f'bot_session_{int(time.time())}'
-client = TelegramClient(session_name, API_ID, API_HASH)
+# Client Telegram: session stable réutilisée entre les redémarrages (pas de nouvelle autorisation)
+client = TelegramClient(make_session(SESSION_NAME, SESSION_STRING), API_ID, API_HASH)
+
+# File d'envoi unique: débit limité, FloodWait géré, prédictions avant réponses admin
+outbound = OutboundQueue(client, observe_send=lambda seconds: profiler.record('send', seconds, SEND_SECONDS))
+
+# Entités des canaux résolues une fois puis gardées en cache (invalidées par /set_stat et /set_display)
+entity_cache = EntityCache(client)
+
+def use_client(new_client):
+    """Remplace le client Telegram (banc d'essai hors ligne: client factice qui enregistre les envois)"""
+    global client
+    client = new_client
+    outbound.client = new_client
+    entity_cache.client = new_client
+
+async def respond(event, text):
+    """Réponse à une commande admin, en priorité basse dans la file d'envoi"""
+    return await outbound.send_message(event.chat_id, text, priority=PRIORITY_ADMIN)
 
 # Gestionnaire YAML autonome
 class SimpleYAMLManager:
-    def __init__(self):
-        self.data_dir = "data"
+    """Snapshot YAML des prédictions + journal en ajout seul des transitions"""
+    def __init__(self, writer=None, data_dir="data"):
+        self.data_dir = data_dir
         if not os.path.exists(self.data_dir):
             os.makedirs(self.data_dir)
+        # Écritures différées et regroupées hors de la boucle asyncio par l'écrivain de fond
+        self.writer = writer
+        self.journal = PredictionJournal(f"{self.data_dir}/predictions.yaml", autoflush=writer is None)
+        self._pending_snapshot = None
+    
+    @property
+    def needs_compaction(self):
+        return self.journal.should_compact
+    
+    def record(self, op, counters=None, **fields):
+        """Journalise une transition (created, status, message, evicted): un seul petit ajout
+        
+        Les compteurs ne sont pas journalisés: le rejeu les recalcule à partir du snapshot.
+        """
+        self.journal.append(op, **fields)
+        self._mark_dirty()
     
-    def save_predictions(self, predictions):
+    def save_predictions(self, predictions, counters=None, messages=None):
+        """Compactage: réécrit le snapshot complet et vide le journal"""
         try:
-            with open(f"{self.data_dir}/predictions.yaml", 'w') as f:
-                yaml.dump(predictions, f, default_flow_style=False)
+            data = {
+                'predictions': dict(predictions),
+                'counters': counters.to_dict() if counters else None,
+                'messages': messages.to_dict() if messages else {},
+                # Les entrées de journal antérieures sont contenues dans ce snapshot (rejeu idempotent)
+                'journal_seq': self.journal.seq
+            }
+            if self.writer is None:
+                self.journal.compact(data)
+                return
+            # Le snapshot capturé contient déjà les lignes en tampon
+            self.journal.discard_buffer()
+            self._pending_snapshot = data
+            self._mark_dirty()
         except Exception as e:
             logger.error(f"Erreur sauvegarde prédictions: {e}")
     
-    def load_predictions(self):
+    def _mark_dirty(self):
+        if self.writer is not None:
+            self.writer.mark_dirty(f'predictions:{self.data_dir}', self._drain, self._write)
+    
+    def _drain(self):
+        """Capture sur la boucle asyncio: (snapshot éventuel, lignes de journal postérieures)"""
+        snapshot, self._pending_snapshot = self._pending_snapshot, None
+        return snapshot, self.journal.drain()
+    
+    def _write(self, batch):
+        """Écriture dans le thread: snapshot d'abord (il vide le journal), puis les nouvelles lignes"""
+        snapshot, lines = batch
+        if snapshot is not None:
+            self.journal.write_snapshot(snapshot)
+        self.journal.write_lines(lines)
+    
+    def load_state(self):
+        """Charge (prédictions, compteurs); compteurs à None pour l'ancien format sans compteurs"""
         try:
-            if os.path.exists(f"{self.data_dir}/predictions.yaml"):
-                with open(f"{self.data_dir}/predictions.yaml", 'r') as f:
-                    return yaml.safe_load(f) or {}
+            data = self.journal.load_snapshot(default={})
+            if 'predictions' in data:
+                return data.get('predictions') or {}, data.get('counters')
+            return data, None
         except Exception as e:
             logger.error(f"Erreur chargement prédictions: {e}")
-        return {}
+        return {}, None
+    
+    def load_messages(self):
+        """Emplacements des messages de prédiction {numéro: {chat_id, message_id}} du snapshot"""
+        data = self.journal.load_snapshot(default={})
+        return data.get('messages') or {} if isinstance(data, dict) else {}
+    
+    def load_journal(self):
+        """Transitions postérieures au snapshot, à rejouer dans l'ordre"""
+        data = self.journal.load_snapshot(default={})
+        return self.journal.replay(after_seq=data.get('journal_seq') if isinstance(data, dict) else None)
+    
+    def load_predictions(self):
+        return self.load_state()[0]
+
+persistence_writer = PersistenceWriter(profiler=profiler)
+
+def make_store(data_dir="data"):
+    """Persistance des prédictions d'une table de jeu, selon STORAGE_BACKEND"""
+    if STORAGE_BACKEND == 'sqlite':
+        return SQLitePredictionStore(data_dir=data_dir, writer=persistence_writer)
+    return SimpleYAMLManager(writer=persistence_writer, data_dir=data_dir)
 
-yaml_manager = SimpleYAMLManager()
+yaml_manager = make_store()
 
 # Prédicteur de cartes autonome
 class SimplePredictor:
-    def __init__(self):
-        self.prediction_status = yaml_manager.load_predictions()
-        self.last_predictions = []
-        self.status_log = []
-        self.suits_mapping = {
-            '♠️': '♠', '♥️': '♥', '♦️': '♦', '♣️': '♣',
-            '♠': '♠', '♥': '♥', '♦': '♦', '♣': '♣'
-        }
+    def __init__(self, store=None):
+        self.store = store or yaml_manager
+        self.prediction_status, counters = self.store.load_state()
+        self.pending = PendingPredictionIndex(horizon=3)
+        self.pending.rebuild(self.prediction_status)
+        if counters:
+            self.counters = PredictionCounters.from_dict(counters)
+        else:
+            # Ancien format sans compteurs: recalcul unique
+            self.counters = PredictionCounters()
+            self.counters.rebuild(self.prediction_status)
+        # Messages diffusés: numéro de jeu → (chat_id, message_id) pour les mises à jour de statut
+        self.messages = PredictionMessageRegistry(self.store.load_messages())
+        self.last_predictions = ring_buffer(maxlen=RETENTION_LOG_SIZE)
+        self.status_log = ring_buffer(maxlen=RETENTION_LOG_SIZE)
+        # Prédictions réglées au-delà des N derniers jeux: archivées puis retirées de la mémoire
+        self.retention = RetentionPolicy(
+            RETENTION_GAMES, PredictionArchive(f"{self.store.data_dir}/archive/predictions_archive.yaml")
+        )
+        # Rejouer le journal puis repartir d'un snapshot compact
+        journal = self.store.load_journal()
+        for entry in journal:
+            self.apply_journal_entry(entry)
+        if journal:
+            logger.info(f"📒 Journal rejoué: {len(journal)} transitions")
+            self.store.save_predictions(self.prediction_status, self.counters, self.messages)
+    
+    def apply_journal_entry(self, entry):
+        """Applique une transition journalisée, postérieure au snapshot (voir SimpleYAMLManager.load_journal)"""
+        op = entry.get('op')
+        if op == 'created':
+            if entry['game_number'] not in self.prediction_status:
+                self.set_prediction_status(entry['game_number'], '⌛')
+                self.last_predictions.append((entry['game_number'], entry.get('suits')))
+        elif op == 'status':
+            if self.prediction_status.get(entry['game_number']) != entry['status']:
+                self.set_prediction_status(entry['game_number'], entry['status'])
+                self.status_log.append((entry['game_number'], entry['status']))
+        elif op == 'message':
+            self.messages.register(entry['game_number'], entry['chat_id'], entry['message_id'])
+        elif op == 'evicted':
+            for game_number in entry.get('games', []):
+                self.prediction_status.pop(game_number, None)
+            self.messages.evict(entry.get('games', []))
+    
+    def persist(self, op, **fields):
+        """Journalise une transition et compacte périodiquement le snapshot"""
+        with profiler.stage('persist', PERSIST_SECONDS):
+            self.store.record(op, counters=self.counters, **fields)
+            if self.store.needs_compaction:
+                self.store.save_predictions(self.prediction_status, self.counters, self.messages)
+    
+    def add_prediction(self, game_number, suits):
+        """Enregistre une nouvelle prédiction en attente"""
+        self.set_prediction_status(game_number, '⌛')
+        self.last_predictions.append((game_number, suits))
+        self.persist('created', game_number=game_number, suits=suits)
+    
+    def register_message(self, game_number, chat_id, message_id):
+        """Mémorise le message diffusé d'une prédiction pour ses mises à jour de statut"""
+        self.messages.register(game_number, chat_id, message_id)
+        self.persist('message', game_number=game_number, chat_id=chat_id, message_id=message_id)
+    
+    def reset(self):
+        """Réinitialise toutes les données de prédiction"""
+        self.prediction_status = {}
+        self.pending.clear()
+        self.counters.reset()
+        self.messages.clear()
+        self.last_predictions.clear()
+        self.status_log.clear()
+    
+    def set_prediction_status(self, game_number, status):
+        """Met à jour le statut d'une prédiction, l'index des prédictions en attente et les compteurs"""
+        self.counters.record(self.prediction_status.get(game_number), status)
+        self.prediction_status[game_number] = status
+        if status == '⌛':
+            self.pending.add(game_number)
+        else:
+            self.pending.discard(game_number)
+    
+    def apply_retention(self, current_game_number):
+        """Évince les prédictions réglées hors de la fenêtre de rétention (coût amorti)"""
+        cutoff = self.retention.due(current_game_number)
+        if cutoff is None:
+            return
+        evicted = self.retention.prune_settled(self.prediction_status, cutoff)
+        if evicted:
+            self.messages.evict(evicted)
+            self.persist('evicted', games=sorted(evicted))
+            logger.info(f"🧹 Rétention: {len(evicted)} prédictions réglées archivées (avant #{cutoff})")
     
     def extract_game_number(self, text):
         """Extrait le numéro de jeu du message"""
-        patterns = [
-            r'#[Nn](\d+)',
-            r'#(\d+)',
-            r'(\d+)\.',
-            r'Jeu\s*(\d+)',
-            r'Game\s*(\d+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, text)
-            if match:
-                return int(match.group(1))
-        return None
+        return as_game_result(text).game_number
     
     def has_ace_in_group(self, group_text):
         """Vérifie si un groupe contient des As"""
-        return bool(re.search(r'A[♠♥♦♣️]', group_text))
+        return count_aces(group_text) > 0
     
     def count_aces_in_group(self, group_text):
         """Compte le nombre d'As dans un groupe"""
-        return len(re.findall(r'A[♠♥♦♣️]', group_text))
+        return count_aces(group_text)
     
     def extract_suits_from_group(self, group_text):
         """Extrait les couleurs d'un groupe de cartes"""
-        suits = re.findall(r'[♠♥♦♣]', group_text)
-        return [self.suits_mapping.get(s, s) for s in suits]
+        return list(extract_suits(group_text))
     
     def should_predict(self, message_text):
         """Détermine si une prédiction doit être lancée selon la logique des As"""
         try:
+            result = as_game_result(message_text)
+
             # Extraire le numéro de jeu
-            game_number = self.extract_game_number(message_text)
+            game_number = result.game_number
             if not game_number:
                 return False, None, None
             
-            # Rechercher les groupes de cartes avec pattern flexible
-            patterns = [
-                r'(\d+)\(([^)]+)\)\s*-\s*[✅🔰]*\s*(\d+)\(([^)]+)\)',
-                r'(\d+)\(([^)]+)\)\s*[✅🔰-]*\s*(\d+)\(([^)]+)\)',
-                r'\(([^)]+)\)\s*-\s*[✅🔰]*\s*\(([^)]+)\)'
-            ]
-            
-            first_group = None
-            second_group = None
-            
-            for pattern in patterns:
-                match = re.search(pattern, message_text)
-                if match:
-                    groups = match.groups()
-                    if len(groups) == 4:  # Avec numéros
-                        first_group = groups[1]
-                        second_group = groups[3]
-                    elif len(groups) == 2:  # Sans numéros
-                        first_group = groups[0]
-                        second_group = groups[1]
-                    break
+            # Groupes de cartes extraits une seule fois par l'analyseur
+            first_group = result.first_group
+            second_group = result.second_group
             
             if not first_group or not second_group:
                 logger.debug(f"Groupes non trouvés dans: {message_text}")
                 return False, None, None
             
+            # Main partielle (⏰/🕐): l'As du premier groupe ou celui du deuxième peut encore changer
+            if not result.is_final:
+                logger.debug(f"⏳ Jeu #{game_number} en cours, déclenchement attendu sur le résultat final")
+                return False, None, None
+            
             # Compter les As dans chaque groupe
-            aces_first = self.count_aces_in_group(first_group)
-            aces_second = self.count_aces_in_group(second_group)
+            aces_first = result.first_aces
+            aces_second = result.second_aces
             
             logger.info(f"🎯 Analyse As: Premier groupe='{first_group}' (As: {aces_first > 0}), Deuxième groupe='{second_group}' (As: {aces_second > 0})")
             
@@ -154,8 +360,8 @@ class SimplePredictor:
                 logger.info("✅ Condition As validée: 1 As premier groupe + 0 As deuxième groupe")
                 
                 # Extraire les couleurs du premier groupe pour la prédiction
-                suits = self.extract_suits_from_group(first_group)
-                suit_prediction = ''.join(suits[:2]) if len(suits) >= 2 else '♣♥'
+                suits = result.first_suits
+                suit_prediction = suits[:2] if len(suits) >= 2 else '♣♥'
                 
                 next_game = game_number + 1
                 
@@ -182,39 +388,25 @@ class SimplePredictor:
     def verify_prediction(self, message_text):
         """Vérifie les résultats des prédictions avec logging détaillé"""
         try:
-            game_number = self.extract_game_number(message_text)
+            result = as_game_result(message_text)
+
+            game_number = result.game_number
             if not game_number:
                 return None, None
                 
             logger.info(f"Numéro de jeu du résultat: {game_number}")
+            self.apply_retention(game_number)
             
             # Vérifier si c'est un résultat final (avec ✅ ou 🔰)
-            if not re.search(r'[✅🔰]', message_text):
+            if not result.is_final:
                 logger.info(f"⏳ Message #{game_number} en cours - pas encore final")
                 return None, None
             else:
                 logger.info(f"✅ Message #{game_number} finalisé avec 🔰 ou ✅")
             
-            # Extraire les groupes pour valider le format 2+2
-            patterns = [
-                r'(\d+)\(([^)]+)\)\s*-\s*[✅🔰]*\s*(\d+)\(([^)]+)\)',
-                r'\(([^)]+)\)\s*-\s*[✅🔰]*\s*\(([^)]+)\)'
-            ]
-            
-            first_group = None
-            second_group = None
-            
-            for pattern in patterns:
-                match = re.search(pattern, message_text)
-                if match:
-                    groups = match.groups()
-                    if len(groups) == 4:
-                        first_group = groups[1]
-                        second_group = groups[3]
-                    elif len(groups) == 2:
-                        first_group = groups[0]
-                        second_group = groups[1]
-                    break
+            # Groupes pour valider le format 2+2
+            first_group = result.first_group
+            second_group = result.second_group
             
             if not first_group or not second_group:
                 logger.info("❌ Impossible d'extraire les groupes du message")
@@ -222,67 +414,52 @@ class SimplePredictor:
                 
             logger.info(f"Groupes extraits: '{first_group}' et '{second_group}'")
             
-            # Compter les cartes dans chaque groupe avec détails
-            emoji_first = len(re.findall(r'[♠♥♦♣]️', first_group))
-            simple_first = len(re.findall(r'[♠♥♦♣](?!️)', first_group))
-            cards_first = emoji_first + simple_first
-            
-            emoji_second = len(re.findall(r'[♠♥♦♣]️', second_group))
-            simple_second = len(re.findall(r'[♠♥♦♣](?!️)', second_group))  
-            cards_second = emoji_second + simple_second
-            
-            logger.info(f"Comptage cartes détaillé: emoji={emoji_first}, simple={simple_first}, total={cards_first} dans '{first_group}'")
-            logger.info(f"Comptage cartes détaillé: emoji={emoji_second}, simple={simple_second}, total={cards_second} dans '{second_group}'")
+            # Cartes déjà comptées par l'analyseur
+            cards_first = result.first_count
+            cards_second = result.second_count
             logger.info(f"Comptage cartes: groupe1={cards_first}, groupe2={cards_second}")
             
             # Valider le format 2+2
-            is_valid_format = (cards_first == 2 and cards_second == 2)
+            is_valid_format = result.is_valid_distribution
             logger.info(f"Résultat valide (2+2): {is_valid_format}")
             
             if not is_valid_format:
                 logger.info("❌ Résultat invalide: pas exactement 2+2 cartes, ignoré pour vérification")
                 return None, None
             
-            # Vérifier les prédictions avec offsets 0, 1, 2, 3
-            for offset in range(4):
-                predicted_number = game_number - offset
-                logger.info(f"Vérification si le jeu #{game_number} correspond à la prédiction #{predicted_number} (offset {offset})")
+            # Vérifier les prédictions avec offsets 0, 1, 2, 3 via l'index des prédictions en attente
+            found = self.pending.match(game_number, max_offset=3)
+            if found:
+                predicted_number, offset = found
+                logger.info(f"Prédiction en attente trouvée: #{predicted_number} (offset {offset})")
+                
+                # Déterminer le statut selon l'offset
+                if offset == 0:
+                    statut = '✅0️⃣'  # Exact
+                elif offset == 1:
+                    statut = '✅1️⃣'  # 1 jeu après
+                elif offset == 2:
+                    statut = '✅2️⃣'  # 2 jeux après
+                else:  # offset == 3
+                    statut = '✅3️⃣'  # 3 jeux après
                 
-                if predicted_number in self.prediction_status:
-                    current_status = self.prediction_status[predicted_number]
-                    if current_status == '⌛':  # En attente
-                        logger.info(f"Prédiction en attente trouvée: #{predicted_number}")
-                        
-                        # Déterminer le statut selon l'offset
-                        if offset == 0:
-                            statut = '✅0️⃣'  # Exact
-                        elif offset == 1:
-                            statut = '✅1️⃣'  # 1 jeu après
-                        elif offset == 2:
-                            statut = '✅2️⃣'  # 2 jeux après
-                        else:  # offset == 3
-                            statut = '✅3️⃣'  # 3 jeux après
-                        
-                        self.prediction_status[predicted_number] = statut
-                        self.status_log.append((predicted_number, statut))
-                        yaml_manager.save_predictions(self.prediction_status)
-                        
-                        logger.info(f"✅ Prédiction réussie: #{predicted_number} validée par le jeu #{game_number} (offset {offset})")
-                        return True, predicted_number
+                self.set_prediction_status(predicted_number, statut)
+                self.status_log.append((predicted_number, statut))
+                self.persist('status', game_number=predicted_number, status=statut)
+                
+                logger.info(f"✅ Prédiction réussie: #{predicted_number} validée par le jeu #{game_number} (offset {offset})")
+                return True, predicted_number
             
-            # Marquer les anciennes prédictions comme échec si le jeu dépasse prédiction+3
-            for pred_num in list(self.prediction_status.keys()):
-                if (self.prediction_status[pred_num] == '⌛' and 
-                    game_number > pred_num + 3):
-                    self.prediction_status[pred_num] = '❌'
-                    self.status_log.append((pred_num, '❌'))
-                    yaml_manager.save_predictions(self.prediction_status)
-                    logger.info(f"❌ Prédiction #{pred_num} marquée échec - jeu #{game_number} dépasse prédit+3")
-                    return False, pred_num
+            # Marquer la plus ancienne prédiction comme échec si le jeu dépasse prédiction+3
+            for pred_num in self.pending.pop_expired(game_number, horizon=3, limit=1):
+                self.set_prediction_status(pred_num, '❌')
+                self.status_log.append((pred_num, '❌'))
+                self.persist('status', game_number=pred_num, status='❌')
+                logger.info(f"❌ Prédiction #{pred_num} marquée échec - jeu #{game_number} dépasse prédit+3")
+                return False, pred_num
             
             logger.info(f"Aucune prédiction correspondante trouvée pour le jeu #{game_number} dans les offsets 0-3")
-            pending = [k for k, v in self.prediction_status.items() if v == '⌛']
-            logger.info(f"Prédictions actuelles en attente: {pending}")
+            logger.info(f"Prédictions actuelles en attente: {sorted(self.pending)}")
             return None, None
             
         except Exception as e:
@@ -290,54 +467,102 @@ class SimplePredictor:
             return None, None
     
     def get_statistics(self):
-        """Obtenir les statistiques des prédictions"""
+        """Obtenir les statistiques des prédictions (compteurs incrémentaux, temps constant)"""
         try:
-            total = len(self.status_log)
-            if total == 0:
-                return {
-                    'total': 0,
-                    'wins': 0,
-                    'losses': 0,
-                    'pending': len([s for s in self.prediction_status.values() if s == '⌛']),
-                    'win_rate': 0.0
-                }
-            
-            wins = sum(1 for _, status in self.status_log if '✅' in status)
-            losses = sum(1 for _, status in self.status_log if '❌' in status)
-            pending = len([s for s in self.prediction_status.values() if s == '⌛'])
-            win_rate = (wins / total * 100) if total > 0 else 0.0
-            
-            return {
-                'total': total,
-                'wins': wins,
-                'losses': losses,
-                'pending': pending,
-                'win_rate': win_rate
-            }
+            return self.counters.get_statistics()
         except Exception as e:
             logger.error(f"Erreur get_statistics: {e}")
             return {'total': 0, 'wins': 0, 'losses': 0, 'pending': 0, 'win_rate': 0.0}
 
-predictor = SimplePredictor()
+class ChannelShard:
+    """Table de jeu suivie (canal stats → canal display) avec prédicteur, persistance et compteurs isolés"""
+    def __init__(self, stat_channel, display_channel, data_dir, store=None):
+        self.stat_channel = stat_channel
+        self.display_channel = display_channel
+        self.store = store or make_store(data_dir)
+        self.predictor = SimplePredictor(self.store)
+        # Modifications de statut regroupées: une seule édition par message et par fenêtre
+        self.edits = EditCoalescer(outbound, self.predictor.messages)
+        # Rattrapage au redémarrage: dernier message traité du canal stats; les événements en direct
+        # attendent la fin du rejeu
+        self.cursor = CatchupCursor(f"{data_dir}/catchup_cursor.json", writer=persistence_writer)
+        self.live = asyncio.Event()
+        # Messages d'un même jeu traités un par un, étapes appliquées une seule fois par jeu
+        self.game_locks = KeyedLocks()
+        self.games = GameStateMachine()
+    
+    def get_stats(self):
+        return {
+            "stat_channel": self.stat_channel,
+            "display_channel": self.display_channel,
+            "predictions_stats": self.predictor.get_statistics(),
+            "status_edits": self.edits.get_stats(),
+            "games": self.games.get_stats()
+        }
+
+# Table principale: canaux de la configuration (/set_stat, /set_display), données dans data/
+primary_shard = ChannelShard(detected_stat_channel, detected_display_channel, yaml_manager.data_dir, store=yaml_manager)
+predictor = primary_shard.predictor
+edit_coalescer = primary_shard.edits
+
+# Routage des messages par canal stats (table principale + CHANNEL_PAIRS)
+shard_router = ShardRouter()
+
+def configure_shards():
+    """Associe la configuration chargée à la table principale et crée les tables de CHANNEL_PAIRS"""
+    primary_shard.stat_channel = detected_stat_channel
+    primary_shard.display_channel = detected_display_channel
+    shard_router.register(detected_stat_channel, primary_shard)
+    for pair in parse_channel_pairs(CHANNEL_PAIRS):
+        if pair.stat_channel in shard_router:
+            continue
+        shard = ChannelShard(pair.stat_channel, pair.display_channel, f"data/shards/{pair.stat_channel}")
+        shard_router.register(pair.stat_channel, shard)
+    logger.info(f"🗂️ Tables suivies: {len(shard_router)}")
+
+def on_prediction_sent(shard, game_number, future, received_at=None):
+    """Enregistre le message diffusé dès que la file d'envoi l'a confirmé"""
+    if future.cancelled() or future.exception() is not None:
+        logger.error(f"❌ Diffusion de la prédiction #{game_number} échouée: {None if future.cancelled() else future.exception()}")
+        # Aucun message à modifier: les statuts en attente de ce jeu sont abandonnés
+        shard.edits.forget([game_number])
+        return
+    if received_at is not None:
+        BROADCAST_SECONDS.observe(time.monotonic() - received_at)
+    message = future.result()
+    shard.predictor.register_message(game_number, message.chat_id, message.id)
+    shard.edits.message_registered(game_number)
 
 # Configuration
 CONFIG_FILE = "bot_config.json"
+_config_signature = None  # (mtime_ns, taille) du fichier de configuration déjà chargé
+
+def _config_file_signature():
+    try:
+        stat = os.stat(CONFIG_FILE)
+        return stat.st_mtime_ns, stat.st_size
+    except FileNotFoundError:
+        return None
 
 def load_config():
-    """Charge la configuration depuis le fichier JSON avec valeurs par défaut"""
-    global detected_stat_channel, detected_display_channel, prediction_interval
+    """Charge la configuration depuis le fichier JSON avec valeurs par défaut (relu seulement si modifié)"""
+    global detected_stat_channel, detected_display_channel, prediction_interval, _config_signature
     
     # Configuration par défaut
     default_stat_channel = -1002646551216
     default_display_channel = -1002716137113
     
     try:
-        if os.path.exists(CONFIG_FILE):
+        signature = _config_file_signature()
+        if signature is not None and signature == _config_signature:
+            return True
+        if signature is not None:
             with open(CONFIG_FILE, 'r') as f:
                 config = json.load(f)
                 detected_stat_channel = config.get('stat_channel', default_stat_channel)
                 detected_display_channel = config.get('display_channel', default_display_channel)
                 prediction_interval = config.get('prediction_interval', 1)
+            _config_signature = signature
         else:
             # Si pas de fichier config, utiliser les valeurs par défaut
             detected_stat_channel = default_stat_channel
@@ -359,6 +584,7 @@ def load_config():
 
 def save_config():
     """Sauvegarde la configuration dans le fichier JSON"""
+    global _config_signature
     try:
         config = {
             'stat_channel': detected_stat_channel,
@@ -367,6 +593,8 @@ def save_config():
         }
         with open(CONFIG_FILE, 'w') as f:
             json.dump(config, f, indent=2)
+        # L'état en mémoire correspond déjà au fichier écrit
+        _config_signature = _config_file_signature()
         logger.info("✅ Configuration sauvegardée")
         return True
     except Exception as e:
@@ -387,7 +615,16 @@ async def bot_status_endpoint(request):
             "stat_channel": detected_stat_channel,
             "display_channel": detected_display_channel,
             "prediction_interval": prediction_interval,
-            "predictions_active": len(predictor.prediction_status),
+            "predictions_active": predictor.counters.pending,
+            "predictions_stats": predictor.get_statistics(),
+            "work_queue": work_queue.get_stats(),
+            "edit_tracker": edit_tracker.get_stats(),
+            "outbound": outbound.get_stats(),
+            "entity_cache": entity_cache.get_stats(),
+            "status_edits": edit_coalescer.get_stats(),
+            "shards": {str(shard.stat_channel): shard.get_stats() for shard in shard_router if shard is not primary_shard},
+            "startup_seconds": startup_timer.get_stats(),
+            "profiler": profiler.get_stats(),
             "yaml_database": "active",
             "timestamp": datetime.now().isoformat()
         }
@@ -395,6 +632,32 @@ async def bot_status_endpoint(request):
     except Exception as e:
         return web.json_response({"error": str(e)}, status=500)
 
+async def metrics_endpoint(request):
+    """Métriques au format d'exposition texte Prometheus"""
+    return web.Response(text=metrics.render(), headers={'Content-Type': 'text/plain; version=0.0.4; charset=utf-8'})
+
+async def profile_endpoint(request):
+    """Profilage à chaud par HTTP (PROFILE_TOKEN requis): ?action=on|off|report|download"""
+    if not PROFILE_TOKEN or request.query.get('token') != PROFILE_TOKEN:
+        return web.Response(text="❌ Accès refusé", status=403)
+    try:
+        action = request.query.get('action', 'report')
+        if action == 'on':
+            window = profiler.start(float(request.query.get('seconds', DEFAULT_WINDOW_SECONDS)))
+            return web.json_response({"active": True, "window": window})
+        if action == 'off':
+            return web.json_response({"stopped": profiler.stop()})
+        if action == 'download':
+            data = profiler.dump()
+            if data is None:
+                return web.Response(text="ℹ️ Aucune collecte cProfile", status=404)
+            return web.Response(body=data, content_type='application/octet-stream',
+                                headers={'Content-Disposition': 'attachment; filename="profile.prof"'})
+        top_n = int(request.query.get('top', DEFAULT_TOP_N))
+        return web.Response(text=profiler.report(top_n, request.query.get('sort', 'cumulative')))
+    except Exception as e:
+        return web.json_response({"error": str(e)}, status=500)
+
 # --- COMMANDES TELEGRAM ---
 
 @client.on(events.NewMessage(pattern='/start'))
@@ -406,12 +669,12 @@ async def start_command(event):
     display_status = "✅ Configuré"
     
     try:
-        await client.get_entity(detected_stat_channel)
+        await entity_cache.get_entity(detected_stat_channel)
     except:
         stat_status = "⚠️ Accès limité"
         
     try:
-        await client.get_entity(detected_display_channel)
+        await entity_cache.get_entity(detected_display_channel)
     except:
         display_status = "⚠️ Accès limité"
     
@@ -439,11 +702,12 @@ async def start_command(event):
 • `/intervalle` - Configure le délai de prédiction (admin)
 • `/sta` - Statut des déclencheurs (admin)
 • `/reset` - Réinitialiser (admin)
+• `/profile` - Profilage à chaud (admin)
 • `/deploy` - Pack de déploiement (admin)
 
 **Le bot est prêt à analyser vos jeux !** 🚀"""
     
-    await event.respond(welcome_msg)
+    await respond(event, welcome_msg)
     logger.info(f"Message de bienvenue envoyé à l'utilisateur {event.sender_id}")
 
 @client.on(events.NewMessage(pattern='/status'))
@@ -455,9 +719,11 @@ async def status_command(event):
     try:
         # Statistiques du prédicteur
         pred_stats = predictor.get_statistics()
+        by_offset = pred_stats.get('wins_by_offset', {0: 0, 1: 0, 2: 0, 3: 0})
         pred_status = f"""🎯 **Prédicteur**:
 • Total prédictions: {pred_stats['total']}
 • Réussites: {pred_stats['wins']} ✅
+• Par décalage: 0️⃣ {by_offset[0]} | 1️⃣ {by_offset[1]} | 2️⃣ {by_offset[2]} | 3️⃣ {by_offset[3]}
 • Échecs: {pred_stats['losses']} ❌
 • En attente: {pred_stats['pending']} ⏳
 • Taux réussite: {pred_stats['win_rate']:.1f}%"""
@@ -477,11 +743,11 @@ async def status_command(event):
 • Logique As: 1 premier + 0 deuxième groupe
 • Version: v2024 Render.com"""
         
-        await event.respond(status_msg)
+        await respond(event, status_msg)
         
     except Exception as e:
         logger.error(f"Erreur status: {e}")
-        await event.respond(f"❌ Erreur: {e}")
+        await respond(event, f"❌ Erreur: {e}")
 
 @client.on(events.NewMessage(pattern='/sta'))
 async def show_trigger_numbers(event):
@@ -494,8 +760,9 @@ async def show_trigger_numbers(event):
         load_config()
         
         # Calculer les statistiques
-        active_predictions = len([s for s in predictor.prediction_status.values() if s == '⌛'])
-        total_predictions = len(predictor.status_log)
+        stats = predictor.get_statistics()
+        active_predictions = stats['pending']
+        total_predictions = stats['total']
         
         msg = f"""📊 **Statut des Déclencheurs Automatiques**
 
@@ -515,12 +782,12 @@ async def show_trigger_numbers(event):
 • Display: {detected_display_channel if detected_display_channel else 'Non configuré'}
 • Intervalle: {prediction_interval} minute(s)"""
 
-        await event.respond(msg)
+        await respond(event, msg)
         logger.info("Statut des déclencheurs envoyé à l'admin")
 
     except Exception as e:
         logger.error(f"Erreur show_trigger_numbers: {e}")
-        await event.respond(f"❌ Erreur: {e}")
+        await respond(event, f"❌ Erreur: {e}")
 
 @client.on(events.NewMessage(pattern='/reset'))
 async def reset_data(event):
@@ -530,12 +797,12 @@ async def reset_data(event):
         
     try:
         # Réinitialiser les prédictions en attente
-        predictor.prediction_status = {}
-        predictor.last_predictions = []
-        predictor.status_log = []
+        predictor.reset()
+        edit_coalescer.clear()
         
-        # Réinitialiser les données YAML
-        yaml_manager.save_predictions({})
+        # Réinitialiser les données YAML (écriture immédiate)
+        yaml_manager.save_predictions({}, predictor.counters, predictor.messages)
+        await persistence_writer.flush()
         
         msg = """🔄 **Données réinitialisées avec succès !**
 
@@ -545,13 +812,54 @@ async def reset_data(event):
 
 Le bot est prêt pour un nouveau cycle."""
 
-        await event.respond(msg)
+        await respond(event, msg)
         logger.info("Données de prédiction réinitialisées")
         logger.info("Données réinitialisées par l'admin")
 
     except Exception as e:
         logger.error(f"Erreur reset_data: {e}")
-        await event.respond(f"❌ Erreur lors de la réinitialisation: {e}")
+        await respond(event, f"❌ Erreur lors de la réinitialisation: {e}")
+
+TELEGRAM_TEXT_LIMIT = 4000
+
+@client.on(events.NewMessage(pattern=r'/profile(?:\s+(on|off|dump))?(?:\s+(\d+))?'))
+async def profile_command(event):
+    """Profilage à chaud: /profile on [secondes], /profile off, /profile dump [N] (admin)"""
+    if event.sender_id != ADMIN_ID:
+        return
+    
+    try:
+        action = event.pattern_match.group(1)
+        number = event.pattern_match.group(2)
+        if action == 'on':
+            window = profiler.start(int(number) if number else DEFAULT_WINDOW_SECONDS)
+            await respond(event, f"🔬 Profilage cProfile actif pour {window:.0f}s (arrêt: /profile off)")
+        elif action == 'off':
+            stopped = profiler.stop()
+            await respond(event, "🔬 Profilage arrêté, rapport: /profile dump" if stopped else "ℹ️ Aucun profilage en cours")
+        elif action == 'dump':
+            report = profiler.report(int(number) if number else DEFAULT_TOP_N)
+            if len(report) > TELEGRAM_TEXT_LIMIT:
+                report = report[:TELEGRAM_TEXT_LIMIT] + "\n…"
+            await respond(event, report)
+            data = profiler.dump()
+            if data is not None:
+                # Fichier .prof pour pstats / snakeviz
+                dump_file = io.BytesIO(data)
+                dump_file.name = f"profile_{datetime.now():%Y%m%d_%H%M%S}.prof"
+                await outbound.send_message(event.chat_id, "📎 Collecte cProfile", file=dump_file, priority=PRIORITY_ADMIN)
+        else:
+            state = "actif" if profiler.is_active else "inactif"
+            await respond(event, f"""🔬 **Profilage** ({state})
+
+• `/profile on [secondes]` - Collecte cProfile (défaut {DEFAULT_WINDOW_SECONDS:.0f}s, max {profiler.max_window:.0f}s)
+• `/profile off` - Arrêt anticipé
+• `/profile dump [N]` - Minuteurs d'étapes + top N fonctions et fichier .prof""")
+        logger.info(f"Commande /profile {action or ''} exécutée")
+        
+    except Exception as e:
+        logger.error(f"Erreur profile_command: {e}")
+        await respond(event, f"❌ Erreur: {e}")
 
 @client.on(events.NewMessage(pattern=r'/intervalle (\d+)'))
 async def set_prediction_interval(event):
@@ -570,7 +878,7 @@ async def set_prediction_interval(event):
             # Sauvegarder la configuration
             save_config()
             
-            await event.respond(f"""✅ **Intervalle de Prédiction Mis à Jour**
+            await respond(event, f"""✅ **Intervalle de Prédiction Mis à Jour**
 
 ⏱️ **Ancien**: {old_interval} minute(s)
 ⏱️ **Nouveau**: {prediction_interval} minute(s)
@@ -579,13 +887,13 @@ Configuration sauvegardée automatiquement.""")
             
             logger.info(f"✅ Intervalle mis à jour: {old_interval} → {prediction_interval} minutes")
         else:
-            await event.respond("❌ **Erreur**: L'intervalle doit être entre 1 et 60 minutes")
+            await respond(event, "❌ **Erreur**: L'intervalle doit être entre 1 et 60 minutes")
             
     except ValueError:
-        await event.respond("❌ **Erreur**: Veuillez entrer un nombre valide")
+        await respond(event, "❌ **Erreur**: Veuillez entrer un nombre valide")
     except Exception as e:
         logger.error(f"Erreur set_prediction_interval: {e}")
-        await event.respond(f"❌ Erreur: {e}")
+        await respond(event, f"❌ Erreur: {e}")
 
 @client.on(events.NewMessage(pattern=r'/set_stat (-?\d+)'))
 async def set_stat_channel(event):
@@ -597,18 +905,26 @@ async def set_stat_channel(event):
         global detected_stat_channel
         channel_id = int(event.pattern_match.group(1))
         
-        # Vérifier l'accès au canal
+        # Vérifier l'accès au canal (résolution fraîche)
+        entity_cache.invalidate(channel_id)
         try:
-            channel = await client.get_entity(channel_id)
+            channel = await entity_cache.get_entity(channel_id)
             channel_title = getattr(channel, 'title', f'Canal {channel_id}')
         except Exception as e:
-            await event.respond(f"❌ **Erreur**: Impossible d'accéder au canal {channel_id}\n{str(e)}")
+            await respond(event, f"❌ **Erreur**: Impossible d'accéder au canal {channel_id}\n{str(e)}")
+            return
+        
+        if channel_id != detected_stat_channel and channel_id in shard_router:
+            await respond(event, f"❌ **Erreur**: Le canal {channel_id} est déjà suivi par une autre table (CHANNEL_PAIRS)")
             return
         
+        entity_cache.invalidate(detected_stat_channel)
+        shard_router.rebind(detected_stat_channel, channel_id, primary_shard)
+        primary_shard.stat_channel = channel_id
         detected_stat_channel = channel_id
         save_config()
         
-        await event.respond(f"""✅ **Canal Statistiques Configuré**
+        await respond(event, f"""✅ **Canal Statistiques Configuré**
 
 🔗 **Canal**: {channel_title}
 🆔 **ID**: {channel_id}
@@ -618,10 +934,10 @@ Le bot surveillera maintenant ce canal pour les messages de jeu.""")
         logger.info(f"✅ Canal stats configuré: {channel_id} ({channel_title})")
         
     except ValueError:
-        await event.respond("❌ **Erreur**: ID de canal invalide")
+        await respond(event, "❌ **Erreur**: ID de canal invalide")
     except Exception as e:
         logger.error(f"Erreur set_stat_channel: {e}")
-        await event.respond(f"❌ Erreur: {e}")
+        await respond(event, f"❌ Erreur: {e}")
 
 @client.on(events.NewMessage(pattern=r'/set_display (-?\d+)'))
 async def set_display_channel(event):
@@ -633,22 +949,29 @@ async def set_display_channel(event):
         global detected_display_channel
         channel_id = int(event.pattern_match.group(1))
         
-        # Vérifier l'accès au canal et les permissions
+        # Vérifier l'accès au canal et les permissions (résolution fraîche)
+        entity_cache.invalidate(channel_id)
         try:
-            channel = await client.get_entity(channel_id)
+            channel = await entity_cache.get_entity(channel_id)
             channel_title = getattr(channel, 'title', f'Canal {channel_id}')
             
             # Tester l'envoi d'un message de test
-            test_message = await client.send_message(channel_id, "🔧 Test de configuration - Canal d'affichage configuré avec succès !")
+            # ID du canal: clé de débit commune avec les prédictions; InputPeer résolu pour l'appel
+            test_message = await outbound.send_message(
+                channel_id, "🔧 Test de configuration - Canal d'affichage configuré avec succès !",
+                peer=await entity_cache.get_input_entity(channel_id), priority=PRIORITY_ADMIN
+            )
             
         except Exception as e:
-            await event.respond(f"❌ **Erreur**: Impossible d'envoyer dans le canal {channel_id}\n{str(e)}")
+            await respond(event, f"❌ **Erreur**: Impossible d'envoyer dans le canal {channel_id}\n{str(e)}")
             return
         
+        entity_cache.invalidate(detected_display_channel)
+        primary_shard.display_channel = channel_id
         detected_display_channel = channel_id
         save_config()
         
-        await event.respond(f"""✅ **Canal Affichage Configuré**
+        await respond(event, f"""✅ **Canal Affichage Configuré**
 
 🔗 **Canal**: {channel_title}
 🆔 **ID**: {channel_id}
@@ -658,10 +981,10 @@ Les prédictions seront maintenant diffusées sur ce canal.""")
         logger.info(f"✅ Canal affichage configuré: {channel_id} ({channel_title})")
         
     except ValueError:
-        await event.respond("❌ **Erreur**: ID de canal invalide")
+        await respond(event, "❌ **Erreur**: ID de canal invalide")
     except Exception as e:
         logger.error(f"Erreur set_display_channel: {e}")
-        await event.respond(f"❌ Erreur: {e}")
+        await respond(event, f"❌ Erreur: {e}")
 
 @client.on(events.NewMessage(pattern='/config'))
 async def show_config(event):
@@ -676,14 +999,14 @@ async def show_config(event):
         
         if detected_stat_channel:
             try:
-                stat_channel = await client.get_entity(detected_stat_channel)
+                stat_channel = await entity_cache.get_entity(detected_stat_channel)
                 stat_name = getattr(stat_channel, 'title', f'Canal {detected_stat_channel}')
             except:
                 stat_name = f"Canal {detected_stat_channel} (inaccessible)"
         
         if detected_display_channel:
             try:
-                display_channel = await client.get_entity(detected_display_channel)
+                display_channel = await entity_cache.get_entity(detected_display_channel)
                 display_name = getattr(display_channel, 'title', f'Canal {detected_display_channel}')
             except:
                 display_name = f"Canal {detected_display_channel} (inaccessible)"
@@ -707,129 +1030,212 @@ async def show_config(event):
 • `/set_display [ID]` - Configurer canal affichage
 • `/intervalle [1-60]` - Configurer intervalle"""
         
-        await event.respond(config_msg)
+        await respond(event, config_msg)
         
     except Exception as e:
         logger.error(f"Erreur show_config: {e}")
-        await event.respond(f"❌ Erreur: {e}")
+        await respond(event, f"❌ Erreur: {e}")
+
+async def broadcast_prediction(shard, game_number, prediction_text, received_at=None):
+    """Diffuse une prédiction via la file d'envoi et enregistre son message une fois envoyé"""
+    if not shard.display_channel:
+        logger.warning("⚠️ Canal display non configuré, prédiction non diffusée")
+        return
+    try:
+        # InputPeer préchauffé au démarrage: envoi direct sans requête de résolution
+        display_entity = entity_cache.peek_input(shard.display_channel)
+        if display_entity is None:
+            try:
+                display_entity = await entity_cache.get_input_entity(shard.display_channel)
+            except Exception:
+                # Si impossible d'obtenir l'entité, utiliser directement l'ID
+                display_entity = shard.display_channel
+            
+        # Mise en file sans attente: le gestionnaire n'est jamais bloqué par un FloodWait.
+        # Clé de débit = ID du canal (partagée avec les modifications de statut), envoi via l'InputPeer
+        sent = outbound.send_message(shard.display_channel, prediction_text, peer=display_entity)
+        sent.add_done_callback(lambda future, game=game_number: on_prediction_sent(shard, game, future, received_at))
+        logger.info(f"📤 Prédiction mise en file pour le canal {shard.display_channel}")
+    except Exception as e:
+        logger.error(f"❌ Erreur diffusion sur {shard.display_channel}: {e}")
+
+async def create_prediction(shard, game_number, suit, received_at=None):
+    """Enregistre puis diffuse une nouvelle prédiction"""
+    prediction_text = f"🔵{game_number} 🔵3D: statut :⏳"
+    logger.info(f"🎯 Prédiction générée: {prediction_text}")
+    
+    # Enregistrer la prédiction
+    shard.predictor.add_prediction(game_number, suit)
+    PREDICTIONS_TRIGGERED.inc()
+    logger.info(f"✅ Prédiction créée: Jeu #{game_number} -> {suit}")
+    
+    # Diffuser la prédiction automatiquement
+    await broadcast_prediction(shard, game_number, prediction_text, received_at)
+
+async def process_stat_message(shard, message_text, message_id=None, replay=False, received_at=None, result=None):
+    """Pipeline d'un message du canal stats d'une table: déclenchement, vérification, curseur de rattrapage
+    
+    En rejeu (rattrapage), un déclenchement n'est pas diffusé mais retourné (numéro, couleurs):
+    l'appelant décide s'il est encore d'actualité. received_at (time.monotonic() à la réception)
+    mesure le délai jusqu'à la diffusion. result: GameResult déjà analysé par l'appelant.
+    """
+    # Analyse unique du message, partagée par toutes les étapes
+    if result is None:
+        result = parse_game_message(message_text)
+    logger.info(f"Numéro de jeu extrait: {result.game_number}")
+    trigger = None
+    if result.game_number is None:
+        return None
+    
+    # État du jeu: une modification ne peut ni redéclencher ni revérifier un jeu déjà traité
+    shard.games.observe(result.game_number, result.is_final)
+    
+    # Logique de prédiction avec analyse des As
+    with profiler.stage('decide', DECIDE_SECONDS):
+        should_predict, game_number, suit = shard.predictor.should_predict(result)
+    
+    if should_predict and game_number and suit and shard.games.claim_trigger(result.game_number):
+        if replay:
+            trigger = (game_number, suit)
+        else:
+            await create_prediction(shard, game_number, suit, received_at)
+    
+    # VÉRIFICATION DÉTAILLÉE DES RÉSULTATS (une seule fois, sur le résultat final)
+    verified, number = None, None
+    if shard.games.claim_verification(result.game_number):
+        with profiler.stage('decide', DECIDE_SECONDS):
+            verified, number = shard.predictor.verify_prediction(result)
+    if verified is not None and number is not None:
+        status = shard.predictor.prediction_status.get(number, '❌')
+        logger.info(f"🔍 Vérification jeu #{number}: {status}")
+        
+        if verified:
+            PREDICTIONS_VERIFIED.inc(1, VERIFIED_OFFSETS.get(status, '?'))
+            logger.info(f"✅ PRÉDICTION RÉUSSIE: #{number} validée avec statut {status}")
+        else:
+            PREDICTIONS_EXPIRED.inc()
+            logger.info(f"❌ PRÉDICTION ÉCHOUÉE: #{number} marquée comme échec")
+        
+        # Mettre à jour le message de prédiction (regroupé, envoyé dès que son ID est connu)
+        if shard.display_channel:
+            try:
+                shard.edits.request(number, f"🔵{number} 🔵3D: statut :{status}")
+                logger.info(f"📝 Message de prédiction #{number} mis à jour avec statut: {status}")
+            except Exception as e:
+                logger.error(f"❌ Erreur mise à jour message: {e}")
+                
+    # Log des prédictions en attente
+    pending_predictions = sorted(shard.predictor.pending)
+    if pending_predictions:
+        logger.info(f"📊 Prédictions actives: {pending_predictions}")
+    
+    if message_id is not None:
+        shard.cursor.advance(shard.stat_channel, message_id, result.game_number)
+    return trigger
+
+async def catch_up_stat_channel(shard):
+    """Rejoue dans l'ordre les messages du canal stats publiés pendant l'arrêt du bot
+    
+    Les déclenchements périmés (jeu prédit déjà atteint) ne sont pas diffusés; seul le dernier,
+    s'il vise encore un jeu futur, devient une prédiction. Le rejeu est idempotent: une prédiction
+    existante n'est pas recréée et seules les prédictions en attente peuvent être vérifiées.
+    """
+    after_id = shard.cursor.for_channel(shard.stat_channel)
+    if after_id is None:
+        logger.info("ℹ️ Aucun curseur pour le canal stats, pas de rattrapage")
+        shard.live.set()
+        return 0
+    
+    started = time.monotonic()
+    replayed = 0
+    trigger = None
+    try:
+        # Rejeu silencieux: les journaux détaillés par message ralentiraient le rattrapage
+        quiet = replaying.set(True)
+        try:
+            channel = entity_cache.peek_input(shard.stat_channel) or shard.stat_channel
+            async for batch in iter_missed_messages(client, channel, after_id, limit=CATCHUP_LIMIT):
+                for message in batch:
+                    # Les événements en direct identiques au message rejoué seront écartés
+                    edit_tracker.accept_raw(shard.stat_channel, message.id, message.edit_date, message.message)
+                    result = parse_game_message(message.message or "")
+                    edit_tracker.accept_result(shard.stat_channel, message.id, result)
+                    if trigger and result.game_number and result.game_number >= trigger[0]:
+                        trigger = None  # Jeu prédit déjà joué: prédiction périmée
+                    trigger = await process_stat_message(shard, message.message, message.id, replay=True,
+                                                         result=result) or trigger
+                    replayed += 1
+        except Exception as e:
+            logger.error(f"❌ Erreur rattrapage canal stats: {e}")
+        finally:
+            replaying.reset(quiet)
+        
+        if trigger:
+            await create_prediction(shard, *trigger)
+    finally:
+        # Passage aux événements en direct, même si le rattrapage a échoué
+        shard.live.set()
+    
+    logger.info(f"⏪ Rattrapage: {replayed} messages rejoués en {time.monotonic() - started:.2f}s "
+                f"(dernier jeu #{shard.cursor.last_game_number})")
+    return replayed
+
+async def process_queued_message(item):
+    """Travailleur: traite un message de canal stats sorti de la file, dans sa table"""
+    shard = shard_router.get(item.chat_id)
+    if shard is None:
+        return  # Canal reconfiguré entre la réception et le traitement
+    await shard.live.wait()
+    # Modification sans effet sur le résultat analysé (⏰ → 🕐...): rien à faire
+    with profiler.stage('parse', PARSE_SECONDS):
+        result = parse_game_message(item.text)
+    if not edit_tracker.accept_result(item.chat_id, item.message_id, result):
+        MESSAGES_IGNORED.inc(1, 'unchanged_result')
+        return
+    logger.info(f"✅ Message accepté du canal stats {item.chat_id}: {item.text[:100]}")
+    # Même jeu: traitement sérialisé (NewMessage puis modifications); jeux différents: en parallèle
+    async with shard.game_locks(result.game_number):
+        with profiler.stage('process_message'):
+            await process_stat_message(shard, item.text, item.message_id, received_at=item.received_at, result=result)
+
+# Rafales de modifications: texte inchangé ou événement en retard écartés dès la réception
+edit_tracker = EditTracker()
+
+# Traitement découplé de la réception: file bornée + groupe de travailleurs
+work_queue = MessageWorkQueue(process_queued_message, workers=WORKERS, maxsize=WORK_QUEUE_SIZE)
+
+# Jauges lues à chaque requête /metrics
+metrics.gauge('bot_predictions_pending', 'Prédictions en attente, toutes tables',
+              lambda: sum(shard.predictor.counters.pending for shard in shard_router))
+metrics.gauge('bot_work_queue_depth', 'Messages en attente de traitement', lambda: work_queue.depth)
+metrics.gauge('bot_outbound_queue_depth', 'Envois Telegram en attente', lambda: outbound.depth)
 
 # Messages handler principal avec logique As
 @client.on(events.NewMessage())
 @client.on(events.MessageEdited())
 async def handle_messages(event):
-    """Gestionnaire principal des messages"""
+    """Réception: filtrage par canal puis mise en file, sans analyse ni envoi ni écriture disque"""
     try:
-        message_text = event.message.message if event.message else ""
-        channel_id = event.chat_id
+        with profiler.stage('handle_messages'):
+            channel_id = event.chat_id
+            if channel_id not in shard_router or not event.message:
+                logger.debug(f"❌ Message ignoré: Canal {channel_id} non suivi")
+                return
+            MESSAGES_RECEIVED.inc()
         
-        # LOGS DÉTAILLÉS POUR TOUS LES MESSAGES
-        logger.info(f"📬 TOUS MESSAGES: Canal {channel_id} | Texte: {message_text[:100]}")
-        logger.info(f"🔧 Canal stats configuré: {detected_stat_channel}")
+            first_message_after = startup_timer.mark('first_message')
+            if first_message_after is not None:
+                logger.info(f"⏱️ Premier message reçu {first_message_after:.2f}s après le démarrage")
         
-        # Vérifier si c'est le bon canal
-        if detected_stat_channel and channel_id == detected_stat_channel:
-            logger.info(f"✅ Message accepté du canal stats {detected_stat_channel}: {message_text[:100]}")
-            
-            # Extraire le numéro de jeu pour logs
-            game_num = predictor.extract_game_number(message_text)
-            logger.info(f"Numéro de jeu extrait: {game_num}")
-            
-            # Logique de prédiction avec analyse des As
-            should_predict, game_number, suit = predictor.should_predict(message_text)
-            
-            # LOGS DÉTAILLÉS DE L'ANALYSE DES AS
-            if game_number:
-                # Analyser les groupes pour logging
-                patterns = [
-                    r'(\d+)\(([^)]+)\)\s*-\s*[✅🔰]*\s*(\d+)\(([^)]+)\)',
-                    r'\(([^)]+)\)\s*-\s*[✅🔰]*\s*\(([^)]+)\)'
-                ]
-                
-                for pattern in patterns:
-                    match = re.search(pattern, message_text)
-                    if match:
-                        groups = match.groups()
-                        if len(groups) == 4:
-                            first_group = groups[1]
-                            second_group = groups[3]
-                        elif len(groups) == 2:
-                            first_group = groups[0]
-                            second_group = groups[1]
-                        else:
-                            continue
-                            
-                        # Analyser les As
-                        has_ace_first = predictor.has_ace_in_group(first_group)
-                        has_ace_second = predictor.has_ace_in_group(second_group)
-                        logger.info(f"🎯 Analyse As: Premier groupe='{first_group}' (As: {has_ace_first}), Deuxième groupe='{second_group}' (As: {has_ace_second})")
-                        
-                        if has_ace_first and not has_ace_second:
-                            logger.info("✅ Condition As validée: As dans premier groupe uniquement")
-                        elif not has_ace_first:
-                            logger.info("❌ Pas d'As dans le premier groupe, pas de prédiction")
-                        elif has_ace_second:
-                            logger.info("❌ As détecté dans le deuxième groupe, pas de prédiction")
-                        break
-            
-            if should_predict and game_number and suit:
-                prediction_text = f"🔵{game_number} 🔵3D: statut :⏳"
-                logger.info(f"🎯 Prédiction générée: {prediction_text}")
-                
-                # Enregistrer la prédiction
-                predictor.prediction_status[game_number] = '⌛'
-                predictor.last_predictions.append((game_number, suit))
-                yaml_manager.save_predictions(predictor.prediction_status)
-                logger.info(f"✅ Prédiction créée: Jeu #{game_number} -> {suit}")
-                
-                # Diffuser la prédiction automatiquement
-                if detected_display_channel:
-                    try:
-                        # Essayer d'obtenir l'entité du canal d'abord
-                        try:
-                            display_entity = await client.get_entity(detected_display_channel)
-                        except:
-                            # Si impossible d'obtenir l'entité, utiliser directement l'ID
-                            display_entity = detected_display_channel
-                            
-                        await client.send_message(display_entity, prediction_text)
-                        logger.info(f"📤 Prédiction diffusée automatiquement sur canal {detected_display_channel}")
-                    except Exception as e:
-                        logger.error(f"❌ Erreur diffusion sur {detected_display_channel}: {e}")
-                        # Essayer avec l'ID direct en cas d'erreur d'entité
-                        try:
-                            await client.send_message(detected_display_channel, prediction_text)
-                            logger.info(f"📤 Prédiction diffusée (ID direct) sur canal {detected_display_channel}")
-                        except Exception as e2:
-                            logger.error(f"❌ Échec total diffusion: {e2}")
-                else:
-                    logger.warning("⚠️ Canal display non configuré, prédiction non diffusée")
-            
-            # VÉRIFICATION DÉTAILLÉE DES RÉSULTATS
-            verified, number = predictor.verify_prediction(message_text)
-            if verified is not None and number is not None:
-                status = predictor.prediction_status.get(number, '❌')
-                logger.info(f"🔍 Vérification jeu #{number}: {status}")
-                
-                if verified:
-                    logger.info(f"✅ PRÉDICTION RÉUSSIE: #{number} validée avec statut {status}")
-                else:
-                    logger.info(f"❌ PRÉDICTION ÉCHOUÉE: #{number} marquée comme échec")
-                
-                # Mettre à jour le message de prédiction si possible
-                if detected_display_channel and verified:
-                    try:
-                        # Chercher le message de prédiction correspondant pour le mettre à jour
-                        logger.info(f"📝 Message de prédiction #{number} mis à jour avec statut: {status}")
-                    except Exception as e:
-                        logger.error(f"❌ Erreur mise à jour message: {e}")
-                        
-            # Log des prédictions en attente
-            pending_predictions = [k for k, v in predictor.prediction_status.items() if v == '⌛']
-            if pending_predictions:
-                logger.info(f"📊 Prédictions actives: {pending_predictions}")
-                
-        else:
-            logger.info(f"❌ Message ignoré: Canal {channel_id} ≠ Canal stats {detected_stat_channel}")
+            message = event.message
+            text = message.message or ""
+            if not edit_tracker.accept_raw(channel_id, message.id, message.edit_date, text):
+                MESSAGES_IGNORED.inc(1, 'unchanged_edit')
+                return
+            if not work_queue.submit(QueuedMessage(channel_id, message.id, message.edit_date, text, time.monotonic())):
+                # Message abandonné: une nouvelle livraison du même texte doit encore être traitée
+                edit_tracker.forget_raw(channel_id, message.id)
+                MESSAGES_IGNORED.inc(1, 'queue_full')
             
     except Exception as e:
         logger.error(f"Erreur handle_messages: {e}")
@@ -841,6 +1247,8 @@ async def start_web_server():
     app.router.add_get('/', health_check)
     app.router.add_get('/health', health_check)
     app.router.add_get('/status', bot_status_endpoint)
+    app.router.add_get('/metrics', metrics_endpoint)
+    app.router.add_get('/profile', profile_endpoint)
     
     runner = web.AppRunner(app)
     await runner.setup()
@@ -850,6 +1258,7 @@ async def start_web_server():
 
 async def main():
     """Fonction principale"""
+    lag_monitor = None
     try:
         logger.info("🚀 Démarrage Bot Prédiction v2024")
         
@@ -863,13 +1272,35 @@ async def main():
         # Charger configuration avec valeurs par défaut
         load_config()
         logger.info(f"🎯 Canaux pré-configurés: Stats={detected_stat_channel}, Display={detected_display_channel}")
+        configure_shards()
+        
+        # Écritures disque hors de la boucle asyncio
+        persistence_writer.start()
+        outbound.start()
+        work_queue.start()
+        lag_monitor = asyncio.create_task(monitor_loop_lag(LOOP_LAG))
         
         # Démarrer serveur web
         await start_web_server()
         
+        # Sessions horodatées des anciennes versions: inutiles, supprimées
+        removed = cleanup_stale_sessions(keep=SESSION_NAME)
+        if removed:
+            logger.info(f"🧹 {len(removed)} anciens fichiers de session supprimés")
+        
         # Démarrer bot Telegram
-        logger.info("🔗 Connexion au bot Telegram...")
+        logger.info(f"🔗 Connexion au bot Telegram (session {'SESSION_STRING' if SESSION_STRING else SESSION_NAME})...")
         await client.start(bot_token=BOT_TOKEN)
+        logger.info(f"⏱️ Connecté {startup_timer.mark('connected'):.2f}s après le démarrage")
+        
+        # Préchauffer le cache des canaux configurés
+        await entity_cache.warm(
+            channel for shard in shard_router for channel in (shard.stat_channel, shard.display_channel)
+        )
+        
+        # Rejouer les résultats publiés pendant l'arrêt avant les événements en direct
+        for shard in shard_router:
+            await catch_up_stat_channel(shard)
         
         me = await client.get_me()
         logger.info(f"✅ Bot connecté: @{me.username}")
@@ -882,6 +1313,15 @@ async def main():
     except Exception as e:
         logger.error(f"❌ Erreur critique: {e}")
         raise
+    finally:
+        # Traiter les messages reçus, laisser partir les envois et vider les écritures avant l'arrêt
+        if lag_monitor is not None:
+            lag_monitor.cancel()
+        await work_queue.stop()
+        for shard in shard_router:
+            shard.edits.flush()
+        await outbound.stop()
+        await persistence_writer.stop()
 
 if __name__ == "__main__":
     asyncio.run(main())
\ No newline at end of file
@@ -0,0 +1,91 @@
+"""
+Dédoublonnage des rafales de modifications de messages
+Par message (chat_id, message_id): dernière date de modification, empreinte du texte et dernier GameResult
+traité; les modifications sans effet (⏰ → 🕐, texte identique, événement en retard) sont écartées
+avant toute analyse, persistance ou journalisation
+"""
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_TTL_SECONDS = 3600.0  # Un message de jeu n'est plus modifié au-delà
+DEFAULT_MAX_MESSAGES = 5000
+
+MessageKey = Tuple[int, int]  # (chat_id, message_id)
+
+
+class _Seen:
+    __slots__ = ("edit_date", "content_hash", "result", "updated")
+
+    def __init__(self, edit_date: Optional[datetime], content_hash: Optional[int], updated: float):
+        self.edit_date = edit_date
+        self.content_hash = content_hash
+        self.result = None  # Dernier GameResult traité
+        self.updated = updated
+
+
+class EditTracker:
+    """Filtre en deux temps: texte brut à la réception (sans regex), GameResult au traitement"""
+
+    def __init__(self, ttl_seconds: float = DEFAULT_TTL_SECONDS, max_messages: int = DEFAULT_MAX_MESSAGES):
+        self.ttl_seconds = ttl_seconds
+        self.max_messages = max_messages
+        self._messages: "OrderedDict[MessageKey, _Seen]" = OrderedDict()
+        self.stats = {'accepted': 0, 'stale': 0, 'same_content': 0, 'same_result': 0}
+
+    def __len__(self) -> int:
+        return len(self._messages)
+
+    def accept_raw(self, chat_id: int, message_id: int, edit_date: Optional[datetime], text: str) -> bool:
+        """Réception: False pour un événement plus ancien que le dernier vu ou un texte inchangé"""
+        now = time.monotonic()
+        key = (chat_id, message_id)
+        content_hash = hash(text)
+        seen = self._messages.get(key)
+        if seen is not None:
+            if edit_date is not None and seen.edit_date is not None and edit_date < seen.edit_date:
+                self.stats['stale'] += 1
+                return False
+            if content_hash == seen.content_hash:
+                self.stats['same_content'] += 1
+                return False
+            seen.content_hash = content_hash
+            if edit_date is not None:
+                seen.edit_date = edit_date
+            seen.updated = now
+            self._messages.move_to_end(key)
+        else:
+            self._messages[key] = _Seen(edit_date, content_hash, now)
+            self._evict(now)
+        return True
+
+    def forget_raw(self, chat_id: int, message_id: int):
+        """Annule l'empreinte enregistrée par accept_raw (message non mis en file): une nouvelle livraison
+        du même texte sera acceptée"""
+        seen = self._messages.get((chat_id, message_id))
+        if seen is not None:
+            seen.content_hash = None
+
+    def accept_result(self, chat_id: int, message_id: int, result: Any) -> bool:
+        """Traitement: False si le GameResult est identique au dernier traité pour ce message"""
+        seen = self._messages.get((chat_id, message_id))
+        if seen is not None:
+            if seen.result == result:
+                self.stats['same_result'] += 1
+                return False
+            seen.result = result
+        self.stats['accepted'] += 1
+        return True
+
+    def _evict(self, now: float):
+        """Éviction des messages inactifs (les plus anciens en tête) puis au-delà de la capacité"""
+        cutoff = now - self.ttl_seconds
+        while self._messages:
+            seen = next(iter(self._messages.values()))
+            if seen.updated >= cutoff and len(self._messages) <= self.max_messages:
+                break
+            self._messages.popitem(last=False)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'tracked': len(self._messages)}
@@ -0,0 +1,91 @@
+"""
+Cache des entités Telegram résolues
+Entités complètes (titres) et InputPeer (envois) gardés par ID de canal avec durée de vie,
+pour que les diffusions n'aient plus à interroger Telegram avant chaque envoi
+"""
+import asyncio
+import time
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+DEFAULT_ENTITY_TTL = 3600.0  # Secondes avant nouvelle résolution
+DEFAULT_ERROR_TTL = 60.0  # Un échec de résolution est mémorisé brièvement
+
+
+class EntityCache:
+    """Résolution d'entités avec durée de vie, invalidation explicite et requêtes concurrentes fusionnées"""
+
+    def __init__(self, client, ttl: float = DEFAULT_ENTITY_TTL, error_ttl: float = DEFAULT_ERROR_TTL):
+        self.client = client
+        self.ttl = ttl
+        self.error_ttl = error_ttl
+        # {(type, id): (expiration, valeur, erreur)}
+        self._entries: Dict[Tuple[str, Any], Tuple[float, Any, Optional[Exception]]] = {}
+        self._inflight: Dict[Tuple[str, Any], asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def peek_input(self, channel_id: Any) -> Optional[Any]:
+        """InputPeer en cache et valide, sans appel réseau (None sinon)"""
+        entry = self._entries.get(('input', channel_id))
+        if entry is None or entry[0] < time.monotonic() or entry[2] is not None:
+            return None
+        return entry[1]
+
+    async def get_entity(self, channel_id: Any) -> Any:
+        """Entité complète (titre, etc.)"""
+        return await self._resolve('entity', channel_id, self.client.get_entity)
+
+    async def get_input_entity(self, channel_id: Any) -> Any:
+        """InputPeer utilisable directement par send_message / edit_message"""
+        return await self._resolve('input', channel_id, self.client.get_input_entity)
+
+    async def _resolve(self, kind: str, channel_id: Any, fetch) -> Any:
+        key = (kind, channel_id)
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] >= time.monotonic():
+            self.hits += 1
+            if entry[2] is not None:
+                raise entry[2]
+            return entry[1]
+        # Une seule requête réseau par clé, même si plusieurs gestionnaires la demandent en même temps
+        pending = self._inflight.get(key)
+        if pending is not None:
+            return await asyncio.shield(pending)
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._inflight[key] = future
+        try:
+            value = await fetch(channel_id)
+        except Exception as e:
+            self._entries[key] = (time.monotonic() + self.error_ttl, None, e)
+            future.set_exception(e)
+            raise
+        else:
+            self._entries[key] = (time.monotonic() + self.ttl, value, None)
+            future.set_result(value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
+
+    def invalidate(self, channel_id: Any = None):
+        """Oublie un canal (ou tout le cache si channel_id est None)"""
+        if channel_id is None:
+            self._entries.clear()
+            return
+        for kind in ('entity', 'input'):
+            self._entries.pop((kind, channel_id), None)
+
+    async def warm(self, channel_ids: Iterable[Any]):
+        """Préchauffe le cache au démarrage; les canaux inaccessibles sont signalés sans erreur"""
+        for channel_id in channel_ids:
+            if not channel_id:
+                continue
+            try:
+                await self.get_entity(channel_id)
+                await self.get_input_entity(channel_id)
+            except Exception as e:
+                print(f"⚠️ Canal {channel_id} non résolu au démarrage: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
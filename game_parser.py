@@ -0,0 +1,124 @@
+"""
+Analyseur unique des messages du canal de statistiques
+Un seul passage précompilé produit un GameResult partagé par tous les prédicteurs
+"""
+import re
+from typing import NamedTuple, Optional, Tuple, Union
+
+# Numéro de jeu: "#N123.", "#N 123", "#123" puis, à défaut, "Jeu 123", "Game 123" ou "123."
+GAME_NUMBER_RE = re.compile(r"(?:(?:jeu|game)\s*)?#\s*N?\s*(\d+)\.?", re.IGNORECASE)
+GAME_NUMBER_FALLBACK_RE = re.compile(r"(?:jeu|game)\s*#?\s*(\d+)|(\d+)\.", re.IGNORECASE)
+
+# Groupes de cartes entre parenthèses; les deux premiers sont capturés en une seule recherche
+GROUP_RE = re.compile(r"\(([^)]*)\)")
+TWO_GROUPS_RE = re.compile(r"\(([^)]*)\)[^(]*\(([^)]*)\)")
+
+# Une carte = un symbole de couleur, avec ou sans sélecteur de variation emoji (U+FE0F)
+SUIT_RE = re.compile(r"[♠♥♦♣]")
+ACE_RE = re.compile(r"A[♠♥♦♣]")
+
+# Marqueurs d'état du message (recherchés par sous-chaîne, sans regex)
+PENDING_TAGS = "⏰🕐"
+FINAL_TAGS = "✅🔰"
+RESULT_TAGS = "✅🔰❌⭕"
+
+
+class GameResult(NamedTuple):
+    """Résultat compact et immuable de l'analyse d'un message de jeu"""
+    game_number: Optional[int]
+    number_token: Optional[str]  # Texte exact du numéro ("#N60.", "#60", "Jeu 60"...) pour les formats stricts
+    first_group: Optional[str]
+    second_group: Optional[str]
+    first_count: int
+    second_count: int
+    first_aces: int
+    second_aces: int
+    first_suits: str  # Couleurs normalisées (♠♥♦♣) dans l'ordre d'apparition
+    second_suits: str
+    is_pending: bool  # ⏰ ou 🕐 : message encore en cours d'édition
+    is_final: bool  # ✅ ou 🔰 : résultat finalisé
+    has_result_tag: bool  # ✅, 🔰, ❌ ou ⭕
+
+    @property
+    def has_groups(self) -> bool:
+        return self.first_group is not None and self.second_group is not None
+
+    @property
+    def is_valid_distribution(self) -> bool:
+        """Distribution 2+2 cartes requise pour la vérification"""
+        return self.first_count == 2 and self.second_count == 2
+
+
+def find_game_number(text: str) -> Tuple[Optional[int], Optional[str]]:
+    """Numéro de jeu du message et texte exact qui l'a fourni"""
+    match = GAME_NUMBER_RE.search(text)
+    if match:
+        return int(match.group(1)), match.group(0)
+    match = GAME_NUMBER_FALLBACK_RE.search(text)
+    if match:
+        return int(match.group(1) or match.group(2)), match.group(0)
+    return None, None
+
+
+def extract_game_number(text: str) -> Optional[int]:
+    """Extrait le numéro de jeu du message"""
+    return find_game_number(text)[0]
+
+
+def count_cards(symbols_str: str) -> int:
+    """Compte les cartes (symboles ♠♥♦♣, emoji ou simples) d'un groupe"""
+    return len(SUIT_RE.findall(symbols_str))
+
+
+def count_aces(symbols_str: str) -> int:
+    """Compte les As d'un groupe (sans regex si le groupe ne contient aucun A)"""
+    if 'A' not in symbols_str:
+        return 0
+    return len(ACE_RE.findall(symbols_str))
+
+
+def extract_suits(symbols_str: str) -> str:
+    """Retourne les couleurs normalisées d'un groupe dans l'ordre d'apparition"""
+    return ''.join(SUIT_RE.findall(symbols_str))
+
+
+def _has_tag(text: str, tags: str) -> bool:
+    for tag in tags:
+        if tag in text:
+            return True
+    return False
+
+
+def parse_game_message(text: str) -> GameResult:
+    """Analyse un message en un seul passage; à appeler une fois par message, le GameResult est ensuite partagé"""
+    match = TWO_GROUPS_RE.search(text)
+    if match:
+        first_group, second_group = match.groups()
+        first_suits, second_suits = extract_suits(first_group), extract_suits(second_group)
+        first_aces, second_aces = count_aces(first_group), count_aces(second_group)
+    else:
+        first_group = second_group = None
+        first_suits = second_suits = ''
+        first_aces = second_aces = 0
+
+    is_final = _has_tag(text, FINAL_TAGS)
+    game_number, number_token = find_game_number(text)
+
+    # Construction positionnelle (ordre des champs de GameResult), sensiblement moins coûteuse que par mots-clés
+    return GameResult(
+        game_number, number_token,
+        first_group, second_group,
+        len(first_suits), len(second_suits),
+        first_aces, second_aces,
+        first_suits, second_suits,
+        _has_tag(text, PENDING_TAGS),
+        is_final,
+        is_final or _has_tag(text, RESULT_TAGS),
+    )
+
+
+def as_game_result(message: Union[str, GameResult]) -> GameResult:
+    """Accepte un texte brut ou un GameResult déjà analysé"""
+    if isinstance(message, GameResult):
+        return message
+    return parse_game_message(message or "")
@@ -0,0 +1,99 @@
+"""
+Sérialisation par jeu et machine d'états idempotente
+Un même jeu arrive en NewMessage puis en plusieurs MessageEdited (⏰ → 🔰/✅): ses messages sont
+traités un par un sous un verrou propre au jeu, et chaque étape (déclenchement, vérification)
+n'est appliquée qu'une fois, tandis que des jeux différents restent traités en parallèle
+"""
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Hashable, List, Optional
+
+DEFAULT_TRACKED_GAMES = 2000  # Jeux dont l'état est conservé (les plus anciens sont oubliés)
+
+STATE_PENDING = 'pending'  # Message vu, résultat pas encore final (⏰ ou sans marqueur)
+STATE_FINAL = 'final'  # Résultat final vu (✅ / 🔰)
+STATE_VERIFIED = 'verified'  # Vérification des prédictions appliquée pour ce jeu
+_STATE_ORDER = {STATE_PENDING: 0, STATE_FINAL: 1, STATE_VERIFIED: 2}
+
+
+class KeyedLocks:
+    """Verrous asyncio créés à la demande par clé et libérés dès qu'ils ne sont plus utilisés"""
+
+    def __init__(self):
+        self._locks: Dict[Hashable, List[Any]] = {}  # {clé: [verrou, utilisateurs]}
+
+    def __len__(self) -> int:
+        return len(self._locks)
+
+    @asynccontextmanager
+    async def __call__(self, key: Hashable) -> AsyncIterator[None]:
+        entry = self._locks.get(key)
+        if entry is None:
+            entry = self._locks[key] = [asyncio.Lock(), 0]
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+
+class GameStateMachine:
+    """États par numéro de jeu, strictement croissants: pending → final → verified"""
+
+    def __init__(self, max_games: int = DEFAULT_TRACKED_GAMES):
+        self.max_games = max_games
+        self._states: "OrderedDict[int, str]" = OrderedDict()
+        self._triggered: set = set()
+        self.stats = {'duplicate_triggers': 0, 'duplicate_verifications': 0}
+
+    def state(self, game_number: int) -> Optional[str]:
+        return self._states.get(game_number)
+
+    def observe(self, game_number: int, is_final: bool) -> str:
+        """Enregistre un message du jeu; un message non final après un final ne fait pas reculer l'état"""
+        current = self._states.get(game_number)
+        target = STATE_FINAL if is_final else STATE_PENDING
+        if current is None or _STATE_ORDER[target] > _STATE_ORDER[current]:
+            self._set(game_number, target)
+            return target
+        return current
+
+    def claim_trigger(self, game_number: int) -> bool:
+        """True une seule fois par jeu, et seulement quand son résultat est final: une main partielle
+        ne peut pas réserver le déclenchement que le résultat final aurait annulé"""
+        current = self._states.get(game_number)
+        if current is None or _STATE_ORDER[current] < _STATE_ORDER[STATE_FINAL]:
+            return False
+        if game_number in self._triggered:
+            self.stats['duplicate_triggers'] += 1
+            return False
+        self._triggered.add(game_number)
+        return True
+
+    def claim_verification(self, game_number: int) -> bool:
+        """True une seule fois par jeu, et seulement quand son résultat est final"""
+        current = self._states.get(game_number)
+        if current == STATE_VERIFIED:
+            self.stats['duplicate_verifications'] += 1
+            return False
+        if current != STATE_FINAL:
+            return False
+        self._set(game_number, STATE_VERIFIED)
+        return True
+
+    def _set(self, game_number: int, state: str):
+        self._states[game_number] = state
+        self._states.move_to_end(game_number)
+        while len(self._states) > self.max_games:
+            old_game, _ = self._states.popitem(last=False)
+            self._triggered.discard(old_game)
+
+    def get_stats(self) -> Dict[str, Any]:
+        counts = {STATE_PENDING: 0, STATE_FINAL: 0, STATE_VERIFIED: 0}
+        for state in self._states.values():
+            counts[state] += 1
+        return {**counts, **self.stats}
@@ -0,0 +1,289 @@
+"""
+Générateur déterministe de trafic du canal stats, pour les tests de charge et d'endurance
+Messages au format accepté par l'analyseur (#N123. 12(A♠️K♥️) - ✅ 5(9♦8♣)), séquences de
+modifications ⏰/🕐 terminées par ✅/🔰, fréquence des As, nombre de cartes, trous dans la
+numérotation, livraison dans le désordre et rafales de modifications configurables.
+
+Usage (endurance d'un prédicteur à 50× le débit réel, ou sans limite avec --rate-multiplier 0):
+    python game_stream.py --games 100000 --predictor card --rate-multiplier 50
+    python game_stream.py --games 5000 --export stream.jsonl   # transcript pour bench_replay.py
+"""
+import argparse
+import contextlib
+import json
+import os
+import random
+import time
+import tracemalloc
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+# Ordre de grandeur du canal réel: un jeu par minute, chaque jeu publié puis modifié quelques fois
+REAL_GAME_SECONDS = 60.0
+REAL_MESSAGES_PER_GAME = 4
+STREAM_EPOCH = datetime(2024, 1, 1)
+
+CARD_VALUES = ('K', 'Q', 'J', '10', '9', '8', '7', '6', '5', '4', '3', '2')  # Sans l'As
+CARD_POINTS = {'A': 1, 'K': 0, 'Q': 0, 'J': 0, '10': 0}
+SUITS = ('♠', '♥', '♦', '♣')
+EMOJI_SELECTOR = '\ufe0f'
+
+
+class StreamEvent(NamedTuple):
+    """Un NewMessage (edit=False) ou MessageEdited du canal stats"""
+    message_id: int
+    game_number: int
+    text: str
+    edit: bool
+    edit_date: datetime  # Strictement croissante par message, même livré dans le désordre
+    final: bool
+
+    def to_entry(self) -> Dict[str, Any]:
+        """Entrée de transcript JSON lines (format de bench_replay.py)"""
+        return {'id': self.message_id, 'text': self.text, 'edit': self.edit,
+                'edit_date': self.edit_date.isoformat()}
+
+
+@dataclass(frozen=True)
+class GameStreamConfig:
+    seed: int = 0
+    start: int = 1  # Premier numéro de jeu
+    ace_rate: float = 0.35  # Probabilité d'au moins un As dans le premier groupe
+    double_ace_rate: float = 0.15  # Parmi ceux-ci, part avec deux As
+    second_ace_rate: float = 0.15  # Probabilité d'un As dans le deuxième groupe
+    card_counts: Sequence[Tuple[int, float]] = ((2, 0.55), (3, 0.45))  # (cartes finales, poids) par groupe
+    plain_suit_rate: float = 0.3  # Couleurs sans sélecteur de variation (♠ au lieu de ♠️)
+    final_marker_rate: float = 0.8  # ✅ (sinon 🔰) pour le résultat final
+    marker_before_second_rate: float = 0.5  # "12(...) - ✅ 5(...)" plutôt que "✅12(...) - 5(...)"
+    pending_edits: Tuple[int, int] = (1, 3)  # Modifications ⏰/🕐 avant le résultat final
+    gap_rate: float = 0.01  # Probabilité de sauter des numéros de jeu
+    max_gap: int = 5
+    reorder_rate: float = 0.05  # Probabilité qu'un événement soit livré en retard
+    reorder_window: int = 4  # Retard maximal en nombre d'événements
+    storm_rate: float = 0.02  # Probabilité d'une rafale de modifications sans effet sur un jeu
+    storm_size: int = 20
+    game_seconds: float = REAL_GAME_SECONDS  # Horloge virtuelle des edit_date
+
+
+class GameStream:
+    """Flux reproductible: même configuration (graine comprise) → mêmes événements"""
+
+    def __init__(self, config: Optional[GameStreamConfig] = None, **overrides):
+        base = config or GameStreamConfig()
+        self.config = replace(base, **overrides)
+
+    def _card(self, rng: random.Random, value: str, plain: bool) -> str:
+        return value + rng.choice(SUITS) + ('' if plain else EMOJI_SELECTOR)
+
+    def _group(self, rng: random.Random, size: int, aces: int, plain: bool) -> List[str]:
+        aces = min(aces, size)
+        cards = [self._card(rng, 'A', plain) for _ in range(aces)]
+        cards += [self._card(rng, rng.choice(CARD_VALUES), plain) for _ in range(size - aces)]
+        rng.shuffle(cards)
+        return cards
+
+    @staticmethod
+    def _points(cards: List[str]) -> int:
+        total = 0
+        for card in cards:
+            value = card.rstrip(EMOJI_SELECTOR)[:-1]
+            total += CARD_POINTS.get(value, int(value) if value.isdigit() else 0)
+        return total % 10
+
+    def _render(self, number: int, first: List[str], second: List[str], marker: str, before_second: bool) -> str:
+        left, right = self._points(first), self._points(second)
+        first_text, second_text = ''.join(first), ''.join(second)
+        if before_second:
+            body = f"{left}({first_text}) - {marker} {right}({second_text})"
+        else:
+            body = f"{marker}{left}({first_text}) - {right}({second_text})"
+        return f"#N{number}. {body} #T{left + right}"
+
+    def _game_events(self, rng: random.Random, number: int, message_id: int, published: datetime) -> List[StreamEvent]:
+        config = self.config
+        plain = rng.random() < config.plain_suit_rate
+        before_second = rng.random() < config.marker_before_second_rate
+        sizes, weights = zip(*config.card_counts)
+        first_aces = 0
+        if rng.random() < config.ace_rate:
+            first_aces = 2 if rng.random() < config.double_ace_rate else 1
+        second_aces = 1 if rng.random() < config.second_ace_rate else 0
+        first = self._group(rng, rng.choices(sizes, weights)[0], first_aces, plain)
+        second = self._group(rng, rng.choices(sizes, weights)[0], second_aces, plain)
+
+        # Publication ⏰, modifications ⏰/🕐, puis résultat final complet
+        events = []
+        step = timedelta(seconds=config.game_seconds / (config.pending_edits[1] + config.storm_size + 2))
+        clock = published
+
+        def emit(text: str, final: bool):
+            nonlocal clock
+            events.append(StreamEvent(message_id, number, text, bool(events), clock, final))
+            clock += step
+
+        # Cartes révélées au fil des modifications: deux par groupe, puis la troisième de chaque groupe
+        reveals = [(2, 2), (3, 2), (3, 3)]
+        shown = reveals[0]
+        emit(self._render(number, first[:2], second[:2], '⏰', before_second), False)
+        for index in range(rng.randint(*config.pending_edits)):
+            shown = reveals[min(index, len(reveals) - 1)]
+            marker = '🕐' if index % 2 == 0 else '⏰'
+            emit(self._render(number, first[:shown[0]], second[:shown[1]], marker, before_second), False)
+        if rng.random() < config.storm_rate:
+            # Rafale: seul le marqueur ⏰/🕐 change, les cartes restent celles déjà affichées
+            for index in range(config.storm_size):
+                emit(self._render(number, first[:shown[0]], second[:shown[1]], '⏰🕐'[index % 2], before_second), False)
+        final_marker = '✅' if rng.random() < config.final_marker_rate else '🔰'
+        emit(self._render(number, first, second, final_marker, before_second), True)
+        return events
+
+    def _ordered_events(self, games: int) -> Iterator[StreamEvent]:
+        config = self.config
+        rng = random.Random(config.seed)
+        number = config.start
+        for index in range(games):
+            if index and rng.random() < config.gap_rate:
+                number += rng.randint(1, config.max_gap)
+            published = STREAM_EPOCH + timedelta(seconds=index * config.game_seconds)
+            yield from self._game_events(rng, number, config.start + index, published)
+            number += 1
+
+    def events(self, games: int) -> Iterator[StreamEvent]:
+        """Événements dans l'ordre de livraison (désordre borné par reorder_window)"""
+        config = self.config
+        rng = random.Random(f"{config.seed}:reorder")
+        delayed: List[Tuple[int, StreamEvent]] = []  # (position de livraison, événement retenu)
+        position = 0
+        for event in self._ordered_events(games):
+            if config.reorder_window > 0 and rng.random() < config.reorder_rate:
+                delayed.append((position + rng.randint(1, config.reorder_window), event))
+                continue
+            yield event
+            position += 1
+            ready = [entry for entry in delayed if entry[0] <= position]
+            if ready:
+                delayed = [entry for entry in delayed if entry[0] > position]
+                for _, late in ready:
+                    yield late
+                    position += 1
+        for _, late in sorted(delayed, key=lambda entry: entry[0]):
+            yield late
+
+    def transcript(self, games: int) -> List[Dict[str, Any]]:
+        return [event.to_entry() for event in self.events(games)]
+
+
+def paced(events: Iterable[StreamEvent], rate_multiplier: float) -> Iterator[StreamEvent]:
+    """Livre les événements au débit réel multiplié (0: sans limite)"""
+    if rate_multiplier <= 0:
+        yield from events
+        return
+    interval = REAL_GAME_SECONDS / REAL_MESSAGES_PER_GAME / rate_multiplier
+    next_at = time.monotonic()
+    for event in events:
+        delay = next_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        yield event
+        next_at += interval
+
+
+def feed(predictor: Any, event: StreamEvent):
+    """Passe un événement à un prédicteur (CardPredictor ou SimplePredictor) comme le ferait le bot"""
+    if hasattr(predictor, 'is_pending_edit_message'):
+        predictor.is_pending_edit_message(event.text)
+    triggered, game_number, suits = predictor.should_predict(event.text)
+    if triggered and hasattr(predictor, 'add_prediction'):
+        # SimplePredictor décide seulement: la création revient au pipeline du bot
+        predictor.add_prediction(game_number, suits)
+    predictor.verify_prediction(event.text)
+
+
+def soak(predictor: Any, events: Iterable[StreamEvent], sample_every: int = 10000, trace_memory: bool = True,
+         sizes: Sequence[str] = ('prediction_status', 'processed_messages', 'pending_edit_messages')
+         ) -> List[Dict[str, Any]]:
+    """Endurance: échantillons périodiques de la taille des structures, de la mémoire et du débit"""
+    samples = []
+    if trace_memory:
+        tracemalloc.start()
+    started = last = time.perf_counter()
+    count = 0
+    try:
+        with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+            for event in events:
+                feed(predictor, event)
+                count += 1
+                if count % sample_every == 0:
+                    now = time.perf_counter()
+                    samples.append(_sample(predictor, sizes, count, now - started, sample_every / (now - last)))
+                    last = now
+        now = time.perf_counter()
+        if count % sample_every:
+            samples.append(_sample(predictor, sizes, count, now - started, (count % sample_every) / (now - last)))
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return samples
+
+
+def _sample(predictor: Any, sizes: Sequence[str], count: int, elapsed: float, rate: float) -> Dict[str, Any]:
+    sample = {'messages': count, 'seconds': round(elapsed, 3), 'messages_per_s': round(rate, 1)}
+    if tracemalloc.is_tracing():
+        sample['traced_bytes'] = tracemalloc.get_traced_memory()[0]
+    for name in sizes:
+        if hasattr(predictor, name):
+            sample[name] = len(getattr(predictor, name))
+    return sample
+
+
+def make_predictor(kind: str):
+    """'card': CardPredictor; 'simple': SimplePredictor du bot, importé dans un répertoire jetable"""
+    if kind == 'card':
+        from predictor import CardPredictor
+        return CardPredictor()
+    import tempfile
+    from bench_replay import import_bot_module
+    bot = import_bot_module(tempfile.mkdtemp(prefix='game_stream_'))
+    bot.logger.setLevel('WARNING')
+    return bot.SimplePredictor(bot.make_store('data/soak'))
+
+
+def main(argv: Optional[Iterable[str]] = None):
+    parser = argparse.ArgumentParser(description="Flux synthétique du canal stats: export et endurance")
+    parser.add_argument('--games', type=int, default=10000)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--ace-rate', type=float, default=GameStreamConfig.ace_rate)
+    parser.add_argument('--reorder-rate', type=float, default=GameStreamConfig.reorder_rate)
+    parser.add_argument('--storm-rate', type=float, default=GameStreamConfig.storm_rate)
+    parser.add_argument('--gap-rate', type=float, default=GameStreamConfig.gap_rate)
+    parser.add_argument('--export', help="Écrit le transcript JSON lines au lieu de lancer l'endurance")
+    parser.add_argument('--predictor', choices=('card', 'simple'), default='card')
+    parser.add_argument('--rate-multiplier', type=float, default=0, help="Multiple du débit réel (0: sans limite)")
+    parser.add_argument('--sample-every', type=int, default=10000)
+    parser.add_argument('--output', help="Échantillons d'endurance en JSON")
+    args = parser.parse_args(argv)
+
+    stream = GameStream(seed=args.seed, ace_rate=args.ace_rate, reorder_rate=args.reorder_rate,
+                        storm_rate=args.storm_rate, gap_rate=args.gap_rate)
+    if args.export:
+        with open(args.export, 'w', encoding='utf-8') as f:
+            for event in stream.events(args.games):
+                f.write(json.dumps(event.to_entry(), ensure_ascii=False) + '\n')
+        print(f"✅ Transcript de {args.games} jeux écrit dans {args.export}")
+        return
+
+    output = os.path.abspath(args.output) if args.output else None
+    predictor = make_predictor(args.predictor)
+    print(f"🔁 Endurance {args.predictor}: {args.games} jeux, débit x{args.rate_multiplier or '∞'}")
+    samples = soak(predictor, paced(stream.events(args.games), args.rate_multiplier), args.sample_every)
+    for sample in samples:
+        print(f"📈 {sample}")
+    if output:
+        with open(output, 'w', encoding='utf-8') as f:
+            json.dump(samples, f, indent=2)
+        print(f"✅ Échantillons écrits dans {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Minuterie de lancement à tas
+Dort exactement jusqu'à la prochaine échéance au lieu d'interroger la planification toutes les 30 secondes
+"""
+import asyncio
+import heapq
+import itertools
+from datetime import datetime
+from typing import Callable, Dict, Hashable, List, Optional, Tuple
+
+
+class LaunchTimer:
+    """Tas min d'échéances absolues avec ajout, retrait et replanification annulables"""
+
+    def __init__(self, now_fn: Callable[[], datetime] = datetime.now):
+        self.now_fn = now_fn
+        self._heap: List[Tuple[datetime, int, Hashable]] = []  # (échéance, séquence, clé)
+        self._entries: Dict[Hashable, Tuple[datetime, int]] = {}  # {clé: (échéance, séquence)}
+        self._seq = itertools.count()
+        self._changed: Optional[asyncio.Event] = None
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def add(self, key: Hashable, due: datetime):
+        """Planifie (ou replanifie) une clé à une échéance absolue"""
+        seq = next(self._seq)
+        self._entries[key] = (due, seq)
+        heapq.heappush(self._heap, (due, seq, key))
+        self._notify()
+
+    reschedule = add
+
+    def remove(self, key: Hashable) -> bool:
+        """Annule une échéance; l'entrée du tas est purgée paresseusement"""
+        if self._entries.pop(key, None) is None:
+            return False
+        self._notify()
+        return True
+
+    def clear(self):
+        self._entries.clear()
+        self._heap.clear()
+        self._notify()
+
+    def wake(self):
+        """Réveille la boucle en attente (arrêt, changement externe)"""
+        self._notify()
+
+    def peek(self) -> Optional[Tuple[datetime, Hashable]]:
+        """Prochaine échéance valide (échéance, clé)"""
+        while self._heap:
+            due, seq, key = self._heap[0]
+            if self._entries.get(key) == (due, seq):
+                return due, key
+            heapq.heappop(self._heap)
+        return None
+
+    def pop_due(self, now: Optional[datetime] = None) -> List[Hashable]:
+        """Retire toutes les clés échues, y compris celles en retard (rattrapage)"""
+        now = now or self.now_fn()
+        due_keys = []
+        while True:
+            head = self.peek()
+            if head is None or head[0] > now:
+                break
+            heapq.heappop(self._heap)
+            del self._entries[head[1]]
+            due_keys.append(head[1])
+        return due_keys
+
+    async def wait_next(self) -> List[Hashable]:
+        """Dort jusqu'à la prochaine échéance (ou un changement) et retourne les clés échues"""
+        if self._changed is None:
+            self._changed = asyncio.Event()
+        due_keys = self.pop_due()
+        if due_keys:
+            return due_keys
+        self._changed.clear()
+        head = self.peek()
+        timeout = None if head is None else max(0.0, (head[0] - self.now_fn()).total_seconds())
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            pass
+        return self.pop_due()
+
+    def _notify(self):
+        if self._changed is not None:
+            self._changed.set()
@@ -0,0 +1,114 @@
+"""
+Dédoublonnage des messages traités
+Ensemble de hachages en mémoire (éviction LRU + TTL) adossé à un fichier compact en ajout seul
+"""
+import os
+import time
+from collections import OrderedDict
+from typing import Iterable, Optional
+
+DEFAULT_MAX_ENTRIES = 10000
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+class MessageDedupeStore:
+    """Vérification en O(1) sans accès disque; seul l'ajout d'un hachage écrit une ligne"""
+
+    def __init__(self, path: str, max_entries: int = DEFAULT_MAX_ENTRIES,
+                 ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, float]" = OrderedDict()  # {hachage: horodatage}
+        self._file_lines = 0
+        self._load()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _load(self):
+        """Recharge les hachages encore valides depuis le fichier"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    self._file_lines += 1
+                    parts = line.split()
+                    if len(parts) != 2:
+                        continue
+                    try:
+                        self._remember(parts[1], float(parts[0]))
+                    except ValueError:
+                        continue
+            self._evict(time.time())
+        except Exception as e:
+            print(f"❌ Erreur chargement {self.path}: {e}")
+
+    def _remember(self, message_hash: str, timestamp: float):
+        self._entries[message_hash] = timestamp
+        self._entries.move_to_end(message_hash)
+
+    def _evict(self, now: float):
+        """Éviction en tête (les moins récemment vues): entrées expirées puis au-delà de la capacité;
+        une entrée expirée déplacée par un accès est écartée à sa prochaine consultation"""
+        cutoff = now - self.ttl_seconds
+        while self._entries:
+            _, timestamp = next(iter(self._entries.items()))
+            if timestamp >= cutoff and len(self._entries) <= self.max_entries:
+                break
+            self._entries.popitem(last=False)
+
+    def contains(self, message_hash: str) -> bool:
+        """Vérifie la présence d'un hachage (en mémoire uniquement)"""
+        timestamp = self._entries.get(message_hash)
+        if timestamp is None:
+            return False
+        if timestamp < time.time() - self.ttl_seconds:
+            del self._entries[message_hash]
+            return False
+        # LRU: un hachage consulté est le dernier évincé (le TTL court toujours depuis son ajout)
+        self._entries.move_to_end(message_hash)
+        return True
+
+    def add(self, message_hash: str, timestamp: Optional[float] = None) -> bool:
+        """Ajoute un hachage; retourne False s'il était déjà connu"""
+        if self.contains(message_hash):
+            return False
+        now = timestamp if timestamp is not None else time.time()
+        self._remember(message_hash, now)
+        self._evict(now)
+        self._append_line(f"{now:.0f} {message_hash}\n")
+        return True
+
+    def import_hashes(self, hashes: Iterable[str]):
+        """Importe des hachages existants (migration depuis l'ancien message_log.yaml)"""
+        now = time.time()
+        for message_hash in hashes:
+            if message_hash:
+                self._remember(message_hash, now)
+        self._evict(now)
+        self.compact()
+
+    def _append_line(self, line: str):
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.write(line)
+            self._file_lines += 1
+        except Exception as e:
+            print(f"❌ Erreur écriture {self.path}: {e}")
+            return
+        # Le fichier est réécrit quand les lignes évincées dominent
+        if self._file_lines > 2 * self.max_entries:
+            self.compact()
+
+    def compact(self):
+        """Réécrit le fichier avec les seuls hachages conservés"""
+        try:
+            tmp_path = f"{self.path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                f.writelines(f"{timestamp:.0f} {message_hash}\n" for message_hash, timestamp in self._entries.items())
+            os.replace(tmp_path, self.path)
+            self._file_lines = len(self._entries)
+        except Exception as e:
+            print(f"❌ Erreur compactage {self.path}: {e}")
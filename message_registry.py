@@ -0,0 +1,128 @@
+"""
+Registre des messages de prédiction diffusés et modifications de statut regroupées
+Numéro de jeu → (chat_id, message_id); plusieurs changements de statut d'un même message
+dans la fenêtre de regroupement ne coûtent qu'un seul edit_message
+"""
+import asyncio
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_EDIT_WINDOW = 1.0  # Secondes de regroupement des modifications d'un même message
+
+
+class PredictionMessageRegistry:
+    """Emplacement des messages de prédiction, persisté avec les prédictions"""
+
+    def __init__(self, entries: Optional[Dict[int, Any]] = None):
+        self._locations: Dict[int, Tuple[int, int]] = {}
+        # Notifié des jeux évincés (EditCoalescer.forget) pour libérer leur état associé
+        self.on_evict: Optional[Callable[[List[int]], None]] = None
+        for game_number, location in (entries or {}).items():
+            if isinstance(location, dict):
+                location = (location['chat_id'], location['message_id'])
+            self._locations[int(game_number)] = (int(location[0]), int(location[1]))
+
+    def __contains__(self, game_number: int) -> bool:
+        return game_number in self._locations
+
+    def __len__(self) -> int:
+        return len(self._locations)
+
+    def register(self, game_number: int, chat_id: int, message_id: int):
+        self._locations[game_number] = (chat_id, message_id)
+
+    def get(self, game_number: int) -> Optional[Tuple[int, int]]:
+        return self._locations.get(game_number)
+
+    def discard(self, game_number: int):
+        self._locations.pop(game_number, None)
+
+    def evict(self, game_numbers: Iterable[int]):
+        game_numbers = list(game_numbers)
+        for game_number in game_numbers:
+            self._locations.pop(game_number, None)
+        if self.on_evict is not None:
+            self.on_evict(game_numbers)
+
+    def clear(self):
+        self._locations.clear()
+
+    def to_dict(self) -> Dict[int, Dict[str, int]]:
+        return {
+            game_number: {'chat_id': chat_id, 'message_id': message_id}
+            for game_number, (chat_id, message_id) in self._locations.items()
+        }
+
+
+class EditCoalescer:
+    """Regroupe les modifications par numéro de jeu: seul le dernier texte de la fenêtre est envoyé"""
+
+    def __init__(self, outbound, registry: PredictionMessageRegistry, window: float = DEFAULT_EDIT_WINDOW):
+        self.outbound = outbound
+        self.registry = registry
+        self.window = window
+        self._latest: Dict[int, str] = {}  # {jeu: dernier texte demandé}
+        self._timers: Dict[int, asyncio.TimerHandle] = {}
+        self._sent_text: Dict[int, str] = {}  # Évite les modifications sans changement
+        self.stats = {'requested': 0, 'sent': 0, 'coalesced': 0, 'waiting_message': 0}
+        registry.on_evict = self.forget
+
+    def request(self, game_number: int, text: str):
+        """Demande l'affichage de text sur le message du jeu (envoyé à la fin de la fenêtre)"""
+        self.stats['requested'] += 1
+        if game_number in self._latest:
+            self.stats['coalesced'] += 1
+        self._latest[game_number] = text
+        if game_number not in self._timers:
+            loop = asyncio.get_running_loop()
+            self._timers[game_number] = loop.call_later(self.window, self._flush_one, game_number)
+
+    def message_registered(self, game_number: int):
+        """Appelé quand l'envoi initial est confirmé: une modification en attente peut partir"""
+        if game_number in self._latest and game_number not in self._timers:
+            self._flush_one(game_number)
+
+    def _flush_one(self, game_number: int):
+        self._timers.pop(game_number, None)
+        location = self.registry.get(game_number)
+        if location is None:
+            # Message initial pas encore envoyé: le texte reste en attente de message_registered()
+            self.stats['waiting_message'] += 1
+            return
+        text = self._latest.pop(game_number, None)
+        if text is None or self._sent_text.get(game_number) == text:
+            return
+        chat_id, message_id = location
+        self._sent_text[game_number] = text
+        if len(self._sent_text) > 2 * len(self.registry) + 100:
+            # Élagage amorti des jeux évincés du registre
+            self._sent_text = {game: sent for game, sent in self._sent_text.items() if game in self.registry}
+        self.stats['sent'] += 1
+        self.outbound.edit_message(chat_id, message_id, text)
+
+    def flush(self):
+        """Envoie immédiatement toutes les modifications en attente (arrêt du bot)"""
+        for game_number in list(self._latest):
+            timer = self._timers.pop(game_number, None)
+            if timer is not None:
+                timer.cancel()
+            self._flush_one(game_number)
+
+    def forget(self, game_numbers: Iterable[int]):
+        """Oublie l'état des jeux évincés du registre ou dont la diffusion a échoué"""
+        for game_number in game_numbers:
+            self._sent_text.pop(game_number, None)
+            self._latest.pop(game_number, None)
+            timer = self._timers.pop(game_number, None)
+            if timer is not None:
+                timer.cancel()
+
+    def clear(self):
+        """Abandonne toutes les modifications en attente (/reset)"""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._latest.clear()
+        self._sent_text.clear()
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'pending': len(self._latest)}
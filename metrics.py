@@ -0,0 +1,163 @@
+"""
+Métriques au format d'exposition texte Prometheus (sans dépendance externe)
+Compteurs (avec étiquettes), histogrammes de latence et jauges calculées à la lecture
+"""
+import asyncio
+import math
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Secondes: de 0,1 ms (analyse) à 30 s (envoi sous FloodWait)
+DEFAULT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{name}="{value}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1, *labelvalues: str):
+        key = tuple(str(value) for value in labelvalues)
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def labels(self, *labelvalues: str) -> "_BoundCounter":
+        return _BoundCounter(self, labelvalues)
+
+    def value(self, *labelvalues: str) -> float:
+        return self._values.get(tuple(str(value) for value in labelvalues), 0)
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        values = self._values or ({(): 0} if not self.labelnames else {})
+        for key, value in sorted(values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}")
+        return lines
+
+
+class _BoundCounter:
+    __slots__ = ("counter", "labelvalues")
+
+    def __init__(self, counter: Counter, labelvalues: Sequence[str]):
+        self.counter = counter
+        self.labelvalues = labelvalues
+
+    def inc(self, amount: float = 1):
+        self.counter.inc(amount, *self.labelvalues)
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._counts = [0] * len(self.buckets)
+        self._sum = 0.0
+        self._count = 0
+
+    def observe(self, value: float):
+        self._sum += value
+        self._count += 1
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                self._counts[index] += 1
+                break
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started)
+
+    @property
+    def count(self) -> int:
+        return self._count
+
+    def collect(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, count in zip(self.buckets, self._counts):
+            cumulative += count
+            lines.append(f'{self.name}_bucket{{le="{_format_value(bound)}"}} {cumulative}')
+        lines.append(f"{self.name}_sum {_format_value(self._sum)}")
+        lines.append(f"{self.name}_count {self._count}")
+        return lines
+
+
+class Gauge:
+    """Jauge lue à la demande (fonction) ou fixée explicitement"""
+
+    def __init__(self, name: str, documentation: str, read: Optional[Callable[[], float]] = None):
+        self.name = name
+        self.documentation = documentation
+        self.read = read
+        self._value = 0.0
+
+    def set(self, value: float):
+        self._value = value
+
+    def value(self) -> float:
+        if self.read is not None:
+            try:
+                return self.read()
+            except Exception:
+                return math.nan
+        return self._value
+
+    def collect(self) -> List[str]:
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} gauge",
+                f"{self.name} {_format_value(float(self.value()))}"]
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._metrics: Dict[str, object] = {}
+
+    def _add(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"Métrique déjà enregistrée: {metric.name}")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._add(Histogram(name, documentation, buckets))
+
+    def gauge(self, name: str, documentation: str, read: Optional[Callable[[], float]] = None) -> Gauge:
+        return self._add(Gauge(name, documentation, read))
+
+    def render(self) -> str:
+        """Exposition texte (text/plain; version=0.0.4)"""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.collect())
+        return "\n".join(lines) + "\n"
+
+
+async def monitor_loop_lag(gauge: Gauge, interval: float = 0.5):
+    """Mesure le retard de la boucle asyncio: écart entre le réveil prévu et le réveil effectif"""
+    while True:
+        expected = time.monotonic() + interval
+        await asyncio.sleep(interval)
+        gauge.set(max(0.0, time.monotonic() - expected))
@@ -0,0 +1,298 @@
+"""
+File d'envoi Telegram centralisée
+Seaux à jetons global et par canal, priorités (prédictions et modifications avant les réponses admin),
+attente FloodWait, nouvelles tentatives bornées pour les seules erreurs transitoires
+"""
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+from telethon.errors import FloodWaitError, ServerError, TimedOutError
+from telethon.utils import get_peer_id
+
+PRIORITY_PREDICTION = 0
+PRIORITY_EDIT = 1
+PRIORITY_ADMIN = 2
+
+# Limites publiées pour les bots: ~30 messages/s au total, ~20 messages/min par groupe ou canal
+DEFAULT_GLOBAL_RATE = 25.0
+DEFAULT_CHAT_RATE = 20 / 60
+DEFAULT_CHAT_BURST = 3
+DEFAULT_MAX_RETRIES = 3
+
+# Erreurs relancées (réseau, erreur ou délai dépassé côté Telegram); les autres (MessageNotModifiedError,
+# ChatWriteForbiddenError, pair invalide...) échouent aussitôt sans bloquer le canal
+TRANSIENT_ERRORS = (ServerError, TimedOutError, OSError, asyncio.TimeoutError)  # OSError: erreurs de connexion
+
+
+def chat_key(chat: Any) -> Any:
+    """Clé de seau d'un destinataire: ID marqué (-100...) commun à l'ID, à l'InputPeer et à l'entité d'un
+    même canal (les objets Telethon ne sont pas hachables); à défaut la valeur elle-même ou sa représentation"""
+    try:
+        return get_peer_id(chat)
+    except (TypeError, ValueError, AttributeError):
+        pass
+    try:
+        hash(chat)
+    except TypeError:
+        return repr(chat)
+    return chat
+
+
+class TokenBucket:
+    """Seau à jetons: rate jetons par seconde, au plus capacity en réserve"""
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0  # Attente imposée par Telegram (FloodWait)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, now: float) -> float:
+        """Secondes avant qu'un jeton soit disponible (0 si disponible maintenant)"""
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self._refill(now)
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def take(self, now: float):
+        self._refill(now)
+        self.tokens -= 1
+
+    def block(self, now: float, seconds: float):
+        self.blocked_until = max(self.blocked_until, now + seconds)
+
+
+class OutboundJob:
+    __slots__ = ("method", "chat", "peer", "key", "args", "kwargs", "future", "attempts", "seq")
+
+    def __init__(self, method: str, chat: Any, args: tuple, kwargs: Dict[str, Any], future: asyncio.Future,
+                 peer: Any = None):
+        self.method = method
+        self.chat = chat
+        self.peer = peer  # Entité déjà résolue passée au client à la place de chat
+        self.key = chat_key(chat)
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.attempts = 0
+        self.seq = None  # Rang d'arrivée, conservé lors des nouvelles tentatives
+
+
+class OutboundQueue:
+    """File de priorité des envois; un répartiteur unique respecte les débits et relance les échecs"""
+
+    def __init__(self, client, global_rate: float = DEFAULT_GLOBAL_RATE, chat_rate: float = DEFAULT_CHAT_RATE,
+                 chat_burst: float = DEFAULT_CHAT_BURST, max_retries: int = DEFAULT_MAX_RETRIES,
+                 observe_send: Optional[Callable[[float], Any]] = None):
+        self.client = client
+        # Durée de chaque appel API réussi (secondes), pour les histogrammes de latence
+        self.observe_send = observe_send
+        self.chat_rate = chat_rate
+        self.chat_burst = chat_burst
+        self.max_retries = max_retries
+        self.global_bucket = TokenBucket(global_rate, global_rate)
+        self._chat_buckets: Dict[Any, TokenBucket] = {}
+        self._heap: List[tuple] = []  # (priorité, séquence, tâche)
+        self._seq = itertools.count()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._inflight: set = set()
+        self.stats = {'sent': 0, 'retries': 0, 'flood_waits': 0, 'failed': 0}
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    @property
+    def depth(self) -> int:
+        return len(self._heap)
+
+    def start(self):
+        """Démarre le répartiteur (à appeler depuis la boucle asyncio)"""
+        if self.is_running:
+            return
+        self._wakeup = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self, timeout: float = 10.0):
+        """Laisse partir les envois en attente (dans la limite de timeout) puis arrête le répartiteur"""
+        if self._task is None:
+            return
+        deadline = time.monotonic() + timeout
+        while (self._heap or self._inflight) and time.monotonic() < deadline:
+            await asyncio.sleep(0.1)
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        for _, _, job in self._heap:
+            if not job.future.done():
+                job.future.cancel()
+        self._heap.clear()
+
+    def send_message(self, chat: Any, *args, priority: int = PRIORITY_PREDICTION, peer: Any = None,
+                     **kwargs) -> asyncio.Future:
+        """Met un envoi en file; le futur retourné donne le message envoyé (await optionnel)
+
+        chat: ID du canal (clé du seau à jetons); peer: InputPeer déjà résolu, utilisé pour l'appel
+        """
+        return self._submit('send_message', chat, args, kwargs, priority, peer)
+
+    def edit_message(self, chat: Any, *args, priority: int = PRIORITY_EDIT, peer: Any = None,
+                     **kwargs) -> asyncio.Future:
+        return self._submit('edit_message', chat, args, kwargs, priority, peer)
+
+    def _submit(self, method: str, chat: Any, args: tuple, kwargs: Dict[str, Any], priority: int,
+                peer: Any = None) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        job = OutboundJob(method, chat, args, kwargs, loop.create_future(), peer)
+        # Les envois non attendus ne doivent pas signaler d'exception « jamais récupérée »
+        job.future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        if not self.is_running:
+            # Sans répartiteur (tests, scripts), l'appel est direct
+            task = loop.create_task(getattr(self.client, method)(self._target(job), *args, **kwargs))
+            task.add_done_callback(lambda t: self._resolve(job, t))
+            return job.future
+        self._push(priority, job)
+        return job.future
+
+    @staticmethod
+    def _target(job: OutboundJob) -> Any:
+        return job.peer if job.peer is not None else job.chat
+
+    def _push(self, priority: int, job: OutboundJob):
+        if job.seq is None:
+            job.seq = next(self._seq)
+        heapq.heappush(self._heap, (priority, job.seq, job))
+        self._wakeup.set()
+
+    def _chat_bucket(self, chat: Any) -> TokenBucket:
+        bucket = self._chat_buckets.get(chat)
+        if bucket is None:
+            bucket = self._chat_buckets[chat] = TokenBucket(self.chat_rate, self.chat_burst)
+        return bucket
+
+    def _next_ready(self, now: float):
+        """Tâche prioritaire dont le canal a un jeton; sinon (None, délai minimal)"""
+        skipped = []
+        job, wait = None, None
+        blocked_chats = set()
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            candidate = entry[2]
+            if candidate.future.done():
+                continue  # Annulée par l'appelant
+            # Un canal bloqué le reste pour toutes ses tâches: l'ordre d'envoi par canal est préservé
+            delay = None if candidate.key in blocked_chats else self._chat_bucket(candidate.key).delay(now)
+            if delay == 0:
+                job = entry
+                break
+            if delay is not None:
+                wait = delay if wait is None else min(wait, delay)
+            blocked_chats.add(candidate.key)
+            skipped.append(entry)
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        return job, wait
+
+    async def _run(self):
+        while True:
+            try:
+                await self._dispatch_next()
+            except Exception as e:
+                # Le répartiteur ne doit jamais s'arrêter: sans lui, plus aucune limite de débit
+                print(f"❌ Erreur du répartiteur d'envois: {type(e).__name__}: {e}")
+                await asyncio.sleep(0.1)
+
+    async def _dispatch_next(self):
+        """Un tour du répartiteur: attente des débits, puis lancement d'au plus une tâche"""
+        now = time.monotonic()
+        global_delay = self.global_bucket.delay(now)
+        if global_delay > 0:
+            await asyncio.sleep(global_delay)
+            return
+        self._wakeup.clear()
+        entry, wait = self._next_ready(now)
+        if entry is None:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+            return
+        priority, _, job = entry
+        try:
+            self.global_bucket.take(now)
+            self._chat_bucket(job.key).take(now)
+            task = asyncio.create_task(self._execute(priority, job))
+        except Exception as e:
+            # Une tâche invalide échoue seule; les suivantes continuent de partir
+            self._fail(job, e)
+            return
+        self._inflight.add(task)
+        task.add_done_callback(self._inflight.discard)
+
+    async def _execute(self, priority: int, job: OutboundJob):
+        job.attempts += 1
+        started = time.monotonic()
+        try:
+            result = await getattr(self.client, job.method)(self._target(job), *job.args, **job.kwargs)
+        except FloodWaitError as e:
+            self.stats['flood_waits'] += 1
+            self._chat_bucket(job.key).block(time.monotonic(), e.seconds)
+            print(f"⏳ FloodWait {e.seconds}s sur {job.chat}, envoi reporté")
+            self._retry(priority, job, e)
+        except TRANSIENT_ERRORS as e:
+            # Erreur transitoire: attente exponentielle avant nouvelle tentative
+            self._chat_bucket(job.key).block(time.monotonic(), 2 ** job.attempts)
+            self._retry(priority, job, e)
+        except Exception as e:
+            # Erreur permanente: une nouvelle tentative échouerait de même
+            self._fail(job, e)
+        else:
+            self.stats['sent'] += 1
+            if self.observe_send is not None:
+                self.observe_send(time.monotonic() - started)
+            if not job.future.done():
+                job.future.set_result(result)
+
+    def _retry(self, priority: int, job: OutboundJob, error: Exception):
+        if job.future.done():
+            return
+        if job.attempts > self.max_retries:
+            self._fail(job, error)
+            return
+        self.stats['retries'] += 1
+        self._push(priority, job)
+
+    def _fail(self, job: OutboundJob, error: Exception):
+        if job.future.done():
+            return
+        self.stats['failed'] += 1
+        print(f"❌ Envoi abandonné vers {job.chat} après {job.attempts} tentative(s): {type(error).__name__}: {error}")
+        job.future.set_exception(error)
+
+    @staticmethod
+    def _resolve(job: OutboundJob, task: asyncio.Task):
+        if job.future.done():
+            return
+        if task.cancelled():
+            job.future.cancel()
+        elif task.exception() is not None:
+            job.future.set_exception(task.exception())
+        else:
+            job.future.set_result(task.result())
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {**self.stats, 'depth': self.depth, 'inflight': len(self._inflight)}
@@ -0,0 +1,89 @@
+"""
+Index des prédictions en attente (⌛)
+Table de hachage des prédictions ouvertes + tas min ordonné par numéro d'expiration
+"""
+import heapq
+from typing import Dict, Iterator, List, Optional, Tuple
+
+
+class PendingPredictionIndex:
+    """Prédictions en attente indexées pour une vérification en O(log n)"""
+
+    def __init__(self, horizon: int = 3):
+        """
+        Args:
+            horizon: Décalage maximal accepté; une prédiction expire après le jeu prédit + horizon
+        """
+        self.horizon = horizon
+        self._expiry: Dict[int, int] = {}  # {numéro prédit: numéro d'expiration}
+        self._heap: List[Tuple[int, int]] = []  # (numéro d'expiration, numéro prédit)
+
+    def __contains__(self, game_number: int) -> bool:
+        return game_number in self._expiry
+
+    def __len__(self) -> int:
+        return len(self._expiry)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._expiry)
+
+    def add(self, game_number: int):
+        """Ajoute une prédiction en attente"""
+        if game_number in self._expiry:
+            return
+        expiry = game_number + self.horizon
+        self._expiry[game_number] = expiry
+        heapq.heappush(self._heap, (expiry, game_number))
+
+    def discard(self, game_number: int):
+        """Retire une prédiction (réglée ou supprimée); l'entrée du tas est purgée paresseusement"""
+        if self._expiry.pop(game_number, None) is not None:
+            # Éviter qu'un tas rempli d'entrées obsolètes ne grossisse indéfiniment
+            if len(self._heap) > 2 * len(self._expiry) + 32:
+                self._rebuild_heap()
+
+    def clear(self):
+        self._expiry.clear()
+        self._heap.clear()
+
+    def rebuild(self, prediction_status: Dict[int, str]):
+        """Reconstruit l'index depuis un dictionnaire {numéro: statut}"""
+        self.clear()
+        for game_number, status in prediction_status.items():
+            if status == '⌛':
+                self._expiry[game_number] = game_number + self.horizon
+        self._rebuild_heap()
+
+    def match(self, game_number: int, max_offset: Optional[int] = None) -> Optional[Tuple[int, int]]:
+        """Cherche la prédiction en attente validée par ce jeu, du plus petit décalage au plus grand
+
+        Returns:
+            (numéro prédit, décalage) ou None
+        """
+        if max_offset is None:
+            max_offset = self.horizon
+        for offset in range(max_offset + 1):
+            if game_number - offset in self._expiry:
+                return game_number - offset, offset
+        return None
+
+    def pop_expired(self, current_game: int, horizon: Optional[int] = None,
+                    limit: Optional[int] = None) -> List[int]:
+        """Retire et retourne les prédictions dont le jeu actuel dépasse prédit + horizon"""
+        shift = (horizon if horizon is not None else self.horizon) - self.horizon
+        expired = []
+        while self._heap and (limit is None or len(expired) < limit):
+            expiry, game_number = self._heap[0]
+            if self._expiry.get(game_number) != expiry:
+                heapq.heappop(self._heap)  # Entrée obsolète
+                continue
+            if current_game <= expiry + shift:
+                break
+            heapq.heappop(self._heap)
+            del self._expiry[game_number]
+            expired.append(game_number)
+        return expired
+
+    def _rebuild_heap(self):
+        self._heap = [(expiry, game_number) for game_number, expiry in self._expiry.items()]
+        heapq.heapify(self._heap)
@@ -0,0 +1,89 @@
+"""
+Écriture disque asynchrone hors de la boucle asyncio
+Les notifications de modification sont regroupées sur une courte fenêtre puis écrites depuis un thread
+"""
+import asyncio
+from contextlib import nullcontext
+from typing import Any, Callable, Dict, Optional, Tuple
+
+DEFAULT_COALESCE_DELAY = 0.5  # Secondes de regroupement des écritures
+
+
+class PersistenceWriter:
+    """Écrivain de fond: une écriture par clé modifiée et par fenêtre, exécutée dans un thread"""
+
+    def __init__(self, coalesce_delay: float = DEFAULT_COALESCE_DELAY, profiler: Any = None):
+        self.coalesce_delay = coalesce_delay
+        # RuntimeProfiler optionnel: minuteur et profilage des écritures dans le thread
+        self.profiler = profiler
+        # {clé: (capture sur la boucle, écriture dans le thread)}
+        self._dirty: Dict[str, Tuple[Callable[[], Any], Callable[[Any], None]]] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._flush_lock: Optional[asyncio.Lock] = None
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+        self.writes = 0
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    def mark_dirty(self, key: str, snapshot_fn: Callable[[], Any], write_fn: Callable[[Any], None]):
+        """Signale un état à persister; sans écrivain démarré l'écriture est immédiate"""
+        if not self.is_running:
+            write_fn(snapshot_fn())
+            self.writes += 1
+            return
+        self._dirty[key] = (snapshot_fn, write_fn)
+        self._wakeup.set()
+
+    def start(self):
+        """Démarre la tâche de fond (à appeler depuis la boucle asyncio)"""
+        if self.is_running:
+            return
+        self._wakeup = asyncio.Event()
+        self._flush_lock = asyncio.Lock()
+        self._stopping = False
+        self._task = asyncio.create_task(self._run())
+        print("✅ Écrivain de persistance démarré")
+
+    async def _run(self):
+        while not self._stopping:
+            await self._wakeup.wait()
+            # Fenêtre de regroupement: les notifications suivantes rejoignent ce lot
+            if not self._stopping:
+                await asyncio.sleep(self.coalesce_delay)
+            await self.flush()
+
+    async def flush(self):
+        """Écrit immédiatement tous les états modifiés (utilisé par /reset et à l'arrêt)"""
+        if self._flush_lock is None:
+            return
+        async with self._flush_lock:
+            self._wakeup.clear()
+            dirty, self._dirty = self._dirty, {}
+            if not dirty:
+                return
+            # Capture sur la boucle pour ne jamais lire un état en cours de modification depuis le thread
+            batch = [(key, write_fn, snapshot_fn()) for key, (snapshot_fn, write_fn) in dirty.items()]
+            await asyncio.to_thread(self._write_batch, batch)
+
+    def _write_batch(self, batch):
+        for key, write_fn, data in batch:
+            try:
+                with self.profiler.thread_stage('persistence_write') if self.profiler else nullcontext():
+                    write_fn(data)
+                self.writes += 1
+            except Exception as e:
+                print(f"❌ Erreur écriture différée {key}: {e}")
+
+    async def stop(self):
+        """Arrête la tâche de fond après un dernier vidage"""
+        if self._task is None:
+            return
+        self._stopping = True
+        self._wakeup.set()
+        await self._task
+        await self.flush()
+        self._task = None
+        print("🛑 Écrivain de persistance arrêté")
@@ -0,0 +1,96 @@
+"""
+Compteurs de statistiques des prédictions
+Mis à jour à chaque changement de statut pour des lectures en temps constant
+"""
+from typing import Any, Dict, Optional
+
+# Statut de réussite par décalage
+OFFSET_STATUSES = {'✅0️⃣': 0, '✅1️⃣': 1, '✅2️⃣': 2, '✅3️⃣': 3}
+
+
+def is_win(status: Optional[str]) -> bool:
+    return bool(status) and '✅' in status
+
+
+def is_loss(status: Optional[str]) -> bool:
+    return bool(status) and ('❌' in status or '⭕' in status)
+
+
+class PredictionCounters:
+    """Compteurs incrémentaux: réussites par décalage, échecs, en attente, total réglé"""
+
+    def __init__(self):
+        self.wins_by_offset: Dict[int, int] = {offset: 0 for offset in OFFSET_STATUSES.values()}
+        self.wins = 0
+        self.losses = 0
+        self.pending = 0
+        self.total = 0  # Prédictions réglées (réussies ou échouées)
+
+    def reset(self):
+        self.__init__()
+
+    def record(self, old_status: Optional[str], new_status: str):
+        """Applique une transition de statut (old_status=None pour une nouvelle prédiction)"""
+        if old_status == new_status:
+            return
+        if old_status == '⌛':
+            self.pending -= 1
+        elif old_status is not None:
+            # Correction d'un statut déjà réglé
+            self.total -= 1
+            if is_win(old_status):
+                self.wins -= 1
+                offset = OFFSET_STATUSES.get(old_status)
+                if offset is not None:
+                    self.wins_by_offset[offset] -= 1
+            elif is_loss(old_status):
+                self.losses -= 1
+
+        if new_status == '⌛':
+            self.pending += 1
+            return
+        self.total += 1
+        if is_win(new_status):
+            self.wins += 1
+            offset = OFFSET_STATUSES.get(new_status)
+            if offset is not None:
+                self.wins_by_offset[offset] += 1
+        elif is_loss(new_status):
+            self.losses += 1
+
+    def rebuild(self, prediction_status: Dict[int, str]):
+        """Recalcule les compteurs depuis un dictionnaire {numéro: statut} (ancien format)"""
+        self.reset()
+        for status in prediction_status.values():
+            self.record(None, status)
+
+    def get_statistics(self) -> Dict[str, Any]:
+        """Statistiques au format attendu par /status et /sta"""
+        win_rate = (self.wins / self.total * 100) if self.total > 0 else 0.0
+        return {
+            'total': self.total,
+            'wins': self.wins,
+            'losses': self.losses,
+            'pending': self.pending,
+            'win_rate': win_rate,
+            'wins_by_offset': dict(self.wins_by_offset)
+        }
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'wins_by_offset': dict(self.wins_by_offset),
+            'wins': self.wins,
+            'losses': self.losses,
+            'pending': self.pending,
+            'total': self.total
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PredictionCounters':
+        counters = cls()
+        counters.wins_by_offset.update({int(k): v for k, v in (data.get('wins_by_offset') or {}).items()})
+        counters.wins = data.get('wins', 0)
+        counters.losses = data.get('losses', 0)
+        counters.pending = data.get('pending', 0)
+        counters.total = data.get('total', 0)
+        return counters
@@ -0,0 +1,141 @@
+"""
+Journal en ajout seul des transitions de prédictions
+Chaque changement de statut coûte une ligne JSON; le snapshot YAML n'est réécrit qu'au compactage
+"""
+import json
+import os
+import yaml
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+DEFAULT_COMPACT_EVERY = 500  # Entrées de journal avant compactage dans le snapshot
+
+
+class PredictionJournal:
+    """Journal des transitions (created, status, message, evicted) rejoué au démarrage après le snapshot"""
+
+    def __init__(self, snapshot_path: str, compact_every: int = DEFAULT_COMPACT_EVERY,
+                 autoflush: bool = True):
+        """
+        Args:
+            autoflush: Écrire chaque entrée immédiatement; sinon les entrées restent en tampon
+                       jusqu'à flush() (écriture différée par PersistenceWriter)
+        """
+        self.snapshot_path = snapshot_path
+        self.journal_path = f"{snapshot_path}.journal"
+        self.compact_every = compact_every
+        self.autoflush = autoflush
+        self.entries_since_compaction = 0
+        self._buffer: List[str] = []
+        # Numéro de séquence de la dernière entrée, croissant même si l'horloge recule;
+        # initialisé à la première utilisation depuis le journal et le snapshot sur disque
+        self._seq: Optional[int] = None
+
+    @property
+    def should_compact(self) -> bool:
+        return self.entries_since_compaction >= self.compact_every
+
+    @property
+    def seq(self) -> int:
+        """Séquence de la dernière entrée ajoutée (à enregistrer dans le snapshot comme 'journal_seq')"""
+        if self._seq is None:
+            self._seq = max(self._snapshot_seq(), max((entry['seq'] for entry in self._read_entries()
+                                                       if isinstance(entry.get('seq'), int)), default=0))
+        return self._seq
+
+    def _snapshot_seq(self) -> int:
+        snapshot = self.load_snapshot(default=None)
+        seq = snapshot.get('journal_seq') if isinstance(snapshot, dict) else None
+        return seq if isinstance(seq, int) else 0
+
+    def append(self, op: str, **fields):
+        """Ajoute une transition à la fin du journal"""
+        self._seq = self.seq + 1
+        entry = {'op': op, 'seq': self._seq, 'at': datetime.now().isoformat(), **fields}
+        self._buffer.append(json.dumps(entry, ensure_ascii=False) + '\n')
+        self.entries_since_compaction += 1
+        if self.autoflush:
+            self.flush()
+
+    def drain(self) -> List[str]:
+        """Retire et retourne les lignes en attente d'écriture"""
+        lines, self._buffer = self._buffer, []
+        return lines
+
+    def write_lines(self, lines: List[str]):
+        """Écrit des lignes déjà sérialisées à la fin du journal (appelable depuis un thread)"""
+        if not lines:
+            return
+        try:
+            with open(self.journal_path, 'a', encoding='utf-8') as f:
+                f.writelines(lines)
+        except Exception as e:
+            print(f"❌ Erreur écriture journal {self.journal_path}: {e}")
+
+    def flush(self):
+        self.write_lines(self.drain())
+
+    def replay(self, after_seq: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Relit les transitions postérieures au dernier snapshot (ligne tronquée finale ignorée)
+
+        Args:
+            after_seq: Séquence du snapshot ('journal_seq'): les entrées de séquence inférieure ou égale,
+                       déjà contenues dans le snapshot (arrêt entre son écriture et la remise à zéro
+                       du journal), sont écartées, ainsi que les entrées sans séquence de l'ancien format
+        """
+        entries = self._read_entries()
+        if after_seq is not None:
+            entries = [entry for entry in entries
+                       if isinstance(entry.get('seq'), int) and entry['seq'] > after_seq]
+        self._seq = max([self._seq or 0, after_seq or 0]
+                        + [entry['seq'] for entry in entries if isinstance(entry.get('seq'), int)])
+        self.entries_since_compaction = len(entries)
+        return entries
+
+    def _read_entries(self) -> List[Dict[str, Any]]:
+        entries = []
+        try:
+            if os.path.exists(self.journal_path):
+                with open(self.journal_path, 'r', encoding='utf-8') as f:
+                    for line in f:
+                        try:
+                            entries.append(json.loads(line))
+                        except ValueError:
+                            print(f"⚠️ Entrée de journal illisible ignorée: {line[:80]}")
+        except Exception as e:
+            print(f"❌ Erreur lecture journal {self.journal_path}: {e}")
+        return entries
+
+    def load_snapshot(self, default: Any = None) -> Any:
+        try:
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, 'r', encoding='utf-8') as f:
+                    data = yaml.safe_load(f)
+                    return data if data is not None else default
+        except Exception as e:
+            print(f"❌ Erreur chargement snapshot {self.snapshot_path}: {e}")
+        return default
+
+    def compact(self, snapshot: Any):
+        """Écrit le snapshot complet (remplacement atomique) puis vide le journal"""
+        self.discard_buffer()
+        self.write_snapshot(snapshot)
+
+    def discard_buffer(self):
+        """Abandonne les lignes en tampon, déjà contenues dans le snapshot en cours d'écriture"""
+        self._buffer.clear()
+        self.entries_since_compaction = 0
+
+    def write_snapshot(self, snapshot: Any):
+        """Remplace le snapshot et vide le fichier journal (appelable depuis un thread)"""
+        try:
+            tmp_path = f"{self.snapshot_path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                yaml.dump(snapshot, f, allow_unicode=True, default_flow_style=False)
+            os.replace(tmp_path, self.snapshot_path)
+            # Un arrêt entre ces deux étapes laisse des transitions déjà contenues dans le snapshot:
+            # replay(after_seq=...) les écarte grâce à la séquence enregistrée dans le snapshot
+            with open(self.journal_path, 'w', encoding='utf-8'):
+                pass
+        except Exception as e:
+            print(f"❌ Erreur compactage {self.snapshot_path}: {e}")
@@ -1,85 +1,75 @@
-import re
 import random
-from typing import Tuple, Optional, List
+import re
+from typing import Tuple, Optional, List, Union
+
+from game_parser import GameResult, GROUP_RE, as_game_result, count_cards
+from pending_index import PendingPredictionIndex
+from prediction_counters import PredictionCounters
+from retention import (DEFAULT_GAME_WINDOW, DEFAULT_LOG_SIZE, PredictionArchive,
+                       RetentionPolicy, ring_buffer)
+
+# Formats de numéro historiquement acceptés par ce prédicteur ("#N123", "#N 123.", "Jeu 123");
+# l'analyseur partagé en reconnaît davantage ("#123", "123.") pour d'autres consommateurs
+CARD_NUMBER_TOKEN_RE = re.compile(r"#N\s*\d+\.?|jeu\s*#?\s*\d+", re.IGNORECASE)
 
 class CardPredictor:
     """Card game prediction engine with pattern matching and result verification"""
     
-    def __init__(self):
-        self.last_predictions = []  # Liste [(numéro, combinaison)]
+    def __init__(self, log_size: int = DEFAULT_LOG_SIZE, game_window: int = DEFAULT_GAME_WINDOW,
+                 archive_path: str = "data/archive/card_predictions.yaml"):
+        self.last_predictions = ring_buffer(maxlen=log_size)  # Liste [(numéro, combinaison)]
         self.prediction_status = {}  # Statut des prédictions par numéro
+        self.pending = PendingPredictionIndex(horizon=3)  # Index des prédictions ⌛
         self.processed_messages = set()  # Pour éviter les doublons
-        self.status_log = []  # Historique des statuts
+        self.status_log = ring_buffer(maxlen=log_size)  # Historique des statuts
+        self.counters = PredictionCounters()  # Statistiques incrémentales
         self.prediction_messages = {}  # Stockage des IDs de messages de prédiction
-        self.pending_edit_messages = {}  # Messages en attente d'édition {game_number: message_content}
+        self.pending_edit_messages = {}  # Messages en attente d'édition {game_number: GameResult}
         # Système de déclenchement basé sur les As (A) dans le premier groupe uniquement
         self.trigger_numbers = {7, 8}  # Numéros déclencheurs pour les prédictions
+        # Éviction des données réglées au-delà des N derniers jeux (archivées sur disque)
+        self.retention = RetentionPolicy(game_window, PredictionArchive(archive_path))
         
     def reset(self):
         """Reset all prediction data"""
         self.last_predictions.clear()
         self.prediction_status.clear()
+        self.pending.clear()
         self.processed_messages.clear()
         self.status_log.clear()
+        self.counters.reset()
         self.prediction_messages.clear()
         self.pending_edit_messages.clear()
 
         print("Données de prédiction réinitialisées")
 
-    def extract_game_number(self, message: str) -> Optional[int]:
-        """Extract game number from message using pattern #N followed by digits"""
-        try:
-            # Look for patterns like "#N 123", "#N123", "#N60.", etc.
-            match = re.search(r"#N\s*(\d+)\.?", message, re.IGNORECASE)
-            if match:
-                number = int(match.group(1))
-                print(f"Numéro de jeu extrait: {number}")
-                return number
-            
-            # Alternative pattern matching
-            match = re.search(r"jeu\s*#?\s*(\d+)", message, re.IGNORECASE)
-            if match:
-                number = int(match.group(1))
-                print(f"Numéro de jeu alternatif extrait: {number}")
-                return number
-                
+    def extract_game_number(self, message: Union[str, GameResult]) -> Optional[int]:
+        """Extract game number from message (#N123, #N 123, Jeu 123...)"""
+        number = self._game_number(as_game_result(message))
+        if number is not None:
+            print(f"Numéro de jeu extrait: {number}")
+        else:
             print(f"Aucun numéro de jeu trouvé dans: {message}")
+        return number
+
+    @staticmethod
+    def _game_number(result: GameResult) -> Optional[int]:
+        """Numéro de jeu, seulement s'il est écrit dans un format accepté par ce prédicteur"""
+        if result.number_token is None or not CARD_NUMBER_TOKEN_RE.fullmatch(result.number_token):
             return None
-        except (ValueError, AttributeError) as e:
-            print(f"Erreur extraction numéro: {e}")
-            return None
+        return result.game_number
 
     def extract_symbols_from_parentheses(self, message: str) -> List[str]:
         """Extract content from parentheses in the message"""
         try:
-            return re.findall(r"\(([^)]*)\)", message)
+            return GROUP_RE.findall(message)
         except Exception:
             return []
 
     def count_total_cards(self, symbols_str: str) -> int:
-        """Count total card symbols in a string"""
-        # Compter d'abord les versions emoji, puis les versions simples
-        # pour éviter le double comptage
-        emoji_symbols = ['♠️', '♥️', '♦️', '♣️']
-        simple_symbols = ['♠', '♥', '♦', '♣']
-        
-        # Remplacer les emojis par des marqueurs temporaires pour éviter le double comptage
-        temp_str = symbols_str
-        emoji_count = 0
-        
-        for emoji in emoji_symbols:
-            count = temp_str.count(emoji)
-            emoji_count += count
-            # Remplacer par des marqueurs pour éviter le recomptage
-            temp_str = temp_str.replace(emoji, 'X')
-        
-        # Compter les symboles simples restants
-        simple_count = 0
-        for symbol in simple_symbols:
-            simple_count += temp_str.count(symbol)
-            
-        total = emoji_count + simple_count
-        print(f"Comptage cartes détaillé: emoji={emoji_count}, simple={simple_count}, total={total} dans '{symbols_str}'")
+        """Count total card symbols in a string (emoji and plain suits alike)"""
+        total = count_cards(symbols_str)
+        print(f"Comptage cartes: total={total} dans '{symbols_str}'")
         return total
 
     def normalize_suits(self, suits_str: str) -> str:
@@ -97,24 +87,26 @@ class CardPredictor:
         suits = [c for c in normalized if c in '♠♥♦♣']
         return ''.join(sorted(set(suits)))
 
-    def should_predict(self, message: str) -> Tuple[bool, Optional[int], Optional[str]]:
+    def should_predict(self, message: Union[str, GameResult]) -> Tuple[bool, Optional[int], Optional[str]]:
         """Determine if a prediction should be made based on the message"""
         try:
+            result = as_game_result(message)
+
             # Extract game number
-            game_number = self.extract_game_number(message)
+            game_number = self.extract_game_number(result)
             if game_number is None:
                 return False, None, None
 
-            # Extract symbols from parentheses first to check for Ace trigger
-            matches = self.extract_symbols_from_parentheses(message)
-            if len(matches) < 2:
-                print(f"❌ Pas assez de groupes de parenthèses (besoin de 2): {matches}")
+            # Card groups are extracted once by the parser
+            if not result.has_groups:
+                print("❌ Pas assez de groupes de parenthèses (besoin de 2)")
                 return False, None, None
 
-            first_group = matches[0]
-            second_group = matches[1]
+            first_group = result.first_group
+            second_group = result.second_group
             
             # NOUVELLE LOGIQUE: Vérifier la présence d'As (A) dans les groupes
+            # Toute lettre A compte, comme avant l'analyseur partagé (qui exige A suivi d'une couleur)
             has_ace_first = 'A' in first_group
             has_ace_second = 'A' in second_group
             
@@ -125,14 +117,14 @@ class CardPredictor:
             # 2. NE PAS prédire si As dans le DEUXIÈME groupe  
             # 3. NE PAS prédire si As dans les DEUX groupes
             if not has_ace_first:
-                print(f"❌ Pas d'As dans le premier groupe, pas de prédiction")
+                print("❌ Pas d'As dans le premier groupe, pas de prédiction")
                 return False, None, None
                 
             if has_ace_second:
-                print(f"❌ As détecté dans le deuxième groupe, prédiction bloquée")
+                print("❌ As détecté dans le deuxième groupe, prédiction bloquée")
                 return False, None, None
             
-            print(f"✅ Condition As validée: As dans premier groupe uniquement")
+            print("✅ Condition As validée: As dans premier groupe uniquement")
 
             # Calculate predicted game number (jeu suivant)
             predicted_game = game_number + 1
@@ -153,7 +145,7 @@ class CardPredictor:
                 return False, None, None
 
             # Get suits from first group
-            suits = self.normalize_suits(first_group)
+            suits = ''.join(sorted(set(result.first_suits)))
             
             if not suits:
                 return False, None, None
@@ -162,17 +154,39 @@ class CardPredictor:
             self.processed_messages.add(game_number)
             
             # Create prediction for target game
-            self.prediction_status[predicted_game] = '⌛'
+            self.set_prediction_status(predicted_game, '⌛')
             self.last_predictions.append((predicted_game, suits))
             
             print(f"✅ Prédiction créée: Jeu #{predicted_game} -> {suits} (déclenchée par #{game_number} avec As dans premier groupe)")
-            print(f"📊 Prédictions actives: {[k for k, v in self.prediction_status.items() if v == '⌛']}")
+            print(f"📊 Prédictions actives: {sorted(self.pending)}")
             return True, predicted_game, suits
 
         except Exception as e:
             print(f"Erreur dans should_predict: {e}")
             return False, None, None
     
+    def set_prediction_status(self, game_number: int, status: str):
+        """Set a prediction status and keep the pending index and counters in sync"""
+        self.counters.record(self.prediction_status.get(game_number), status)
+        self.prediction_status[game_number] = status
+        if status == '⌛':
+            self.pending.add(game_number)
+        else:
+            self.pending.discard(game_number)
+
+    def apply_retention(self, current_game_number: int):
+        """Evict settled data older than the retention window (amortized, archived on disk)"""
+        cutoff = self.retention.due(current_game_number)
+        if cutoff is None:
+            return
+        evicted = self.retention.prune_settled(self.prediction_status, cutoff)
+        self.retention.prune_keys(self.processed_messages, cutoff)
+        self.retention.prune_keys(self.pending_edit_messages, cutoff)
+        for game_number in evicted:
+            self.prediction_messages.pop(game_number, None)
+        if evicted:
+            print(f"🧹 Rétention: {len(evicted)} prédictions réglées archivées (avant #{cutoff})")
+
     def store_prediction_message(self, game_number: int, message_id: int, chat_id: int):
         """Store prediction message ID for later editing"""
         self.prediction_messages[game_number] = {'message_id': message_id, 'chat_id': chat_id}
@@ -185,36 +199,37 @@ class CardPredictor:
         """Check for expired predictions (offset > 2) and mark them as failed"""
         expired_predictions = []
         
-        for pred_num, status in list(self.prediction_status.items()):
-            if status == '⌛' and current_game_number > pred_num + 2:
-                # Marquer comme échouée
-                self.prediction_status[pred_num] = '❌❌'
-                self.status_log.append((pred_num, '❌❌'))
-                expired_predictions.append(pred_num)
-                print(f"❌ Prédiction expirée: #{pred_num} marquée comme échouée (jeu actuel: #{current_game_number})")
+        for pred_num in self.pending.pop_expired(current_game_number, horizon=2):
+            # Marquer comme échouée
+            self.set_prediction_status(pred_num, '❌❌')
+            self.status_log.append((pred_num, '❌❌'))
+            expired_predictions.append(pred_num)
+            print(f"❌ Prédiction expirée: #{pred_num} marquée comme échouée (jeu actuel: #{current_game_number})")
         
         return expired_predictions
         
-    def is_pending_edit_message(self, message: str) -> Tuple[bool, Optional[int]]:
+    def is_pending_edit_message(self, message: Union[str, GameResult]) -> Tuple[bool, Optional[int]]:
         """Check if message has ⏰ or 🕐 indicating it's being edited"""
         try:
-            if "⏰" in message or "🕐" in message:
-                game_number = self.extract_game_number(message)
+            result = as_game_result(message)
+            if result.is_pending:
+                game_number = self.extract_game_number(result)
                 if game_number:
                     print(f"🔄 Message #{game_number} en cours d'édition détecté: ⏰ ou 🕐")
                     # Stocker le message en attente
-                    self.pending_edit_messages[game_number] = message
+                    self.pending_edit_messages[game_number] = result
                     return True, game_number
             return False, None
         except Exception as e:
             print(f"Erreur dans is_pending_edit_message: {e}")
             return False, None
     
-    def process_final_edit_message(self, message: str) -> Tuple[bool, Optional[int], Optional[str]]:
+    def process_final_edit_message(self, message: Union[str, GameResult]) -> Tuple[bool, Optional[int], Optional[str]]:
         """Process message when it's finally edited with 🔰 or ✅"""
         try:
-            if "🔰" in message or "✅" in message:
-                game_number = self.extract_game_number(message)
+            result = as_game_result(message)
+            if result.is_final:
+                game_number = self.extract_game_number(result)
                 if game_number and game_number in self.pending_edit_messages:
                     print(f"✅ Message #{game_number} finalisé avec 🔰 ou ✅")
                     
@@ -222,49 +237,47 @@ class CardPredictor:
                     del self.pending_edit_messages[game_number]
                     
                     # Traiter maintenant le message pour déclenchement As
-                    return self.should_predict(message)
+                    return self.should_predict(result)
                     
             return False, None, None
         except Exception as e:
             print(f"Erreur dans process_final_edit_message: {e}")
             return False, None, None
 
-    def verify_prediction(self, message: str) -> Tuple[Optional[bool], Optional[int]]:
+    def verify_prediction(self, message: Union[str, GameResult]) -> Tuple[Optional[bool], Optional[int]]:
         """Verify prediction results based on verification message"""
         try:
+            result = as_game_result(message)
+
             # NOUVELLE LOGIQUE: Ignorer complètement les messages ⏰ et 🕐 pour la vérification
-            if "⏰" in message or "🕐" in message:
+            if result.is_pending:
                 print(f"⏰/🕐 détecté dans le message - ignoré pour la vérification")
                 return None, None
 
             # Check for verification tags (uniquement messages normaux)
-            if not any(tag in message for tag in ["✅", "🔰", "❌", "⭕"]):
+            if not result.has_result_tag:
                 return None, None
 
             # Extract game number
-            game_number = self.extract_game_number(message)
+            game_number = self._game_number(result)
             if game_number is None:
                 print(f"Aucun numéro de jeu trouvé dans: {message}")
                 return None, None
 
             print(f"Numéro de jeu du résultat: {game_number}")
+            self.apply_retention(game_number)
 
-            # Extract symbol groups
-            groups = self.extract_symbols_from_parentheses(message)
-            if len(groups) < 2:
-                print(f"Groupes de symboles insuffisants: {groups}")
+            # Symbol groups already extracted by the parser
+            if not result.has_groups:
+                print("Groupes de symboles insuffisants")
                 return None, None
 
-            first_group = groups[0]
-            second_group = groups[1]
-            print(f"Groupes extraits: '{first_group}' et '{second_group}'")
+            print(f"Groupes extraits: '{result.first_group}' et '{result.second_group}'")
 
             def is_valid_result():
                 """Check if the result has valid card distribution (2+2)"""
-                count1 = self.count_total_cards(first_group)
-                count2 = self.count_total_cards(second_group)
-                print(f"Comptage cartes: groupe1={count1}, groupe2={count2}")
-                is_valid = count1 == 2 and count2 == 2
+                print(f"Comptage cartes: groupe1={result.first_count}, groupe2={result.second_count}")
+                is_valid = result.is_valid_distribution
                 print(f"Résultat valide (2+2): {is_valid}")
                 return is_valid
 
@@ -279,42 +292,37 @@ class CardPredictor:
                 return None, None
             
             # Nouvelle logique: Vérifier d'abord le numéro exact, puis jusqu'à +3
-            # Vérifier les offsets de 0 à 3
-            for offset in range(4):  # offsets 0, 1, 2, 3
-                predicted_number = game_number - offset
-                print(f"Vérification si le jeu #{game_number} correspond à la prédiction #{predicted_number} (offset {offset})")
+            # Recherche directe dans l'index des prédictions en attente (offsets 0 à 3)
+            found = self.pending.match(game_number, max_offset=3)
+            if found:
+                predicted_number, offset = found
+                print(f"Prédiction en attente trouvée: #{predicted_number} (offset {offset})")
                 
-                if (predicted_number in self.prediction_status and 
-                    self.prediction_status[predicted_number] == '⌛'):
-                    print(f"Prédiction en attente trouvée: #{predicted_number}")
+                # Détermine le statut selon l'offset
+                if offset == 0:
+                    statut = '✅0️⃣'  # Jeu exact
+                elif offset == 1:
+                    statut = '✅1️⃣'  # 1 jeu après
+                elif offset == 2:
+                    statut = '✅2️⃣'  # 2 jeux après
+                else:  # offset == 3
+                    statut = '✅3️⃣'  # 3 jeux après
                     
-                    # Détermine le statut selon l'offset
-                    if offset == 0:
-                        statut = '✅0️⃣'  # Jeu exact
-                    elif offset == 1:
-                        statut = '✅1️⃣'  # 1 jeu après
-                    elif offset == 2:
-                        statut = '✅2️⃣'  # 2 jeux après
-                    else:  # offset == 3
-                        statut = '✅3️⃣'  # 3 jeux après
-                        
-                    self.prediction_status[predicted_number] = statut
-                    self.status_log.append((predicted_number, statut))
-                    print(f"✅ Prédiction réussie: #{predicted_number} validée par le jeu #{game_number} (offset {offset})")
-                    return True, predicted_number
+                self.set_prediction_status(predicted_number, statut)
+                self.status_log.append((predicted_number, statut))
+                print(f"✅ Prédiction réussie: #{predicted_number} validée par le jeu #{game_number} (offset {offset})")
+                return True, predicted_number
             
-            # Si aucune prédiction trouvée dans les offsets 0-3, marquer les anciennes comme échec
-            for pred_num in list(self.prediction_status.keys()):
-                if (self.prediction_status[pred_num] == '⌛' and 
-                    game_number > pred_num + 3):
-                    self.prediction_status[pred_num] = '❌'
-                    self.status_log.append((pred_num, '❌'))
-                    print(f"❌ Prédiction #{pred_num} marquée échec - jeu #{game_number} dépasse prédit+3")
-                    return False, pred_num
+            # Si aucune prédiction trouvée dans les offsets 0-3, marquer la plus ancienne expirée comme échec
+            for pred_num in self.pending.pop_expired(game_number, horizon=3, limit=1):
+                self.set_prediction_status(pred_num, '❌')
+                self.status_log.append((pred_num, '❌'))
+                print(f"❌ Prédiction #{pred_num} marquée échec - jeu #{game_number} dépasse prédit+3")
+                return False, pred_num
 
             # Si aucune prédiction trouvée
             print(f"Aucune prédiction correspondante trouvée pour le jeu #{game_number} dans les offsets 0-3")
-            print(f"Prédictions actuelles en attente: {[k for k, v in self.prediction_status.items() if v == '⌛']}")
+            print(f"Prédictions actuelles en attente: {sorted(self.pending)}")
             return None, None
 
         except Exception as e:
@@ -322,30 +330,9 @@ class CardPredictor:
             return None, None
 
     def get_statistics(self) -> dict:
-        """Get prediction statistics"""
+        """Get prediction statistics (constant time, from incremental counters)"""
         try:
-            total_predictions = len(self.status_log)
-            if total_predictions == 0:
-                return {
-                    'total': 0,
-                    'wins': 0,
-                    'losses': 0,
-                    'pending': len([s for s in self.prediction_status.values() if s == '⌛']),
-                    'win_rate': 0.0
-                }
-
-            wins = sum(1 for _, status in self.status_log if '✅' in status)
-            losses = sum(1 for _, status in self.status_log if '❌' in status or '⭕' in status)
-            pending = len([s for s in self.prediction_status.values() if s == '⌛'])
-            win_rate = (wins / total_predictions * 100) if total_predictions > 0 else 0.0
-
-            return {
-                'total': total_predictions,
-                'wins': wins,
-                'losses': losses,
-                'pending': pending,
-                'win_rate': win_rate
-            }
+            return self.counters.get_statistics()
         except Exception as e:
             print(f"Erreur dans get_statistics: {e}")
             return {'total': 0, 'wins': 0, 'losses': 0, 'pending': 0, 'win_rate': 0.0}
@@ -354,7 +341,7 @@ class CardPredictor:
         """Get recent predictions with their status"""
         try:
             recent = []
-            for game_num, suits in self.last_predictions[-count:]:
+            for game_num, suits in list(self.last_predictions)[-count:]:
                 status = self.prediction_status.get(game_num, '⌛')
                 recent.append((game_num, suits, status))
             return recent
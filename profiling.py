@@ -0,0 +1,187 @@
+"""
+Profilage à chaud sans redéploiement
+Minuteurs d'étapes toujours actifs (coût: deux lectures d'horloge) et collecte cProfile activée
+par l'admin pour une fenêtre bornée, sur la boucle asyncio et dans les threads d'écriture;
+rapport trié des N fonctions les plus coûteuses, ou fichier .prof téléchargeable (pstats, snakeviz)
+"""
+import asyncio
+import cProfile
+import io
+import marshal
+import pstats
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+DEFAULT_WINDOW_SECONDS = 60.0
+MAX_WINDOW_SECONDS = 600.0
+DEFAULT_TOP_N = 25
+SORT_KEYS = ('cumulative', 'tottime', 'ncalls')
+
+
+class StageTimers:
+    """Nombre d'appels, durée totale, dernière et maximale par étape"""
+
+    def __init__(self):
+        self._stages: Dict[str, List[float]] = {}  # {étape: [appels, total, dernière, max]}
+
+    def record(self, stage: str, seconds: float):
+        entry = self._stages.get(stage)
+        if entry is None:
+            self._stages[stage] = [1, seconds, seconds, seconds]
+            return
+        entry[0] += 1
+        entry[1] += seconds
+        entry[2] = seconds
+        if seconds > entry[3]:
+            entry[3] = seconds
+
+    def reset(self):
+        self._stages.clear()
+
+    def get_stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            stage: {
+                'calls': int(calls),
+                'total_ms': round(total * 1000, 3),
+                'mean_ms': round(total * 1000 / calls, 3),
+                'last_ms': round(last * 1000, 3),
+                'max_ms': round(peak * 1000, 3)
+            }
+            for stage, (calls, total, last, peak) in sorted(self._stages.items())
+        }
+
+
+class RuntimeProfiler:
+    """cProfile à la demande (fenêtre bornée) et minuteurs d'étapes partageant les mêmes points d'accroche"""
+
+    def __init__(self, max_window: float = MAX_WINDOW_SECONDS):
+        self.max_window = max_window
+        self.timers = StageTimers()
+        self._profile: Optional[cProfile.Profile] = None  # Profil de la boucle asyncio
+        self._thread_profiles: List[cProfile.Profile] = []
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._stop_handle: Optional[asyncio.TimerHandle] = None
+        self._stats: Optional[pstats.Stats] = None  # Dernière collecte terminée
+        self.started_at: Optional[float] = None
+        self.window: Optional[float] = None
+        self.last_duration: Optional[float] = None
+
+    @property
+    def is_active(self) -> bool:
+        return self._profile is not None
+
+    # --- Points d'accroche ---
+
+    @contextmanager
+    def stage(self, name: str, histogram: Any = None) -> Iterator[None]:
+        """Minuteur d'étape (boucle asyncio); alimente aussi un histogramme de métriques s'il est fourni"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - started
+            self.timers.record(name, elapsed)
+            if histogram is not None:
+                histogram.observe(elapsed)
+
+    @contextmanager
+    def thread_stage(self, name: str) -> Iterator[None]:
+        """Minuteur d'étape dans un thread; profilé aussi pendant une collecte (cProfile est par thread)"""
+        profile = None
+        if self.is_active and not getattr(self._local, 'profiling', False):
+            profile = cProfile.Profile()
+            try:
+                profile.enable()
+                self._local.profiling = True
+            except ValueError:
+                profile = None  # Un seul profileur actif par interpréteur (Python 3.12+)
+        try:
+            with self.stage(name):
+                yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self._local.profiling = False
+                with self._lock:
+                    self._thread_profiles.append(profile)
+
+    def record(self, name: str, seconds: float, histogram: Any = None):
+        """Durée mesurée ailleurs (appel d'envoi Telegram...)"""
+        self.timers.record(name, seconds)
+        if histogram is not None:
+            histogram.observe(seconds)
+
+    # --- Collecte cProfile ---
+
+    def start(self, window: float = DEFAULT_WINDOW_SECONDS) -> float:
+        """Démarre une collecte sur la boucle asyncio courante; arrêt automatique après window secondes"""
+        window = max(1.0, min(float(window), self.max_window))
+        if self.is_active:
+            return self.window
+        with self._lock:
+            self._thread_profiles = []
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+        self.started_at = time.monotonic()
+        self.window = window
+        self._stop_handle = asyncio.get_running_loop().call_later(window, self.stop)
+        print(f"🔬 Profilage démarré pour {window:.0f}s")
+        return window
+
+    def stop(self) -> bool:
+        """Arrête la collecte et conserve ses statistiques pour le rapport"""
+        if not self.is_active:
+            return False
+        self._profile.disable()
+        if self._stop_handle is not None:
+            self._stop_handle.cancel()
+            self._stop_handle = None
+        stats = pstats.Stats(self._profile)
+        with self._lock:
+            for profile in self._thread_profiles:
+                stats.add(profile)
+            self._thread_profiles = []
+        self._stats = stats
+        self._profile = None
+        self.last_duration = time.monotonic() - self.started_at
+        print(f"🔬 Profilage arrêté après {self.last_duration:.1f}s")
+        return True
+
+    def report(self, top_n: int = DEFAULT_TOP_N, sort: str = 'cumulative') -> str:
+        """Minuteurs d'étapes puis N fonctions les plus coûteuses de la dernière collecte"""
+        lines = ["⏱️ Étapes (appels, moyenne, max):"]
+        for stage, stats in self.timers.get_stats().items():
+            lines.append(f"  {stage}: {stats['calls']} × {stats['mean_ms']}ms (max {stats['max_ms']}ms)")
+        if self.is_active:
+            lines.append(f"🔬 Collecte en cours depuis {time.monotonic() - self.started_at:.0f}s / {self.window:.0f}s")
+        elif self._stats is None:
+            lines.append("🔬 Aucune collecte cProfile: /profile on")
+        else:
+            buffer = io.StringIO()
+            self._stats.stream = buffer
+            self._stats.sort_stats(sort if sort in SORT_KEYS else 'cumulative').print_stats(top_n)
+            lines.append(f"🔬 cProfile ({self.last_duration:.1f}s, tri {sort}, top {top_n}):")
+            lines.append(_strip_header(buffer.getvalue()))
+        return "\n".join(lines)
+
+    def dump(self) -> Optional[bytes]:
+        """Dernière collecte au format .prof (marshal pstats), None si aucune"""
+        if self._stats is None:
+            return None
+        return marshal.dumps(self._stats.stats)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {
+            'active': self.is_active,
+            'window': self.window,
+            'last_duration': round(self.last_duration, 3) if self.last_duration is not None else None,
+            'stages': self.timers.get_stats()
+        }
+
+
+def _strip_header(text: str) -> str:
+    """Rapport pstats sans les lignes vides ni l'en-tête de fichier"""
+    return "\n".join(line for line in text.splitlines() if line.strip() and not line.startswith('   Ordered by'))
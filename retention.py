@@ -0,0 +1,106 @@
+"""
+Rétention bornée des données de prédiction
+Tampons circulaires pour les historiques et éviction par numéro de jeu des prédictions réglées,
+les données évincées étant archivées sur disque
+"""
+import os
+import yaml
+from collections import deque
+from datetime import datetime
+from typing import Any, Dict, Iterable, Optional
+
+DEFAULT_LOG_SIZE = 1000  # Entrées conservées dans status_log / last_predictions
+DEFAULT_GAME_WINDOW = 500  # Prédictions réglées conservées: N derniers jeux
+
+
+def ring_buffer(items: Iterable = (), maxlen: int = DEFAULT_LOG_SIZE) -> deque:
+    """Historique borné: les plus anciennes entrées sont écartées automatiquement"""
+    return deque(items, maxlen=maxlen)
+
+
+def key_game_number(key: Any) -> Optional[int]:
+    """Numéro de jeu d'une clé de processed_messages (123 ou 'auto_prediction_123')"""
+    if isinstance(key, int):
+        return key
+    if isinstance(key, str):
+        digits = key.rsplit('_', 1)[-1]
+        if digits.isdigit():
+            return int(digits)
+    return None
+
+
+class PredictionArchive:
+    """Archive sur disque (liste YAML en ajout seul) des prédictions évincées de la mémoire"""
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def append(self, evicted: Dict[int, Any]):
+        """Ajoute les prédictions évincées {numéro: statut} à la fin de l'archive"""
+        if not evicted:
+            return
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            archived_at = datetime.now().isoformat()
+            entries = [
+                {'game_number': game_number, 'status': status, 'archived_at': archived_at}
+                for game_number, status in sorted(evicted.items())
+            ]
+            # Une liste YAML ajoutée à la fin d'une autre reste une liste YAML valide
+            with open(self.path, 'a', encoding='utf-8') as f:
+                yaml.dump(entries, f, allow_unicode=True, default_flow_style=False)
+        except Exception as e:
+            print(f"❌ Erreur archivage prédictions: {e}")
+
+    def load(self) -> list:
+        try:
+            if os.path.exists(self.path):
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    return yaml.safe_load(f) or []
+        except Exception as e:
+            print(f"❌ Erreur chargement archive: {e}")
+        return []
+
+
+class RetentionPolicy:
+    """Fenêtre de rétention par numéro de jeu, appliquée par paliers pour un coût amorti constant"""
+
+    def __init__(self, game_window: int = DEFAULT_GAME_WINDOW, archive: Optional[PredictionArchive] = None):
+        self.game_window = game_window
+        self.archive = archive
+        self.step = max(1, game_window // 10)
+        self._last_prune: Optional[int] = None
+
+    def due(self, current_game: int) -> Optional[int]:
+        """Retourne le numéro de coupure si un élagage est dû, sinon None"""
+        if self._last_prune is not None and self._last_prune <= current_game < self._last_prune + self.step:
+            return None
+        self._last_prune = current_game
+        return current_game - self.game_window
+
+    def prune_settled(self, prediction_status: Dict[int, str], cutoff: int) -> Dict[int, str]:
+        """Évince les prédictions réglées antérieures à la coupure et les archive"""
+        evicted = {
+            game_number: status for game_number, status in prediction_status.items()
+            if game_number < cutoff and status != '⌛'
+        }
+        for game_number in evicted:
+            del prediction_status[game_number]
+        if self.archive:
+            self.archive.append(evicted)
+        return evicted
+
+    @staticmethod
+    def prune_keys(container, cutoff: int):
+        """Retire d'un set ou d'un dict les clés de jeux antérieures à la coupure"""
+        stale = []
+        for key in container:
+            game_number = key_game_number(key)
+            if game_number is not None and game_number < cutoff:
+                stale.append(key)
+        for key in stale:
+            if isinstance(container, dict):
+                del container[key]
+            else:
+                container.discard(key)
+        return len(stale)
@@ -0,0 +1,203 @@
+"""
+Planification glissante des prédictions automatiques
+La planification est une règle (intervalle, décalage de lancement, graine): chaque créneau est
+calculé à la demande et seule la fenêtre à venir est matérialisée, les jours passés sont archivés
+"""
+import os
+import random
+import yaml
+from dataclasses import dataclass, replace
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+DEFAULT_INTERVAL_MINUTES = 60
+DEFAULT_WINDOW_HOURS = 12  # Créneaux matérialisés à l'avance
+DEFAULT_GRACE_HOURS = 2  # Entrées passées conservées pour la vérification avant archivage
+RULE_EPOCH = datetime(2024, 1, 1)  # Origine des numéros de créneau
+
+
+@dataclass(frozen=True)
+class ScheduleRule:
+    """Règle déterministe: créneau i → heure de prédiction et décalage de lancement (1-4 min avant)"""
+
+    interval_minutes: int = DEFAULT_INTERVAL_MINUTES
+    offset_min: int = 1
+    offset_max: int = 4
+    seed: int = 0
+    phase_minutes: int = 0  # Décalage des créneaux par rapport à l'heure pleine
+
+    def __post_init__(self):
+        if self.interval_minutes < 1:
+            raise ValueError("interval_minutes doit être >= 1")
+        if not 0 <= self.offset_min <= self.offset_max:
+            raise ValueError("Décalage de lancement invalide")
+
+    def with_seed(self, seed: int) -> "ScheduleRule":
+        return replace(self, seed=seed)
+
+    def slot_index(self, moment: datetime) -> int:
+        """Premier créneau dont l'heure de prédiction est postérieure à moment"""
+        elapsed = (moment - RULE_EPOCH).total_seconds() / 60 - self.phase_minutes
+        return int(elapsed // self.interval_minutes) + 1
+
+    def prediction_time(self, index: int) -> datetime:
+        return RULE_EPOCH + timedelta(minutes=self.phase_minutes + index * self.interval_minutes)
+
+    def launch_offset(self, index: int) -> int:
+        # Générateur propre au créneau: le même créneau donne toujours le même décalage,
+        # sans dépendre des créneaux déjà générés
+        return random.Random(f"{self.seed}:{index}").randint(self.offset_min, self.offset_max)
+
+    def slot(self, index: int, generated_at: datetime) -> Dict[str, Any]:
+        """Entrée de planification du créneau index (clé 'numero' incluse)"""
+        prediction_time = self.prediction_time(index)
+        launch_offset_minutes = self.launch_offset(index)
+        launch_time = prediction_time - timedelta(minutes=launch_offset_minutes)
+        return {
+            "numero": f"N{prediction_time.hour:02d}{prediction_time.minute:02d}",
+            "heure_lancement": launch_time.strftime("%H:%M"),
+            "heure_prediction": prediction_time.strftime("%H:%M"),
+            "statut": "⌛",
+            "message_id": None,
+            "chat_id": None,
+            "launched": False,
+            "verified": False,
+            "generated_at": generated_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "launch_offset": launch_offset_minutes,
+            "lancement_at": launch_time.isoformat(timespec="seconds"),
+            "prediction_at": prediction_time.isoformat(timespec="seconds"),
+            "slot": index,
+        }
+
+    def iter_slots(self, start: datetime, end: datetime) -> Iterator[Dict[str, Any]]:
+        """Créneaux dont l'heure de prédiction tombe dans ]start, end], générés paresseusement"""
+        index = self.slot_index(start)
+        while self.prediction_time(index) <= end:
+            yield self.slot(index, start)
+            index += 1
+
+    def preview(self, start: datetime, days: int = 7) -> List[Dict[str, Any]]:
+        """Aperçu de la planification sur plusieurs jours, sans rien matérialiser"""
+        return list(self.iter_slots(start, start + timedelta(days=days)))
+
+
+class ScheduleArchive:
+    """Archives journalières (liste YAML en ajout seul) des entrées de planification passées"""
+
+    def __init__(self, directory: str = "data/schedule_archive", writer=None):
+        self.directory = directory
+        # PersistenceWriter optionnel: les ajouts s'accumulent puis sont écrits hors de la boucle asyncio
+        self.writer = writer
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    def path_for(self, day: str) -> str:
+        return os.path.join(self.directory, f"prediction_{day}.yaml")
+
+    def append(self, entries_by_day: Dict[str, Dict[str, Any]]):
+        """Ajoute les entrées {jour: {numéro: entrée}} aux archives des jours concernés"""
+        if self.writer is None:
+            self._write(entries_by_day)
+            return
+        # Archive en ajout seul: les lots successifs d'une même fenêtre sont cumulés, jamais remplacés
+        for day, entries in entries_by_day.items():
+            if entries:
+                self._pending.setdefault(day, {}).update(entries)
+        if self._pending:
+            self.writer.mark_dirty(f'schedule_archive:{self.directory}', self._drain, self._write)
+
+    def _drain(self) -> Dict[str, Dict[str, Any]]:
+        pending, self._pending = self._pending, {}
+        return pending
+
+    def _write(self, entries_by_day: Dict[str, Dict[str, Any]]):
+        for day, entries in entries_by_day.items():
+            if not entries:
+                continue
+            try:
+                os.makedirs(self.directory, exist_ok=True)
+                records = [{"numero": numero, **data} for numero, data in entries.items()]
+                # Une liste YAML ajoutée à la fin d'une autre reste une liste YAML valide
+                with open(self.path_for(day), 'a', encoding='utf-8') as f:
+                    yaml.dump(records, f, allow_unicode=True, default_flow_style=False)
+            except Exception as e:
+                print(f"❌ Erreur archivage planification {day}: {e}")
+
+    def load(self, day: str) -> list:
+        path = self.path_for(day)
+        try:
+            if os.path.exists(path):
+                with open(path, 'r', encoding='utf-8') as f:
+                    return yaml.safe_load(f) or []
+        except Exception as e:
+            print(f"❌ Erreur chargement archive {path}: {e}")
+        return []
+
+
+class RollingSchedule:
+    """Fenêtre glissante de la planification: matérialise les créneaux à venir, archive les passés"""
+
+    def __init__(self, rule: ScheduleRule, window_hours: float = DEFAULT_WINDOW_HOURS,
+                 grace_hours: float = DEFAULT_GRACE_HOURS, archive: Optional[ScheduleArchive] = None):
+        # Fenêtre plus courte qu'un jour: deux créneaux présents ne partagent jamais le même HHMM,
+        # l'unicité des numéros se vérifie donc en O(1) sans boucle de résolution
+        if window_hours + grace_hours >= 24:
+            raise ValueError("window_hours + grace_hours doit rester inférieur à 24")
+        self.rule = rule
+        self.window = timedelta(hours=window_hours)
+        self.grace = timedelta(hours=grace_hours)
+        self.archive = archive
+
+    @staticmethod
+    def entry_prediction_time(data: Dict[str, Any]) -> datetime:
+        """Heure de prédiction absolue d'une entrée (déduite pour les anciennes planifications)"""
+        if data.get("prediction_at"):
+            return datetime.fromisoformat(data["prediction_at"])
+        generated_at = datetime.strptime(data["generated_at"], "%Y-%m-%d %H:%M:%S")
+        prediction_clock = datetime.strptime(data["heure_prediction"], "%H:%M").time()
+        prediction_time = datetime.combine(generated_at.date(), prediction_clock)
+        if prediction_time < generated_at:
+            prediction_time += timedelta(days=1)
+        return prediction_time
+
+    def materialize(self, schedule: Dict[str, Any], now: datetime) -> List[str]:
+        """Ajoute les créneaux de la fenêtre absents de schedule; retourne les numéros ajoutés"""
+        added = []
+        for entry in self.rule.iter_slots(now, now + self.window):
+            numero = entry.pop("numero")
+            if numero in schedule:
+                continue  # Créneau déjà matérialisé (son état de lancement est conservé)
+            schedule[numero] = entry
+            added.append(numero)
+        return added
+
+    def extend(self, schedule: Dict[str, Any], now: datetime) -> Optional[str]:
+        """Matérialise le créneau suivant le dernier créneau présent"""
+        last_slot = max((data["slot"] for data in schedule.values() if "slot" in data), default=None)
+        index = self.rule.slot_index(now) if last_slot is None else max(last_slot + 1, self.rule.slot_index(now))
+        entry = self.rule.slot(index, now)
+        numero = entry.pop("numero")
+        if numero in schedule:
+            return None
+        schedule[numero] = entry
+        return numero
+
+    def evict_past(self, schedule: Dict[str, Any], now: datetime) -> Dict[str, Any]:
+        """Retire les entrées passées du délai de grâce et les archive par jour de prédiction"""
+        cutoff = now - self.grace
+        by_day: Dict[str, Dict[str, Any]] = {}
+        for numero, data in list(schedule.items()):
+            try:
+                prediction_time = self.entry_prediction_time(data)
+            except (KeyError, ValueError):
+                continue
+            if prediction_time < cutoff:
+                by_day.setdefault(prediction_time.strftime("%Y-%m-%d"), {})[numero] = schedule.pop(numero)
+        if self.archive is not None:
+            self.archive.append(by_day)
+        return {numero: data for entries in by_day.values() for numero, data in entries.items()}
+
+    def roll(self, schedule: Dict[str, Any], now: datetime) -> Tuple[List[str], List[str]]:
+        """Avance la fenêtre: archive le passé puis matérialise l'avenir; retourne (évincés, ajoutés)"""
+        evicted = list(self.evict_past(schedule, now))
+        added = self.materialize(schedule, now)
+        return evicted, added
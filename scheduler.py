@@ -1,15 +1,27 @@
 import random
 import asyncio
+import copy
+import re
 import yaml
 import os
+from contextlib import nullcontext
 from datetime import datetime, timedelta
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Union
 from telethon import TelegramClient
 
+from game_parser import GameResult, as_game_result, count_cards
+from launch_timer import LaunchTimer
+from schedule_rule import RollingSchedule, ScheduleArchive, ScheduleRule
+
+ROLL_KEY = "__roll__"  # Échéance interne d'avancement de la fenêtre de planification
+# Seul format de numéro vérifié par le planificateur ("#N123."), plus strict que l'analyseur partagé
+SCHEDULER_NUMBER_TOKEN_RE = re.compile(r"#N\d+\.")
+
 class PredictionScheduler:
     """Système de planification automatique des prédictions"""
     
-    def __init__(self, client: TelegramClient, predictor, source_channel_id: int, target_channel_id: int):
+    def __init__(self, client: TelegramClient, predictor, source_channel_id: int, target_channel_id: int,
+                 writer=None, rule: Optional[ScheduleRule] = None, outbound=None, profiler=None):
         """
         Initialise le planificateur
         
@@ -18,6 +30,10 @@ class PredictionScheduler:
             predictor: Instance du CardPredictor
             source_channel_id: ID du canal source pour vérification
             target_channel_id: ID du canal cible pour diffusion
+            writer: PersistenceWriter optionnel pour sauvegarder hors de la boucle asyncio
+            rule: Règle de planification (intervalle, décalage de lancement, graine)
+            outbound: OutboundQueue optionnelle (débit limité, FloodWait géré) pour les envois
+            profiler: RuntimeProfiler optionnel (minuteurs d'étapes de la boucle du planificateur)
         """
         self.client = client
         self.predictor = predictor
@@ -26,78 +42,29 @@ class PredictionScheduler:
         self.schedule_file = "prediction.yaml"
         self.is_running = False
         self.schedule_data = {}
+        self.writer = writer
+        self.outbound = outbound or client  # Même interface send_message / edit_message
+        self.profiler = profiler
+        self.timer = LaunchTimer()  # Échéances de lancement absolues
+        self.rolling = RollingSchedule(rule or ScheduleRule(), archive=ScheduleArchive(writer=writer))
         
+    @property
+    def rule(self) -> ScheduleRule:
+        return self.rolling.rule
+    
     def generate_next_prediction_time(self, current_time: Optional[datetime] = None) -> Dict[str, Any]:
         """Génère la prochaine prédiction avec lancement variable (1-4 min avant)"""
         if current_time is None:
             current_time = datetime.now()
-        
-        # Ajouter un intervalle fixe pour la prochaine prédiction (ex: 1 heure)
-        next_time = current_time + timedelta(hours=1)
-        
-        # Générer un numéro de prédiction basé sur l'heure
-        # Format: heure + minutes (ex: 7:30 -> N730)
-        numero_predit = f"N{next_time.hour:02d}{next_time.minute:02d}"
-        
-        # VARIABLE: Heure de lancement entre 1-4 minutes avant la prédiction
-        launch_offset_minutes = random.randint(1, 4)  # 1-4 minutes avant comme demandé
-        launch_time = next_time - timedelta(minutes=launch_offset_minutes)
-        
-        prediction_data = {
-            "numero": numero_predit,
-            "heure_lancement": launch_time.strftime("%H:%M"),
-            "heure_prediction": next_time.strftime("%H:%M"),
-            "statut": "⌛",
-            "message_id": None,
-            "chat_id": None,
-            "launched": False,
-            "verified": False,
-            "generated_at": current_time.strftime("%Y-%m-%d %H:%M:%S"),
-            "launch_offset": launch_offset_minutes
-        }
-        
-        return prediction_data
+        return self.rule.slot(self.rule.slot_index(current_time), current_time)
 
     def generate_daily_schedule(self) -> Dict[str, Any]:
-        """Génère une planification avec heures de lancement variables"""
+        """Génère une planification avec heures de lancement variables (fenêtre à venir uniquement)"""
         planification = {}
-        current_time = datetime.now()
-        
-        # Générer des prédictions toutes les heures avec lancement variable
-        num_predictions = 12  # 12 prédictions sur 12 heures
-        
-        for i in range(num_predictions):
-            # Calculer l'heure de prédiction (toutes les heures)
-            prediction_time = current_time + timedelta(hours=i+1)
-            
-            # Générer numéro basé sur l'heure de prédiction
-            numero = f"N{prediction_time.hour:02d}{prediction_time.minute:02d}"
-            
-            # VARIABLE: Lancement entre 1-4 minutes avant comme demandé
-            launch_offset_minutes = random.randint(1, 4)
-            launch_time = prediction_time - timedelta(minutes=launch_offset_minutes)
-            
-            # Éviter les doublons de numéros
-            counter = 0
-            original_numero = numero
-            while numero in planification:
-                counter += 1
-                numero = f"{original_numero}_{counter}"
-            
-            planification[numero] = {
-                "heure_lancement": launch_time.strftime("%H:%M"),
-                "heure_prediction": prediction_time.strftime("%H:%M"),
-                "statut": "⌛",
-                "message_id": None,
-                "chat_id": None,
-                "launched": False,
-                "verified": False,
-                "generated_at": current_time.strftime("%Y-%m-%d %H:%M:%S"),
-                "launch_offset": launch_offset_minutes
-            }
+        added = self.rolling.materialize(planification, datetime.now())
         
-        print(f"✅ Planification avec lancement variable générée: {num_predictions} prédictions")
-        print(f"    Variations de lancement: 1-4 minutes avant chaque prédiction")
+        print(f"✅ Planification avec lancement variable générée: {len(added)} prédictions")
+        print(f"    Variations de lancement: {self.rule.offset_min}-{self.rule.offset_max} minutes avant chaque prédiction")
         return planification
     
     def save_schedule(self, schedule_data: Dict[str, Any]):
@@ -109,6 +76,13 @@ class PredictionScheduler:
         except Exception as e:
             print(f"❌ Erreur sauvegarde planification: {e}")
     
+    def request_save(self):
+        """Sauvegarde différée et regroupée si un écrivain est fourni, immédiate sinon"""
+        if self.writer is None:
+            self.save_schedule(self.schedule_data)
+            return
+        self.writer.mark_dirty('schedule', lambda: copy.deepcopy(self.schedule_data), self.save_schedule)
+    
     def load_schedule(self) -> Dict[str, Any]:
         """Charge la planification depuis le fichier YAML"""
         try:
@@ -139,23 +113,71 @@ class PredictionScheduler:
                 pending.append((numero, data))
         return pending
     
+    @staticmethod
+    def get_launch_datetime(data: Dict[str, Any]) -> datetime:
+        """Heure de lancement absolue (déduite de generated_at pour les anciennes planifications)"""
+        if data.get("lancement_at"):
+            return datetime.fromisoformat(data["lancement_at"])
+        generated_at = datetime.strptime(data["generated_at"], "%Y-%m-%d %H:%M:%S")
+        launch_clock = datetime.strptime(data["heure_lancement"], "%H:%M").time()
+        launch = datetime.combine(generated_at.date(), launch_clock)
+        if launch < generated_at:
+            launch += timedelta(days=1)
+        return launch
+    
+    def schedule_launch(self, numero: str, data: Dict[str, Any]):
+        """Arme la minuterie pour une prédiction non lancée"""
+        if data.get("launched") or data.get("statut") != "⌛":
+            return
+        self.timer.add(numero, self.get_launch_datetime(data))
+    
+    def cancel_launch(self, numero: str) -> bool:
+        """Annule le lancement planifié d'une prédiction"""
+        return self.timer.remove(numero)
+    
+    def reschedule_launch(self, numero: str, launch_time: datetime) -> bool:
+        """Déplace le lancement d'une prédiction à une nouvelle heure absolue"""
+        data = self.schedule_data.get(numero)
+        if data is None or data.get("launched"):
+            return False
+        data["heure_lancement"] = launch_time.strftime("%H:%M")
+        data["lancement_at"] = launch_time.isoformat(timespec="seconds")
+        self.timer.reschedule(numero, launch_time)
+        self.request_save()
+        return True
+    
+    def arm_timer(self):
+        """Reconstruit la minuterie à partir de la planification chargée"""
+        self.timer.clear()
+        for numero, data in self.schedule_data.items():
+            self.schedule_launch(numero, data)
+        self.timer.add(ROLL_KEY, datetime.now() + timedelta(minutes=self.rule.interval_minutes))
+    
+    def roll_schedule(self, now: Optional[datetime] = None) -> bool:
+        """Avance la fenêtre glissante: archive les jours passés, matérialise les créneaux à venir"""
+        now = now or datetime.now()
+        evicted, added = self.rolling.roll(self.schedule_data, now)
+        for numero in evicted:
+            self.cancel_launch(numero)
+        for numero in added:
+            self.schedule_launch(numero, self.schedule_data[numero])
+        self.timer.add(ROLL_KEY, now + timedelta(minutes=self.rule.interval_minutes))
+        if evicted or added:
+            self.request_save()
+            print(f"🔄 Planification avancée: {len(added)} ajoutées, {len(evicted)} archivées")
+        return bool(evicted or added)
+    
     def add_next_prediction(self):
-        """Ajoute une nouvelle prédiction à la planification"""
+        """Ajoute le créneau suivant le dernier créneau planifié"""
         try:
-            new_prediction = self.generate_next_prediction_time()
-            numero = new_prediction.pop("numero")
+            numero = self.rolling.extend(self.schedule_data, datetime.now())
+            if numero is None:
+                print("⚠️ Créneau suivant déjà planifié")
+                return None
             
-            # Éviter les doublons
-            counter = 1
-            original_numero = numero
-            while numero in self.schedule_data:
-                # Modifier légèrement le numéro si doublon
-                base_num = int(original_numero[1:])
-                numero = f"N{base_num + counter:04d}"
-                counter += 1
-            
-            self.schedule_data[numero] = new_prediction
-            self.save_schedule(self.schedule_data)
+            new_prediction = self.schedule_data[numero]
+            self.schedule_launch(numero, new_prediction)
+            self.request_save()
             
             print(f"✅ Nouvelle prédiction ajoutée: {numero} à {new_prediction['heure_lancement']}")
             return numero
@@ -194,7 +216,7 @@ class PredictionScheduler:
             prediction_text = f"🔵{game_number} 🔵2D: {suit_prediction} :⏳"
             
             # Envoie le message au canal cible
-            sent_message = await self.client.send_message(self.target_channel_id, prediction_text)
+            sent_message = await self.outbound.send_message(self.target_channel_id, prediction_text)
             
             # Met à jour les données
             data["launched"] = True
@@ -203,10 +225,10 @@ class PredictionScheduler:
             data["prediction_format"] = suit_prediction
             
             # Ajouter à la prédiction status pour éviter les doublons
-            self.predictor.prediction_status[game_number] = '⌛'
+            self.predictor.set_prediction_status(game_number, '⌛')
             
-            # Sauvegarde
-            self.save_schedule(self.schedule_data)
+            # Sauvegarde (hors de la boucle asyncio si possible)
+            self.request_save()
             
             print(f"🚀 Prédiction automatique lancée: {numero} ({suit_prediction}) à {data['heure_lancement']}")
             return True
@@ -248,7 +270,7 @@ class PredictionScheduler:
                 game_number = int(numero.replace('N', ''))
                 new_text = f"🔵{game_number} 🔵2D: statut :{new_status}"
 
-                await self.client.edit_message(
+                await self.outbound.edit_message(
                     data["chat_id"], 
                     data["message_id"], 
                     new_text
@@ -262,32 +284,13 @@ class PredictionScheduler:
         Vérifie si chaque groupe a exactement 2 cartes (symboles)
         Selon l'algorithme : ne compte que ♠️, ♣️, ♥️, ♦️
         """
-        def count_cards(symbols_str: str) -> int:
-            # Compter d'abord les versions emoji, puis les versions simples
-            emoji_symbols = ['♠️', '♥️', '♦️', '♣️']
-            simple_symbols = ['♠', '♥', '♦', '♣']
-            
-            temp_str = symbols_str
-            emoji_count = 0
-            
-            for emoji in emoji_symbols:
-                count = temp_str.count(emoji)
-                emoji_count += count
-                temp_str = temp_str.replace(emoji, 'X')
-            
-            simple_count = 0
-            for symbol in simple_symbols:
-                simple_count += temp_str.count(symbol)
-                
-            return emoji_count + simple_count
-        
         count1 = count_cards(group1)
         count2 = count_cards(group2)
         
         print(f"🃏 Comptage cartes: groupe1='{group1}'→{count1}, groupe2='{group2}'→{count2}")
         return count1 == 2 and count2 == 2
     
-    def verify_prediction_from_message(self, message_text: str, predicted_numbers: list) -> tuple:
+    def verify_prediction_from_message(self, message_text: Union[str, GameResult], predicted_numbers: list) -> tuple:
         """
         Vérifie une prédiction selon l'algorithme spécifié :
         1. Cherche le numéro exact (offset 0) → ✅0️⃣
@@ -295,23 +298,20 @@ class PredictionScheduler:
         3. Cherche le numéro +2 (offset 2) → ✅2️⃣
         4. Sinon → 📌❌
         """
-        import re
+        result = as_game_result(message_text)
         
-        # Extrait le numéro du message
-        match = re.search(r"#N(\d+)\.", message_text)
-        if not match:
+        # Numéro du message
+        if result.number_token is None or not SCHEDULER_NUMBER_TOKEN_RE.fullmatch(result.number_token):
             return None, None
         
-        current_number = int(match.group(1))
+        current_number = result.game_number
         print(f"🔍 Message reçu pour #N{current_number}")
         
-        # Extrait les groupes de cartes entre parenthèses
-        groups = re.findall(r"\(([^)]*)\)", message_text)
-        if len(groups) < 2:
-            print(f"❌ Groupes insuffisants dans le message: {groups}")
+        # Groupes de cartes entre parenthèses
+        if not result.has_groups:
+            print("❌ Groupes insuffisants dans le message")
             return None, None
         
-        group1, group2 = groups[0], groups[1]
         
         # Vérifie si ce message correspond à une prédiction
         for predicted_num in predicted_numbers:
@@ -323,7 +323,8 @@ class PredictionScheduler:
                     print(f"🎯 Correspondance trouvée: prédiction N{predicted_num:03d} vs message N{current_number} (offset {offset})")
                     
                     # Vérifie la distribution des cartes
-                    if self.check_card_distribution(group1, group2):
+                    print(f"🃏 Comptage cartes: groupe1='{result.first_group}'→{result.first_count}, groupe2='{result.second_group}'→{result.second_count}")
+                    if result.is_valid_distribution:
                         # Détermine le statut selon l'offset
                         if offset == 0:
                             status = "✅0️⃣"
@@ -342,39 +343,55 @@ class PredictionScheduler:
         return None, None
     
     async def run_scheduler(self):
-        """Boucle principale du planificateur"""
+        """Boucle principale du planificateur: dort jusqu'à la prochaine échéance de lancement"""
         print("🚀 Démarrage du planificateur automatique")
         
-        # Charge ou génère la planification
+        # Charge la planification puis avance la fenêtre glissante
         self.schedule_data = self.load_schedule()
-        if not self.schedule_data:
-            self.schedule_data = self.generate_daily_schedule()
-            self.save_schedule(self.schedule_data)
+        self.arm_timer()
+        self.roll_schedule()
         
         self.is_running = True
         
         while self.is_running:
             try:
-                current_time = self.get_current_time_slot()
-                
-                # Lance les prédictions en attente
-                pending_launches = self.get_pending_launches(current_time)
-                for numero, data in pending_launches:
-                    await self.launch_prediction(numero, data)
+                # Réveil à l'échéance exacte; les lancements en retard (pause, erreur) sont rattrapés
+                for numero in await self.timer.wait_next():
+                    if not self.is_running:
+                        break
+                    if numero == ROLL_KEY:
+                        with self._stage('scheduler_roll'):
+                            self.roll_schedule()
+                        continue
+                    data = self.schedule_data.get(numero)
+                    if data is None or data.get("launched"):
+                        continue
+                    with self._stage('scheduler_launch'):
+                        await self.launch_due_prediction(numero, data)
                 
                 # Les vérifications automatiques sont maintenant gérées 
                 # directement dans handle_messages() lors de la réception des messages
                 
-                # Attendre 30 secondes avant le prochain cycle
-                await asyncio.sleep(30)
-                
             except Exception as e:
                 print(f"❌ Erreur dans le planificateur: {e}")
                 await asyncio.sleep(60)  # Attendre plus longtemps en cas d'erreur
     
+    def _stage(self, name: str):
+        return self.profiler.stage(name) if self.profiler else nullcontext()
+    
+    async def launch_due_prediction(self, numero: str, data: Dict[str, Any]):
+        """Lance une prédiction échue, sauf si l'heure de prédiction est déjà passée"""
+        launch_at = self.get_launch_datetime(data)
+        prediction_at = launch_at + timedelta(minutes=data.get("launch_offset", 0))
+        if datetime.now() > prediction_at:
+            print(f"⚠️ Lancement manqué pour {numero} (prévu {launch_at:%H:%M}), prédiction déjà passée")
+            return False
+        return await self.launch_prediction(numero, data)
+    
     def stop_scheduler(self):
         """Arrête le planificateur"""
         self.is_running = False
+        self.timer.wake()
         print("🛑 Planificateur arrêté")
     
     def get_schedule_status(self) -> Dict[str, Any]:
@@ -388,12 +405,14 @@ class PredictionScheduler:
         pending = total - launched
         
         # Prochaine prédiction
-        current_time = self.get_current_time_slot()
         next_launch = None
-        for numero, data in self.schedule_data.items():
-            if not data["launched"] and data["heure_lancement"] > current_time:
-                next_launch = f"{numero} à {data['heure_lancement']}"
-                break
+        upcoming = [
+            (self.get_launch_datetime(data), numero) for numero, data in self.schedule_data.items()
+            if numero in self.timer
+        ]
+        if upcoming:
+            launch_at, numero = min(upcoming)
+            next_launch = f"{numero} à {launch_at:%H:%M}"
         
         return {
             "total": total,
@@ -404,11 +423,21 @@ class PredictionScheduler:
             "is_running": self.is_running
         }
     
-    def regenerate_schedule(self):
-        """Régénère une nouvelle planification quotidienne"""
-        self.schedule_data = self.generate_daily_schedule()
-        self.save_schedule(self.schedule_data)
+    def regenerate_schedule(self, seed: Optional[int] = None):
+        """Régénère la fenêtre à venir (nouvelle graine optionnelle); les prédictions lancées sont conservées"""
+        if seed is not None:
+            self.rolling.rule = self.rule.with_seed(seed)
+        self.schedule_data = {
+            numero: data for numero, data in self.schedule_data.items() if data.get("launched")
+        }
+        self.rolling.materialize(self.schedule_data, datetime.now())
+        self.request_save()
+        self.arm_timer()
         print("🔄 Nouvelle planification générée")
+    
+    def preview_schedule(self, days: int = 7) -> list:
+        """Aperçu de la planification sur plusieurs jours, calculé depuis la règle"""
+        return self.rule.preview(datetime.now(), days)
 
 # Exemple d'utilisation
 if __name__ == "__main__":
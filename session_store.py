@@ -0,0 +1,70 @@
+"""
+Session Telethon persistante et mesure du démarrage
+Une session stable (fichier ou chaîne en variable d'environnement) évite une nouvelle autorisation
+du bot à chaque redéploiement; les anciennes sessions horodatées sont supprimées
+"""
+import glob
+import os
+import time
+from typing import Any, Dict, List, Optional
+
+from telethon.sessions import StringSession
+
+DEFAULT_SESSION_NAME = "bot_session"
+STALE_SESSION_PATTERN = "bot_session_*.session"  # Sessions horodatées des anciennes versions
+
+
+def make_session(session_name: str = DEFAULT_SESSION_NAME, session_string: Optional[str] = None):
+    """Session à passer à TelegramClient: StringSession si fournie, sinon fichier <session_name>.session"""
+    if session_string:
+        return StringSession(session_string)
+    directory = os.path.dirname(session_name)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    return session_name
+
+
+def cleanup_stale_sessions(directory: str = ".", keep: Optional[str] = None) -> List[str]:
+    """Supprime les fichiers de session horodatés laissés par les démarrages précédents"""
+    keep_path = os.path.abspath(f"{keep}.session") if keep else None
+    removed = []
+    for path in glob.glob(os.path.join(directory, STALE_SESSION_PATTERN)):
+        if os.path.abspath(path) == keep_path:
+            continue
+        for candidate in (path, f"{path}-journal"):
+            try:
+                if os.path.exists(candidate):
+                    os.remove(candidate)
+                    removed.append(candidate)
+            except OSError as e:
+                print(f"⚠️ Impossible de supprimer {candidate}: {e}")
+    return removed
+
+
+class StartupTimer:
+    """Jalons du démarrage mesurés depuis le lancement du processus (connexion, premier message)"""
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.milestones: Dict[str, float] = {}
+
+    def mark(self, name: str) -> Optional[float]:
+        """Enregistre un jalon une seule fois; retourne sa durée en secondes s'il est nouveau"""
+        if name in self.milestones:
+            return None
+        elapsed = time.monotonic() - self.started
+        self.milestones[name] = elapsed
+        return elapsed
+
+    def get_stats(self) -> Dict[str, Any]:
+        return {name: round(elapsed, 3) for name, elapsed in self.milestones.items()}
+
+
+# Génération de SESSION_STRING (à exécuter une fois en local, puis copier la valeur dans Render)
+if __name__ == "__main__":
+    from telethon.sync import TelegramClient
+
+    string_client = TelegramClient(StringSession(), int(os.environ['API_ID']), os.environ['API_HASH'])
+    string_client.start(bot_token=os.environ['BOT_TOKEN'])
+    print(f"SESSION_STRING={string_client.session.save()}")
+    string_client.disconnect()
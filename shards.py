@@ -0,0 +1,65 @@
+"""
+Répartition multi-canaux
+Chaque paire canal stats → canal display est une partition isolée (prédicteur, persistance, compteurs);
+un message est routé vers sa partition par l'ID de son canal en O(1)
+"""
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional
+
+
+class ChannelPair(NamedTuple):
+    stat_channel: int
+    display_channel: int
+
+
+def parse_channel_pairs(spec: str) -> List[ChannelPair]:
+    """Analyse CHANNEL_PAIRS: 'stat:display,stat:display' (IDs négatifs acceptés)"""
+    pairs = []
+    for chunk in (spec or '').split(','):
+        chunk = chunk.strip()
+        if not chunk:
+            continue
+        try:
+            stat_channel, display_channel = (int(part) for part in chunk.split(':'))
+        except ValueError:
+            print(f"⚠️ Paire de canaux invalide ignorée: {chunk}")
+            continue
+        pairs.append(ChannelPair(stat_channel, display_channel))
+    return pairs
+
+
+class ShardRouter:
+    """Table canal stats → partition"""
+
+    def __init__(self):
+        self._by_stat_channel: Dict[int, Any] = {}
+
+    def __len__(self) -> int:
+        return len(self._by_stat_channel)
+
+    def __iter__(self) -> Iterator[Any]:
+        return iter(self._by_stat_channel.values())
+
+    def __contains__(self, chat_id: int) -> bool:
+        return chat_id in self._by_stat_channel
+
+    def get(self, chat_id: int) -> Optional[Any]:
+        return self._by_stat_channel.get(chat_id)
+
+    def register(self, stat_channel: int, shard: Any) -> bool:
+        """Associe un canal stats à une partition; False si le canal est déjà suivi par une autre"""
+        current = self._by_stat_channel.get(stat_channel)
+        if current is not None and current is not shard:
+            print(f"⚠️ Canal {stat_channel} déjà suivi, partition ignorée")
+            return False
+        self._by_stat_channel[stat_channel] = shard
+        return True
+
+    def rebind(self, old_stat_channel: Optional[int], new_stat_channel: int, shard: Any) -> bool:
+        """Déplace une partition vers un nouveau canal stats (commande /set_stat)"""
+        current = self._by_stat_channel.get(new_stat_channel)
+        if current is not None and current is not shard:
+            return False
+        if self._by_stat_channel.get(old_stat_channel) is shard:
+            del self._by_stat_channel[old_stat_channel]
+        self._by_stat_channel[new_stat_channel] = shard
+        return True
@@ -0,0 +1,535 @@
+"""
+Stockage SQLite (mode WAL, tables indexées) derrière l'API des gestionnaires YAML
+Alternative à YAMLDataManager et SimpleYAMLManager quand l'historique dépasse ce que des fichiers YAML complets supportent
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+from datetime import datetime, date, timedelta
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+from prediction_journal import PredictionJournal
+
+DEFAULT_DB_NAME = "bot.db"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS config (
+    key TEXT PRIMARY KEY,
+    value TEXT,
+    updated_at TEXT
+);
+CREATE TABLE IF NOT EXISTS predictions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    game_number INTEGER NOT NULL UNIQUE,
+    suit_combination TEXT,
+    status TEXT NOT NULL DEFAULT '⌛',
+    message_id INTEGER,
+    chat_id INTEGER,
+    created_at TEXT NOT NULL,
+    verified_at TEXT,
+    prediction_type TEXT NOT NULL DEFAULT 'manual',
+    archived INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_predictions_status ON predictions(status);
+CREATE INDEX IF NOT EXISTS idx_predictions_created_at ON predictions(created_at);
+CREATE INDEX IF NOT EXISTS idx_predictions_archived_game ON predictions(archived, game_number);
+CREATE TABLE IF NOT EXISTS auto_predictions (
+    date TEXT NOT NULL,
+    numero TEXT NOT NULL,
+    data TEXT NOT NULL,
+    launched INTEGER NOT NULL DEFAULT 0,
+    verified INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, numero)
+);
+CREATE INDEX IF NOT EXISTS idx_auto_predictions_date ON auto_predictions(date);
+CREATE TABLE IF NOT EXISTS message_log (
+    message_hash TEXT PRIMARY KEY,
+    channel_id INTEGER,
+    processed_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_message_log_processed_at ON message_log(processed_at);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Ouvre la base en mode WAL (lectures concurrentes, écritures courtes)"""
+    os.makedirs(os.path.dirname(db_path) or '.', exist_ok=True)
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    conn.row_factory = sqlite3.Row
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+def _set_meta(conn: sqlite3.Connection, key: str, value: Any):
+    conn.execute(
+        "INSERT INTO meta (key, value) VALUES (?, ?) ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+        (key, json.dumps(value, ensure_ascii=False))
+    )
+
+
+def _get_meta(conn: sqlite3.Connection, key: str, default=None):
+    row = conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+    return json.loads(row['value']) if row else default
+
+
+def migrate_from_yaml(conn: sqlite3.Connection, data_dir: str = "data"):
+    """Migration unique des fichiers data/*.yaml existants vers la base"""
+    if _get_meta(conn, 'yaml_migrated_at'):
+        return
+    import yaml
+
+    data_path = Path(data_dir)
+    counts = {'config': 0, 'predictions': 0, 'prediction_messages': 0, 'auto_predictions': 0, 'messages': 0,
+              'skipped_lines': 0}
+
+    def load(path: Path):
+        try:
+            if path.exists():
+                with open(path, 'r', encoding='utf-8') as f:
+                    return yaml.safe_load(f)
+        except Exception as e:
+            print(f"⚠️ Migration: lecture impossible de {path}: {e}")
+        return None
+
+    with conn:
+        config = load(data_path / "bot_config.yaml")
+        if isinstance(config, dict):
+            for key, entry in config.items():
+                entry = entry if isinstance(entry, dict) else {'value': entry}
+                conn.execute(
+                    "INSERT OR REPLACE INTO config (key, value, updated_at) VALUES (?, ?, ?)",
+                    (key, json.dumps(entry.get('value'), ensure_ascii=False), entry.get('updated_at'))
+                )
+                counts['config'] += 1
+
+        # predictions.yaml: liste (YAMLDataManager) ou {numéro: statut} avec compteurs (SimpleYAMLManager)
+        journal = PredictionJournal(str(data_path / "predictions.yaml"))
+        snapshot = journal.load_snapshot(default=None)
+        now = datetime.now().isoformat()
+        rows: Dict[int, Dict[str, Any]] = {}
+        locations: Dict[int, Any] = {}  # Messages de prédiction diffusés {numéro: {chat_id, message_id}}
+        if isinstance(snapshot, list):
+            for prediction in snapshot:
+                if isinstance(prediction, dict) and prediction.get('game_number') is not None:
+                    rows[int(prediction['game_number'])] = dict(prediction)
+        elif isinstance(snapshot, dict):
+            if snapshot.get('counters'):
+                _set_meta(conn, 'counters', snapshot['counters'])
+            if isinstance(snapshot.get('messages'), dict):
+                locations.update(snapshot['messages'])
+            statuses = snapshot['predictions'] if 'predictions' in snapshot else snapshot
+            for game_number, status in (statuses or {}).items():
+                rows[int(game_number)] = {'game_number': int(game_number), 'status': status,
+                                          'created_at': now, 'prediction_type': 'auto'}
+        journal_seq = snapshot.get('journal_seq') if isinstance(snapshot, dict) else None
+        for entry in journal.replay(after_seq=journal_seq):
+            game_number = entry.get('game_number')
+            if entry.get('op') == 'created' and game_number not in rows:
+                rows[game_number] = entry.get('prediction') or {
+                    'game_number': game_number, 'suit_combination': entry.get('suits'),
+                    'status': '⌛', 'created_at': entry.get('at', now), 'prediction_type': 'auto'
+                }
+            elif entry.get('op') == 'status' and game_number in rows:
+                rows[game_number]['status'] = entry['status']
+                rows[game_number]['verified_at'] = entry.get('at')
+            elif entry.get('op') == 'message' and game_number is not None:
+                locations[game_number] = {'chat_id': entry.get('chat_id'), 'message_id': entry.get('message_id')}
+        for prediction in rows.values():
+            conn.execute(
+                """INSERT OR IGNORE INTO predictions
+                   (game_number, suit_combination, status, message_id, chat_id, created_at, verified_at, prediction_type)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
+                (prediction['game_number'], prediction.get('suit_combination'), prediction.get('status', '⌛'),
+                 prediction.get('message_id'), prediction.get('chat_id'), prediction.get('created_at') or now,
+                 prediction.get('verified_at'), prediction.get('prediction_type') or 'manual')
+            )
+            counts['predictions'] += 1
+        for game_number, location in locations.items():
+            if isinstance(location, dict):
+                chat_id, message_id = location.get('chat_id'), location.get('message_id')
+            else:
+                chat_id, message_id = location
+            cursor = conn.execute(
+                "UPDATE predictions SET chat_id = ?, message_id = ? WHERE game_number = ?",
+                (chat_id, message_id, int(game_number))
+            )
+            counts['prediction_messages'] += cursor.rowcount
+
+        auto_predictions = load(data_path / "auto_predictions.yaml")
+        if isinstance(auto_predictions, dict):
+            for day, schedule in auto_predictions.items():
+                for numero, data in (schedule or {}).items():
+                    conn.execute(
+                        "INSERT OR REPLACE INTO auto_predictions (date, numero, data, launched, verified) VALUES (?, ?, ?, ?, ?)",
+                        (str(day), numero, json.dumps(data, ensure_ascii=False),
+                         int(bool(data.get('launched'))), int(bool(data.get('verified'))))
+                    )
+                    counts['auto_predictions'] += 1
+
+        hashes_file = data_path / "message_hashes.log"
+        if hashes_file.exists():
+            with open(hashes_file, 'r', encoding='utf-8') as f:
+                for line_number, line in enumerate(f, start=1):
+                    parts = line.split()
+                    try:
+                        if len(parts) != 2:
+                            raise ValueError("format attendu: <horodatage> <hachage>")
+                        processed_at = datetime.fromtimestamp(float(parts[0])).isoformat()
+                    except (ValueError, OverflowError, OSError) as e:
+                        # Ligne corrompue (écriture interrompue...): ignorée, le reste de la migration continue
+                        if line.strip():
+                            counts['skipped_lines'] += 1
+                            print(f"⚠️ Migration: ligne {line_number} de {hashes_file} ignorée: {e}")
+                        continue
+                    conn.execute(
+                        "INSERT OR IGNORE INTO message_log (message_hash, processed_at) VALUES (?, ?)",
+                        (parts[1], processed_at)
+                    )
+                    counts['messages'] += 1
+        message_log = load(data_path / "message_log.yaml")
+        if isinstance(message_log, list):
+            for msg in message_log:
+                if isinstance(msg, dict) and msg.get('message_hash'):
+                    conn.execute(
+                        "INSERT OR IGNORE INTO message_log (message_hash, channel_id, processed_at) VALUES (?, ?, ?)",
+                        (msg['message_hash'], msg.get('channel_id'), msg.get('processed_at') or now)
+                    )
+                    counts['messages'] += 1
+
+        _set_meta(conn, 'yaml_migrated_at', now)
+    print(f"✅ Migration YAML → SQLite: {counts}")
+
+
+class SQLiteDataManager:
+    """Gestionnaire de données SQLite, mêmes méthodes que YAMLDataManager"""
+
+    def __init__(self, data_dir: str = "data", db_name: str = DEFAULT_DB_NAME):
+        self.data_dir = Path(data_dir)
+        self.data_dir.mkdir(exist_ok=True)
+        self.db_path = str(self.data_dir / db_name)
+        self.conn = connect(self.db_path)
+        self._lock = threading.Lock()
+        migrate_from_yaml(self.conn, str(self.data_dir))
+        print("✅ Gestionnaire SQLite initialisé")
+
+    def _execute(self, query: str, params=()) -> sqlite3.Cursor:
+        with self._lock, self.conn:
+            return self.conn.execute(query, params)
+
+    def _fetchall(self, query: str, params=()) -> List[sqlite3.Row]:
+        with self._lock:
+            return self.conn.execute(query, params).fetchall()
+
+    def set_config(self, key: str, value: Any):
+        """Sauvegarde une valeur de configuration"""
+        try:
+            self._execute(
+                """INSERT INTO config (key, value, updated_at) VALUES (?, ?, ?)
+                   ON CONFLICT(key) DO UPDATE SET value = excluded.value, updated_at = excluded.updated_at""",
+                (key, json.dumps(value, ensure_ascii=False), datetime.now().isoformat())
+            )
+        except Exception as e:
+            print(f"❌ Erreur set_config: {e}")
+
+    def get_config(self, key: str, default=None):
+        """Récupère une valeur de configuration"""
+        try:
+            rows = self._fetchall("SELECT value FROM config WHERE key = ?", (key,))
+            return json.loads(rows[0]['value']) if rows else default
+        except Exception as e:
+            print(f"❌ Erreur get_config: {e}")
+            return default
+
+    def save_prediction(self, game_number: int, suit_combination: str,
+                        message_id: Optional[int] = None, chat_id: Optional[int] = None,
+                        prediction_type: str = 'manual'):
+        """Sauvegarde une prédiction manuelle (ignorée si elle existe déjà)"""
+        try:
+            self._execute(
+                """INSERT OR IGNORE INTO predictions
+                   (game_number, suit_combination, status, message_id, chat_id, created_at, prediction_type)
+                   VALUES (?, ?, '⌛', ?, ?, ?, ?)""",
+                (game_number, suit_combination, message_id, chat_id, datetime.now().isoformat(), prediction_type)
+            )
+        except Exception as e:
+            print(f"❌ Erreur save_prediction: {e}")
+
+    def update_prediction_status(self, game_number: int, status: str):
+        """Met à jour le statut d'une prédiction"""
+        try:
+            self._execute(
+                "UPDATE predictions SET status = ?, verified_at = ? WHERE game_number = ?",
+                (status, datetime.now().isoformat(), game_number)
+            )
+        except Exception as e:
+            print(f"❌ Erreur update_prediction_status: {e}")
+
+    def get_pending_predictions(self) -> List[Dict]:
+        """Récupère les prédictions en attente"""
+        try:
+            rows = self._fetchall("SELECT * FROM predictions WHERE status = '⌛' ORDER BY game_number")
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"❌ Erreur get_pending_predictions: {e}")
+            return []
+
+    def get_predictions_between(self, first_game: int, last_game: int) -> List[Dict]:
+        """Prédictions d'une plage de numéros de jeu (requête indexée)"""
+        try:
+            rows = self._fetchall(
+                "SELECT * FROM predictions WHERE game_number BETWEEN ? AND ? ORDER BY game_number",
+                (first_game, last_game)
+            )
+            return [dict(row) for row in rows]
+        except Exception as e:
+            print(f"❌ Erreur get_predictions_between: {e}")
+            return []
+
+    def save_auto_prediction_schedule(self, schedule_data: Dict[str, Any]):
+        """Sauvegarde la planification automatique complète du jour"""
+        try:
+            today = date.today().isoformat()
+            with self._lock, self.conn:
+                self.conn.execute("DELETE FROM auto_predictions WHERE date = ?", (today,))
+                self.conn.executemany(
+                    "INSERT INTO auto_predictions (date, numero, data, launched, verified) VALUES (?, ?, ?, ?, ?)",
+                    [(today, numero, json.dumps(data, ensure_ascii=False),
+                      int(bool(data.get('launched'))), int(bool(data.get('verified'))))
+                     for numero, data in schedule_data.items()]
+                )
+        except Exception as e:
+            print(f"❌ Erreur save_auto_prediction_schedule: {e}")
+
+    def load_auto_prediction_schedule(self) -> Dict[str, Any]:
+        """Charge la planification automatique du jour"""
+        try:
+            rows = self._fetchall(
+                "SELECT numero, data FROM auto_predictions WHERE date = ?", (date.today().isoformat(),)
+            )
+            return {row['numero']: json.loads(row['data']) for row in rows}
+        except Exception as e:
+            print(f"❌ Erreur load_auto_prediction_schedule: {e}")
+            return {}
+
+    def update_auto_prediction(self, numero: str, updates: Dict[str, Any]):
+        """Met à jour une prédiction automatique"""
+        try:
+            today = date.today().isoformat()
+            with self._lock, self.conn:
+                row = self.conn.execute(
+                    "SELECT data FROM auto_predictions WHERE date = ? AND numero = ?", (today, numero)
+                ).fetchone()
+                if row is None:
+                    return
+                data = json.loads(row['data'])
+                data.update(updates)
+                self.conn.execute(
+                    "UPDATE auto_predictions SET data = ?, launched = ?, verified = ? WHERE date = ? AND numero = ?",
+                    (json.dumps(data, ensure_ascii=False), int(bool(data.get('launched'))),
+                     int(bool(data.get('verified'))), today, numero)
+                )
+        except Exception as e:
+            print(f"❌ Erreur update_auto_prediction: {e}")
+
+    @staticmethod
+    def _message_hash(message_content: str, channel_id: int) -> str:
+        return hashlib.sha256(f"{channel_id}:{message_content}".encode()).hexdigest()
+
+    def is_message_processed(self, message_content: str, channel_id: int) -> bool:
+        """Vérifie si un message a déjà été traité (recherche par clé primaire)"""
+        try:
+            rows = self._fetchall(
+                "SELECT 1 FROM message_log WHERE message_hash = ?", (self._message_hash(message_content, channel_id),)
+            )
+            return bool(rows)
+        except Exception as e:
+            print(f"❌ Erreur is_message_processed: {e}")
+            return False
+
+    def mark_message_processed(self, message_content: str, channel_id: int):
+        """Marque un message comme traité"""
+        try:
+            self._execute(
+                "INSERT OR IGNORE INTO message_log (message_hash, channel_id, processed_at) VALUES (?, ?, ?)",
+                (self._message_hash(message_content, channel_id), channel_id, datetime.now().isoformat())
+            )
+        except Exception as e:
+            print(f"❌ Erreur mark_message_processed: {e}")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne les statistiques du bot (agrégats indexés)"""
+        try:
+            manual = self._fetchall(
+                """SELECT COUNT(*) AS total,
+                          SUM(CASE WHEN status LIKE '✅%' THEN 1 ELSE 0 END) AS success,
+                          SUM(CASE WHEN status = '⌛' THEN 1 ELSE 0 END) AS pending
+                   FROM predictions"""
+            )[0]
+            auto = self._fetchall(
+                """SELECT COUNT(*) AS total, COALESCE(SUM(launched), 0) AS launched,
+                          COALESCE(SUM(verified), 0) AS verified
+                   FROM auto_predictions WHERE date = ?""",
+                (date.today().isoformat(),)
+            )[0]
+            return {
+                'manual': {'total': manual['total'], 'success': manual['success'] or 0, 'pending': manual['pending'] or 0},
+                'auto': {'total': auto['total'], 'launched': auto['launched'], 'verified': auto['verified']}
+            }
+        except Exception as e:
+            print(f"❌ Erreur get_stats: {e}")
+            return {'manual': {}, 'auto': {}}
+
+    def cleanup_old_data(self, days_to_keep: int = 30):
+        """Nettoie les anciennes planifications et entrées de dédoublonnage"""
+        try:
+            cutoff = datetime.now().date() - timedelta(days=days_to_keep)
+            with self._lock, self.conn:
+                removed = self.conn.execute(
+                    "DELETE FROM auto_predictions WHERE date < ?", (cutoff.isoformat(),)
+                ).rowcount
+                self.conn.execute("DELETE FROM message_log WHERE processed_at < ?", (cutoff.isoformat(),))
+            if removed:
+                print(f"🧹 Nettoyage: {removed} anciennes planifications supprimées")
+        except Exception as e:
+            print(f"❌ Erreur cleanup_old_data: {e}")
+
+
+class SQLitePredictionStore:
+    """Persistance des prédictions du bot principal, même API que SimpleYAMLManager
+
+    Chaque transition est une mise à jour d'une seule ligne; les compteurs sont écrits dans la même
+    transaction, aucun compactage n'est donc nécessaire.
+    """
+
+    def __init__(self, data_dir: str = "data", db_name: str = DEFAULT_DB_NAME, writer=None):
+        self.data_dir = data_dir
+        os.makedirs(self.data_dir, exist_ok=True)
+        self.conn = connect(os.path.join(self.data_dir, db_name))
+        self._lock = threading.Lock()
+        self.writer = writer
+        self._pending_ops: List[Dict[str, Any]] = []
+        migrate_from_yaml(self.conn, self.data_dir)
+
+    @property
+    def needs_compaction(self) -> bool:
+        return False
+
+    def record(self, op, counters=None, **fields):
+        """Enregistre une transition (created, status, message, evicted) et les compteurs à jour"""
+        entry = {'op': op, 'at': datetime.now().isoformat(), **fields}
+        if counters is not None:
+            entry['counters'] = counters.to_dict()
+        self._submit(entry)
+
+    def save_predictions(self, predictions, counters=None, messages=None):
+        """Remplace l'ensemble des prédictions actives (utilisé par /reset)"""
+        self._submit({'op': 'snapshot', 'at': datetime.now().isoformat(), 'predictions': dict(predictions),
+                      'counters': counters.to_dict() if counters else None,
+                      'messages': messages.to_dict() if messages else {}})
+
+    def _submit(self, entry):
+        self._pending_ops.append(entry)
+        if self.writer is not None:
+            self.writer.mark_dirty(f'predictions:{self.data_dir}', self._drain, self._apply_ops)
+        else:
+            self._apply_ops(self._drain())
+
+    def _drain(self):
+        ops, self._pending_ops = self._pending_ops, []
+        return ops
+
+    def _apply_ops(self, ops):
+        """Applique un lot de transitions dans une seule transaction (appelable depuis un thread)"""
+        if not ops:
+            return
+        with self._lock, self.conn:
+            counters = None
+            for entry in ops:
+                op = entry['op']
+                if op == 'created':
+                    self.conn.execute(
+                        """INSERT OR IGNORE INTO predictions (game_number, suit_combination, status, created_at, prediction_type)
+                           VALUES (?, ?, '⌛', ?, 'auto')""",
+                        (entry['game_number'], entry.get('suits'), entry['at'])
+                    )
+                elif op == 'status':
+                    self.conn.execute(
+                        "UPDATE predictions SET status = ?, verified_at = ? WHERE game_number = ?",
+                        (entry['status'], entry['at'], entry['game_number'])
+                    )
+                elif op == 'message':
+                    self.conn.execute(
+                        "UPDATE predictions SET chat_id = ?, message_id = ? WHERE game_number = ?",
+                        (entry['chat_id'], entry['message_id'], entry['game_number'])
+                    )
+                elif op == 'evicted':
+                    self.conn.executemany(
+                        "UPDATE predictions SET archived = 1 WHERE game_number = ?",
+                        [(game_number,) for game_number in entry.get('games', [])]
+                    )
+                elif op == 'snapshot':
+                    predictions = entry['predictions']
+                    self.conn.execute(
+                        "DELETE FROM predictions WHERE archived = 0 AND game_number NOT IN (SELECT value FROM json_each(?))",
+                        (json.dumps(list(predictions)),)
+                    )
+                    self.conn.executemany(
+                        """INSERT INTO predictions (game_number, status, created_at, prediction_type)
+                           VALUES (?, ?, ?, 'auto')
+                           ON CONFLICT(game_number) DO UPDATE SET status = excluded.status, archived = 0""",
+                        [(game_number, status, entry['at']) for game_number, status in predictions.items()]
+                    )
+                    self.conn.executemany(
+                        "UPDATE predictions SET chat_id = ?, message_id = ? WHERE game_number = ?",
+                        [(location['chat_id'], location['message_id'], game_number)
+                         for game_number, location in (entry.get('messages') or {}).items()]
+                    )
+                if entry.get('counters') is not None:
+                    counters = entry['counters']
+            if counters is not None:
+                _set_meta(self.conn, 'counters', counters)
+
+    def load_state(self):
+        """Charge (prédictions actives, compteurs)"""
+        try:
+            with self._lock:
+                rows = self.conn.execute(
+                    "SELECT game_number, status FROM predictions WHERE archived = 0"
+                ).fetchall()
+                counters = _get_meta(self.conn, 'counters')
+            return {row['game_number']: row['status'] for row in rows}, counters
+        except Exception as e:
+            print(f"❌ Erreur chargement prédictions SQLite: {e}")
+            return {}, None
+
+    def load_messages(self):
+        """Emplacements des messages de prédiction actifs {numéro: {chat_id, message_id}}"""
+        try:
+            with self._lock:
+                rows = self.conn.execute(
+                    """SELECT game_number, chat_id, message_id FROM predictions
+                       WHERE archived = 0 AND message_id IS NOT NULL"""
+                ).fetchall()
+            return {
+                row['game_number']: {'chat_id': row['chat_id'], 'message_id': row['message_id']}
+                for row in rows
+            }
+        except Exception as e:
+            print(f"❌ Erreur chargement messages SQLite: {e}")
+            return {}
+
+    def load_journal(self):
+        """Aucun journal à rejouer: chaque transition est déjà écrite en base"""
+        return []
+
+    def load_predictions(self):
+        return self.load_state()[0]
@@ -0,0 +1,28 @@
+"""
+Fixtures partagées: import du module principal dans un répertoire de travail temporaire
+"""
+import importlib
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def bot(tmp_path_factory):
+    pytest.importorskip("telethon")
+    pytest.importorskip("aiohttp")
+    workdir = tmp_path_factory.mktemp("bot")
+    previous_dir = os.getcwd()
+    os.chdir(workdir)
+    os.environ.setdefault("API_ID", "1")
+    os.environ.setdefault("API_HASH", "test")
+    os.environ["SESSION_NAME"] = str(workdir / "test_session")
+    if REPO_DIR not in sys.path:
+        sys.path.insert(0, REPO_DIR)
+    try:
+        yield importlib.import_module("deployer_v2024_render_main")
+    finally:
+        os.chdir(previous_dir)
@@ -0,0 +1,73 @@
+"""
+Curseur de rattrapage: persistance, avance monotone et écritures différées propres à chaque shard
+"""
+import asyncio
+import json
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from catchup import CatchupCursor, iter_missed_messages  # noqa: E402
+from persistence import PersistenceWriter  # noqa: E402
+
+
+def read_cursor(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)
+
+
+def test_cursor_never_moves_backwards(tmp_path):
+    path = str(tmp_path / "cursor.json")
+    cursor = CatchupCursor(path)
+    cursor.advance(-100, 10, game_number=5)
+    cursor.advance(-100, 7, game_number=3)
+    assert read_cursor(path) == {'channel_id': -100, 'last_message_id': 10, 'last_game_number': 5}
+    reloaded = CatchupCursor(path)
+    assert reloaded.for_channel(-100) == 10
+    assert reloaded.for_channel(-999) is None
+
+
+def test_shard_cursors_coalesce_independently(tmp_path):
+    first_path = str(tmp_path / "a" / "cursor.json")
+    second_path = str(tmp_path / "b" / "cursor.json")
+
+    async def run():
+        writer = PersistenceWriter(coalesce_delay=0.01)
+        writer.start()
+        first = CatchupCursor(first_path, writer=writer)
+        second = CatchupCursor(second_path, writer=writer)
+        # Les deux avancent dans la même fenêtre de regroupement
+        first.advance(-100, 11)
+        second.advance(-200, 22)
+        await writer.flush()
+        await writer.stop()
+
+    asyncio.run(run())
+    assert read_cursor(first_path)['last_message_id'] == 11
+    assert read_cursor(second_path)['last_message_id'] == 22
+
+
+class FakeMessage:
+    def __init__(self, message_id):
+        self.id = message_id
+        self.message = f"#N{message_id}."
+
+
+class FakeClient:
+    def __init__(self, existing_ids):
+        self.existing_ids = set(existing_ids)
+
+    async def get_messages(self, channel, ids):
+        return [FakeMessage(i) if i in self.existing_ids else None for i in ids]
+
+
+def test_iter_missed_messages_skips_gaps_and_stops_on_empty_batches():
+    client = FakeClient([3, 4, 9, 12])
+
+    async def collect():
+        return [[m.id for m in batch] async for batch in iter_missed_messages(client, -100, after_id=2, batch_size=5)]
+
+    assert asyncio.run(collect()) == [[3, 4], [9, 12]]
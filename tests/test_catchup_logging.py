@@ -0,0 +1,37 @@
+"""
+Rattrapage silencieux: seuls les journaux de la tâche qui rejoue sont écartés
+"""
+import asyncio
+import logging
+
+import pytest
+
+pytest.importorskip("telethon")
+pytest.importorskip("aiohttp")
+
+
+def test_replay_quiets_only_its_own_task(bot, caplog):
+    async def replay(started, release):
+        token = bot.replaying.set(True)
+        try:
+            bot.logger.info("rejeu")
+            started.set()
+            await release.wait()
+            bot.logger.warning("alerte rejeu")
+        finally:
+            bot.replaying.reset(token)
+
+    async def live(started, release):
+        await started.wait()
+        bot.logger.info("direct")
+        release.set()
+
+    async def run():
+        started, release = asyncio.Event(), asyncio.Event()
+        await asyncio.gather(replay(started, release), live(started, release))
+        bot.logger.info("après")
+
+    with caplog.at_level(logging.INFO, logger=bot.logger.name):
+        asyncio.run(run())
+    assert [record.getMessage() for record in caplog.records] == ["direct", "alerte rejeu", "après"]
+    assert bot.logger.level != logging.WARNING
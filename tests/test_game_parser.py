@@ -0,0 +1,79 @@
+"""
+Analyseur partagé: formats de messages reconnus et exigences propres à chaque consommateur
+"""
+import os
+import sys
+
+import pytest
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from game_parser import parse_game_message  # noqa: E402
+from predictor import CardPredictor  # noqa: E402
+
+
+@pytest.mark.parametrize("text, number", [
+    ("#N60. 8(7♥K♣A♦) - ✅ 6(9♦7♥) #T14", 60),
+    ("#N 60 8(7♥K♣) ✅ 6(9♦7♥)", 60),
+    ("#n60. (7♥K♣) (9♦7♥)", 60),
+    ("#60 (7♥K♣) (9♦7♥)", 60),
+    ("Jeu 60 (7♥K♣) (9♦7♥)", 60),
+    ("Game #60 (7♥K♣) (9♦7♥)", 60),
+    ("60. (7♥K♣) (9♦7♥)", 60),
+    ("(7♥K♣) (9♦7♥) #T14", None),
+])
+def test_game_number_formats(text, number):
+    assert parse_game_message(text).game_number == number
+
+
+def test_groups_cards_and_aces():
+    result = parse_game_message("#N7. 8(7♥️K♣A♦️) - ✅ 6(9♦7♥) #T14")
+    assert (result.first_count, result.second_count) == (3, 2)
+    assert (result.first_aces, result.second_aces) == (1, 0)
+    assert (result.first_suits, result.second_suits) == ("♥♣♦", "♦♥")
+    assert result.is_final and result.has_result_tag and not result.is_pending
+
+
+@pytest.mark.parametrize("text, number", [
+    ("#N60. (7♥K♣) (9♦7♥)", 60),
+    ("#N 60 (7♥K♣) (9♦7♥)", 60),
+    ("Jeu #60 (7♥K♣) (9♦7♥)", 60),
+    # Formats ajoutés par l'analyseur partagé, jamais acceptés par le CardPredictor
+    ("#60 (7♥K♣) (9♦7♥)", None),
+    ("60. (7♥K♣) (9♦7♥)", None),
+])
+def test_card_predictor_keeps_its_number_formats(text, number):
+    predictor = CardPredictor()
+    assert predictor.extract_game_number(text) == number
+    assert predictor.extract_game_number(parse_game_message(text)) == number
+
+
+def test_card_predictor_ace_is_any_letter_a():
+    predictor = CardPredictor()
+    # "A" sans couleur accolée: As pour le CardPredictor, pas pour l'analyseur partagé
+    text = "#N12. 8(A 7♥K♣) - ✅ 6(9♦7♥) #T14"
+    assert parse_game_message(text).first_aces == 0
+    should, predicted, _ = predictor.should_predict(text)
+    assert should and predicted == 13
+    assert predictor.should_predict("#N14. 8(7♥K♣) - ✅ 6(9♦7♥A) #T14")[0] is False
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("#N60. 4(7♥K♣) - ✅ 4(9♦7♥) #T8", (60, "✅0️⃣")),
+    ("#N61. 4(7♥K♣) - ✅ 4(9♦7♥) #T8", (60, "✅1️⃣")),
+    ("#N60. 5(7♥K♣Q♦) - ✅ 4(9♦7♥) #T9", (60, "📌❌")),
+    # Le planificateur n'a jamais accepté que "#N<chiffres>."
+    ("#N 60. 4(7♥K♣) - ✅ 4(9♦7♥) #T8", (None, None)),
+    ("#N60 4(7♥K♣) - ✅ 4(9♦7♥) #T8", (None, None)),
+    ("#60. 4(7♥K♣) - ✅ 4(9♦7♥) #T8", (None, None)),
+    ("Jeu 60 4(7♥K♣) - ✅ 4(9♦7♥) #T8", (None, None)),
+])
+def test_scheduler_keeps_strict_number_format(text, expected):
+    pytest.importorskip("telethon")
+    from scheduler import PredictionScheduler
+
+    scheduler = PredictionScheduler(None, None, 0, 0)
+    assert scheduler.verify_prediction_from_message(text, [60]) == expected
+    assert scheduler.verify_prediction_from_message(parse_game_message(text), [60]) == expected
@@ -0,0 +1,64 @@
+"""
+Dédoublonnage: éviction LRU/TTL et compactage du fichier en ajout seul
+"""
+import os
+import sys
+import time
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from message_dedupe import MessageDedupeStore  # noqa: E402
+
+
+def file_hashes(path):
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.split()[1] for line in f]
+
+
+def test_add_is_idempotent_and_survives_reload(tmp_path):
+    path = str(tmp_path / "hashes.log")
+    store = MessageDedupeStore(path)
+    assert store.add("a") is True
+    assert store.add("a") is False
+    assert MessageDedupeStore(path).contains("a")
+
+
+def test_lookup_protects_entry_from_capacity_eviction(tmp_path):
+    store = MessageDedupeStore(str(tmp_path / "hashes.log"), max_entries=2)
+    store.add("a")
+    store.add("b")
+    assert store.contains("a")
+    store.add("c")
+    assert store.contains("a") and store.contains("c")
+    assert not store.contains("b")
+
+
+def test_compaction_keeps_only_retained_hashes(tmp_path):
+    path = str(tmp_path / "hashes.log")
+    store = MessageDedupeStore(path, max_entries=3)
+    for index in range(6):
+        store.add(f"h{index}")
+    # Plus de 2 × max_entries lignes: réécriture avec les seuls hachages conservés
+    store.add("h6")
+    assert file_hashes(path) == ["h4", "h5", "h6"]
+    reloaded = MessageDedupeStore(path, max_entries=3)
+    assert len(reloaded) == 3 and reloaded.contains("h6") and not reloaded.contains("h0")
+
+
+def test_reload_drops_expired_and_malformed_lines(tmp_path):
+    path = tmp_path / "hashes.log"
+    now = time.time()
+    path.write_text(f"{now - 100:.0f} old\nnot-a-line\nabc def\n{now:.0f} fresh\n", encoding='utf-8')
+    store = MessageDedupeStore(str(path), ttl_seconds=50)
+    assert store.contains("fresh")
+    assert not store.contains("old")
+    assert len(store) == 1
+
+
+def test_import_hashes_rewrites_file(tmp_path):
+    path = str(tmp_path / "hashes.log")
+    store = MessageDedupeStore(path)
+    store.import_hashes(["x", "", "y"])
+    assert file_hashes(path) == ["x", "y"]
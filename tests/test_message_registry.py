@@ -0,0 +1,82 @@
+"""
+Modifications de statut regroupées: l'état par jeu est libéré à l'éviction et après un échec de diffusion
+"""
+import asyncio
+import os
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from message_registry import EditCoalescer, PredictionMessageRegistry  # noqa: E402
+
+
+class FakeOutbound:
+    def __init__(self):
+        self.edits = []
+
+    def edit_message(self, chat_id, message_id, text):
+        self.edits.append((chat_id, message_id, text))
+
+
+def test_edits_within_window_are_coalesced():
+    outbound = FakeOutbound()
+    registry = PredictionMessageRegistry({5: (-100, 42)})
+
+    async def run():
+        edits = EditCoalescer(outbound, registry, window=0.01)
+        edits.request(5, "⌛")
+        edits.request(5, "✅0️⃣")
+        await asyncio.sleep(0.05)
+        return edits.get_stats()
+
+    stats = asyncio.run(run())
+    assert outbound.edits == [(-100, 42, "✅0️⃣")]
+    assert stats['coalesced'] == 1 and stats['pending'] == 0
+
+
+def test_registry_eviction_forgets_pending_edits():
+    outbound = FakeOutbound()
+    registry = PredictionMessageRegistry({5: (-100, 42)})
+
+    async def run():
+        edits = EditCoalescer(outbound, registry, window=0.01)
+        edits.request(5, "✅0️⃣")
+        registry.evict({5})
+        await asyncio.sleep(0.05)
+        return edits.get_stats()
+
+    assert asyncio.run(run())['pending'] == 0
+    assert outbound.edits == []
+
+
+def test_failed_broadcast_does_not_leave_waiting_text():
+    outbound = FakeOutbound()
+    registry = PredictionMessageRegistry()
+
+    async def run():
+        edits = EditCoalescer(outbound, registry, window=0.01)
+        edits.request(7, "✅0️⃣")
+        await asyncio.sleep(0.05)
+        waiting = edits.get_stats()['pending']
+        # Diffusion initiale échouée: le message ne sera jamais enregistré
+        edits.forget([7])
+        return waiting, edits.get_stats()['pending']
+
+    assert asyncio.run(run()) == (1, 0)
+
+
+def test_clear_cancels_everything():
+    outbound = FakeOutbound()
+    registry = PredictionMessageRegistry({5: (-100, 42)})
+
+    async def run():
+        edits = EditCoalescer(outbound, registry, window=0.01)
+        edits.request(5, "✅0️⃣")
+        edits.clear()
+        await asyncio.sleep(0.05)
+        return edits.get_stats()['pending']
+
+    assert asyncio.run(run()) == 0
+    assert outbound.edits == []
@@ -0,0 +1,131 @@
+"""
+File d'envoi: seaux à jetons par canal avec de vrais InputPeer (non hachables), erreurs permanentes
+et transitoires, répartiteur qui survit à une tâche invalide
+"""
+import asyncio
+import os
+import sys
+
+import pytest
+
+pytest.importorskip("telethon")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from telethon.tl.types import InputPeerChannel  # noqa: E402
+
+import outbound  # noqa: E402
+from outbound import OutboundQueue, chat_key  # noqa: E402
+
+CHANNEL_ID = -1001234567890
+PEER = InputPeerChannel(1234567890, 0)
+
+
+class PermanentError(Exception):
+    pass
+
+
+class RecordingClient:
+    def __init__(self, failures=None):
+        self.calls = []
+        self.failures = failures or {}  # {texte: [exceptions à lever dans l'ordre]}
+
+    async def send_message(self, chat, text, **kwargs):
+        self.calls.append((chat, text))
+        errors = self.failures.get(text)
+        if errors:
+            raise errors.pop(0)
+        return text
+
+    async def edit_message(self, chat, message_id, text, **kwargs):
+        self.calls.append((chat, text))
+        return text
+
+
+def run_queue(client, scenario, **options):
+    async def main():
+        queue = OutboundQueue(client, **options)
+        queue.start()
+        try:
+            return await scenario(queue)
+        finally:
+            await queue.stop(timeout=1.0)
+    return asyncio.run(main())
+
+
+def test_peer_and_channel_id_share_one_bucket():
+    assert chat_key(PEER) == chat_key(CHANNEL_ID) == CHANNEL_ID
+
+    async def scenario(queue):
+        sent = await queue.send_message(CHANNEL_ID, "prédiction", peer=PEER)
+        edited = await queue.edit_message(CHANNEL_ID, 1, "statut")
+        return sent, edited, list(queue._chat_buckets)
+
+    client = RecordingClient()
+    sent, edited, buckets = run_queue(client, scenario)
+    assert (sent, edited) == ("prédiction", "statut")
+    assert buckets == [CHANNEL_ID]
+    assert client.calls[0] == (PEER, "prédiction")
+
+
+def test_unhashable_chat_without_peer_id_is_still_sent():
+    class Opaque:
+        __hash__ = None
+
+    target = Opaque()
+
+    async def scenario(queue):
+        return await asyncio.wait_for(queue.send_message(target, "texte"), 2)
+
+    assert run_queue(RecordingClient(), scenario) == "texte"
+
+
+def test_permanent_error_fails_fast_without_blocking_the_chat():
+    client = RecordingClient({'refusé': [PermanentError('non modifié')]})
+
+    async def scenario(queue):
+        failed = queue.send_message(CHANNEL_ID, "refusé")
+        ok = queue.send_message(CHANNEL_ID, "suivant")
+        with pytest.raises(PermanentError):
+            await asyncio.wait_for(failed, 1)
+        return await asyncio.wait_for(ok, 1), queue.stats
+
+    result, stats = run_queue(client, scenario)
+    assert result == "suivant"
+    assert stats['retries'] == 0 and stats['failed'] == 1
+
+
+def test_transient_error_is_retried(monkeypatch):
+    client = RecordingClient({'réseau': [ConnectionError('reset')]})
+    monkeypatch.setattr(outbound.TokenBucket, 'block', lambda self, now, seconds: None)
+
+    async def scenario(queue):
+        return await asyncio.wait_for(queue.send_message(CHANNEL_ID, "réseau"), 2), queue.stats
+
+    result, stats = run_queue(client, scenario)
+    assert result == "réseau"
+    assert stats['retries'] == 1
+
+
+def test_dispatcher_survives_a_failing_job(monkeypatch):
+    original = OutboundQueue._chat_bucket
+    broken = {'count': 0}
+
+    def flaky_bucket(self, key):
+        bucket = original(self, key)
+        if key == 'cassé':
+            broken['count'] += 1
+            if broken['count'] > 1:  # delay() passe, take() échoue
+                raise RuntimeError("seau indisponible")
+        return bucket
+
+    monkeypatch.setattr(OutboundQueue, '_chat_bucket', flaky_bucket)
+
+    async def scenario(queue):
+        failed = queue.send_message('cassé', "x")
+        with pytest.raises(RuntimeError):
+            await asyncio.wait_for(failed, 1)
+        ok = await asyncio.wait_for(queue.send_message(CHANNEL_ID, "après"), 1)
+        return ok, queue.is_running
+
+    assert run_queue(RecordingClient(), scenario) == ("après", True)
@@ -0,0 +1,95 @@
+"""
+Journal des prédictions: rejeu idempotent après un arrêt entre snapshot et remise à zéro du journal,
+indépendant de l'horloge murale
+"""
+import os
+import shutil
+import sys
+from datetime import datetime
+
+import yaml
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+import prediction_journal  # noqa: E402
+from prediction_journal import PredictionJournal  # noqa: E402
+
+
+def write_snapshot_without_truncate(journal, snapshot):
+    """Arrêt simulé: snapshot remplacé, journal pas encore vidé"""
+    with open(journal.snapshot_path, 'w', encoding='utf-8') as f:
+        yaml.dump(snapshot, f, allow_unicode=True, default_flow_style=False)
+
+
+def test_crash_between_snapshot_and_truncate_skips_compacted_entries(tmp_path):
+    journal = PredictionJournal(str(tmp_path / "predictions.yaml"))
+    for game_number in (1, 2, 3):
+        journal.append('created', game_number=game_number)
+    write_snapshot_without_truncate(journal, {'predictions': {1: '⌛', 2: '⌛', 3: '⌛'}, 'journal_seq': journal.seq})
+    journal.append('status', game_number=2, status='✅0️⃣')
+
+    restarted = PredictionJournal(journal.snapshot_path)
+    snapshot = restarted.load_snapshot(default={})
+    entries = restarted.replay(after_seq=snapshot['journal_seq'])
+    assert [(entry['op'], entry['game_number']) for entry in entries] == [('status', 2)]
+
+
+def test_clock_stepping_back_does_not_hide_new_entries(tmp_path, monkeypatch):
+    class SteppedClock(datetime):
+        current = datetime(2026, 10, 18, 12, 0, 0)
+
+        @classmethod
+        def now(cls, tz=None):
+            return cls.current
+
+    monkeypatch.setattr(prediction_journal, 'datetime', SteppedClock)
+    journal = PredictionJournal(str(tmp_path / "predictions.yaml"))
+    journal.append('created', game_number=1)
+    write_snapshot_without_truncate(journal, {'predictions': {1: '⌛'}, 'journal_seq': journal.seq})
+    # Correction NTP: l'horloge recule d'une heure après le snapshot
+    SteppedClock.current = datetime(2026, 10, 18, 11, 0, 0)
+    journal.append('status', game_number=1, status='❌')
+
+    restarted = PredictionJournal(journal.snapshot_path)
+    entries = restarted.replay(after_seq=restarted.load_snapshot(default={})['journal_seq'])
+    assert [entry['op'] for entry in entries] == ['status']
+
+
+def test_sequence_resumes_after_restart_and_truncation(tmp_path):
+    path = str(tmp_path / "predictions.yaml")
+    journal = PredictionJournal(path)
+    journal.append('created', game_number=1)
+    journal.append('created', game_number=2)
+    assert PredictionJournal(path).seq == 2
+
+    journal.compact({'predictions': {1: '⌛', 2: '⌛'}, 'journal_seq': journal.seq})
+    restarted = PredictionJournal(path)
+    restarted.append('created', game_number=3)
+    assert restarted.replay(after_seq=2)[0]['seq'] == 3
+
+
+def test_entries_without_sequence_are_replayed_only_without_watermark(tmp_path):
+    journal = PredictionJournal(str(tmp_path / "predictions.yaml"))
+    with open(journal.journal_path, 'w', encoding='utf-8') as f:
+        f.write('{"op": "created", "game_number": 1}\n')
+    assert len(journal.replay()) == 1
+    assert journal.replay(after_seq=0) == []
+
+
+def test_predictor_counts_once_after_crash_window(bot, tmp_path):
+    store = bot.SimpleYAMLManager(data_dir=str(tmp_path))
+    predictor = bot.SimplePredictor(store)
+    predictor.add_prediction(10, '♥♣')
+    predictor.add_prediction(11, '♦♠')
+    predictor.set_prediction_status(10, '✅0️⃣')
+    predictor.persist('status', game_number=10, status='✅0️⃣')
+    # Compactage interrompu: le journal complet est encore présent à côté du nouveau snapshot
+    shutil.copy(store.journal.journal_path, tmp_path / "journal.bak")
+    store.save_predictions(predictor.prediction_status, predictor.counters, predictor.messages)
+    shutil.copy(tmp_path / "journal.bak", store.journal.journal_path)
+
+    restarted = bot.SimplePredictor(bot.SimpleYAMLManager(data_dir=str(tmp_path)))
+    assert restarted.prediction_status == {10: '✅0️⃣', 11: '⌛'}
+    assert restarted.get_statistics() == predictor.get_statistics()
@@ -0,0 +1,71 @@
+"""
+Planification: archives et sauvegardes passent par l'écrivain de fond, sans écriture sur la boucle
+"""
+import asyncio
+import os
+import sys
+from datetime import datetime
+
+import pytest
+import yaml
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+from persistence import PersistenceWriter  # noqa: E402
+from schedule_rule import ScheduleArchive  # noqa: E402
+
+
+class RecordingWriter:
+    """Écrivain factice: retient les clés signalées sans rien écrire"""
+
+    def __init__(self):
+        self.dirty = {}
+
+    def mark_dirty(self, key, snapshot_fn, write_fn):
+        self.dirty[key] = (snapshot_fn, write_fn)
+
+
+def test_archive_batches_in_one_window_are_all_written(tmp_path):
+    directory = str(tmp_path / "archive")
+
+    async def run():
+        writer = PersistenceWriter(coalesce_delay=0.01)
+        writer.start()
+        archive = ScheduleArchive(directory, writer=writer)
+        archive.append({"2026-10-17": {"0900": {"launched": True}}})
+        archive.append({"2026-10-17": {"0910": {"launched": False}}, "2026-10-18": {"0005": {}}})
+        await writer.flush()
+        await writer.stop()
+        return archive
+
+    archive = asyncio.run(run())
+    assert [record["numero"] for record in archive.load("2026-10-17")] == ["0900", "0910"]
+    assert [record["numero"] for record in archive.load("2026-10-18")] == ["0005"]
+
+
+def test_archive_without_writer_appends_immediately(tmp_path):
+    archive = ScheduleArchive(str(tmp_path))
+    archive.append({"2026-10-17": {"0900": {}}})
+    archive.append({"2026-10-17": {"0910": {}}})
+    with open(archive.path_for("2026-10-17"), encoding="utf-8") as f:
+        assert [record["numero"] for record in yaml.safe_load(f)] == ["0900", "0910"]
+
+
+def test_regenerate_and_roll_defer_to_writer(tmp_path, monkeypatch):
+    pytest.importorskip("telethon")
+    from scheduler import PredictionScheduler
+
+    monkeypatch.chdir(tmp_path)
+    writer = RecordingWriter()
+    scheduler = PredictionScheduler(None, None, 0, 0, writer=writer)
+    scheduler.rolling.archive.directory = str(tmp_path / "archive")
+    scheduler.schedule_data = {"0000": {"prediction_at": "2000-01-01T00:00:00", "launched": True}}
+    scheduler.regenerate_schedule(seed=1)
+    scheduler.roll_schedule(datetime.now())
+    assert not os.path.exists(scheduler.schedule_file)
+    assert not os.path.exists(tmp_path / "archive")
+    assert "schedule" in writer.dirty
+    drain, write = writer.dirty[f"schedule_archive:{tmp_path / 'archive'}"]
+    assert list(drain()) == ["2000-01-01"]
@@ -0,0 +1,41 @@
+"""
+Non-régression: une prédiction ne se déclenche que sur le résultat final (✅/🔰) d'un jeu,
+jamais sur une main partielle (⏰/🕐) du même jeu
+"""
+import asyncio
+
+import pytest
+
+pytest.importorskip("telethon")
+pytest.importorskip("aiohttp")
+
+PENDING = "#N7. 8(7♥K♣A♦) - ⏰ 6(9♦7♥) #T14"
+FINAL = "#N7. 8(7♥K♣A♦) - ✅ 6(9♦7♥) #T14"
+# Même jeu: main partielle favorable, puis un As arrive dans le deuxième groupe
+PENDING_THEN_ACE = ("#N9. 8(7♥K♣A♦) - 🕐 6(9♦7♥) #T14", "#N9. 8(7♥K♣A♦) - ✅ 7(9♦7♥A♠) #T15")
+
+
+@pytest.fixture
+def shard(bot, tmp_path):
+    return bot.ChannelShard(-100, -200, str(tmp_path))
+
+
+def test_should_predict_waits_for_final_result(shard):
+    assert shard.predictor.should_predict(PENDING) == (False, None, None)
+    assert shard.predictor.should_predict(FINAL) == (True, 8, "♥♣")
+
+
+def test_pipeline_triggers_once_on_final_message(bot, shard):
+    async def replay():
+        first = await bot.process_stat_message(shard, PENDING, replay=True)
+        second = await bot.process_stat_message(shard, FINAL, replay=True)
+        return first, second
+
+    assert asyncio.run(replay()) == (None, (8, "♥♣"))
+
+
+def test_final_result_can_cancel_partial_trigger(bot, shard):
+    async def replay():
+        return [await bot.process_stat_message(shard, text, replay=True) for text in PENDING_THEN_ACE]
+
+    assert asyncio.run(replay()) == [None, None]
@@ -0,0 +1,113 @@
+"""
+File de travail bornée entre les gestionnaires Telethon et le traitement des messages
+Le gestionnaire ne fait qu'un filtrage et une mise en file; un groupe de travailleurs traite les messages,
+ceux d'un même message (créations puis modifications, donc d'un même jeu) toujours dans l'ordre
+"""
+import asyncio
+import time
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, List, NamedTuple, Optional
+
+DEFAULT_WORKERS = 4
+DEFAULT_QUEUE_SIZE = 1000  # Messages en attente au plus, toutes files confondues
+
+
+class QueuedMessage(NamedTuple):
+    chat_id: int
+    message_id: int
+    edit_date: Optional[datetime]
+    text: str
+    received_at: float  # time.monotonic() à la réception
+
+
+class MessageWorkQueue:
+    """Une file bornée par travailleur; un message est toujours routé vers le même travailleur"""
+
+    def __init__(self, process: Callable[[QueuedMessage], Awaitable[Any]], workers: int = DEFAULT_WORKERS,
+                 maxsize: int = DEFAULT_QUEUE_SIZE):
+        self.process = process
+        self.workers = max(1, workers)
+        self.maxsize = maxsize
+        self._queues: List[asyncio.Queue] = []
+        self._tasks: List[asyncio.Task] = []
+        self.stats: Dict[str, Any] = {
+            'enqueued': 0, 'processed': 0, 'dropped': 0, 'errors': 0,
+            'max_depth': 0, 'total_wait': 0.0, 'max_wait': 0.0
+        }
+
+    @property
+    def is_running(self) -> bool:
+        return bool(self._tasks)
+
+    @property
+    def depth(self) -> int:
+        return sum(queue.qsize() for queue in self._queues)
+
+    def start(self):
+        """Démarre les travailleurs (à appeler depuis la boucle asyncio)"""
+        if self.is_running:
+            return
+        per_worker = max(1, self.maxsize // self.workers)
+        self._queues = [asyncio.Queue(maxsize=per_worker) for _ in range(self.workers)]
+        self._tasks = [asyncio.create_task(self._worker(queue)) for queue in self._queues]
+        print(f"✅ File de travail démarrée: {self.workers} travailleurs, {per_worker * self.workers} places")
+
+    def submit(self, item: QueuedMessage) -> bool:
+        """Met un message en file sans jamais attendre; False (et compté) si la file est pleine"""
+        if not self.is_running:
+            return False
+        queue = self._queues[hash((item.chat_id, item.message_id)) % self.workers]
+        try:
+            queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self.stats['dropped'] += 1
+            print(f"⚠️ File de travail pleine, message {item.message_id} abandonné")
+            return False
+        self.stats['enqueued'] += 1
+        depth = self.depth
+        if depth > self.stats['max_depth']:
+            self.stats['max_depth'] = depth
+        return True
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            item = await queue.get()
+            wait = time.monotonic() - item.received_at
+            self.stats['total_wait'] += wait
+            if wait > self.stats['max_wait']:
+                self.stats['max_wait'] = wait
+            try:
+                await self.process(item)
+                self.stats['processed'] += 1
+            except Exception as e:
+                self.stats['errors'] += 1
+                print(f"❌ Erreur traitement message {item.message_id}: {e}")
+            finally:
+                queue.task_done()
+
+    async def stop(self, timeout: float = 10.0):
+        """Traite les messages restants (dans la limite de timeout) puis arrête les travailleurs"""
+        if not self.is_running:
+            return
+        try:
+            await asyncio.wait_for(asyncio.gather(*(queue.join() for queue in self._queues)), timeout)
+        except asyncio.TimeoutError:
+            print(f"⚠️ Arrêt de la file de travail: {self.depth} messages non traités")
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def get_stats(self) -> Dict[str, Any]:
+        processed = self.stats['processed'] + self.stats['errors']
+        return {
+            'depth': self.depth,
+            'workers': self.workers,
+            'enqueued': self.stats['enqueued'],
+            'processed': self.stats['processed'],
+            'dropped': self.stats['dropped'],
+            'errors': self.stats['errors'],
+            'max_depth': self.stats['max_depth'],
+            'avg_wait_ms': round(1000 * self.stats['total_wait'] / processed, 3) if processed else 0.0,
+            'max_wait_ms': round(1000 * self.stats['max_wait'], 3)
+        }
@@ -2,14 +2,18 @@
 Gestionnaire de données YAML pour le bot Telegram de prédiction
 Remplace complètement la base de données PostgreSQL par des fichiers YAML
 """
+import copy
 import os
 import yaml
 import json
 import hashlib
 from datetime import datetime, date, time, timedelta
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Tuple
 from pathlib import Path
 
+from message_dedupe import MessageDedupeStore
+from prediction_journal import PredictionJournal
+
 
 class YAMLDataManager:
     """Gestionnaire de données basé sur YAML"""
@@ -23,10 +27,24 @@ class YAMLDataManager:
         self.config_file = self.data_dir / "bot_config.yaml"
         self.predictions_file = self.data_dir / "predictions.yaml"
         self.auto_predictions_file = self.data_dir / "auto_predictions.yaml"
-        self.message_log_file = self.data_dir / "message_log.yaml"
+        self.message_log_file = self.data_dir / "message_log.yaml"  # Ancien format, migré au démarrage
+        self.message_hashes_file = self.data_dir / "message_hashes.log"
+        
+        # Documents déjà analysés: {fichier: ((mtime_ns, taille), données)}
+        self._cache: Dict[Path, Tuple[Tuple[int, int], Any]] = {}
         
         # Initialiser les fichiers s'ils n'existent pas
         self._init_files()
+        
+        # Prédictions: snapshot YAML + journal des transitions, gardées en mémoire après chargement
+        self.predictions_journal = PredictionJournal(str(self.predictions_file))
+        self._predictions = None  # {game_number: prédiction}
+        
+        # Dédoublonnage des messages: hachages en mémoire + fichier compact en ajout seul
+        migrate = not self.message_hashes_file.exists()
+        self.message_dedupe = MessageDedupeStore(self.message_hashes_file)
+        if migrate and self.message_log_file.exists():
+            self._migrate_message_log()
         print("✅ Gestionnaire YAML initialisé")
     
     def _init_files(self):
@@ -34,31 +52,52 @@ class YAMLDataManager:
         default_structures = {
             self.config_file: {},
             self.predictions_file: [],
-            self.auto_predictions_file: {},
-            self.message_log_file: []
+            self.auto_predictions_file: {}
         }
         
         for file_path, default_content in default_structures.items():
             if not file_path.exists():
                 self._save_yaml(file_path, default_content)
     
+    @staticmethod
+    def _file_signature(file_path: Path) -> Optional[Tuple[int, int]]:
+        """(mtime_ns, taille) du fichier, None s'il n'existe pas"""
+        try:
+            stat = file_path.stat()
+            return stat.st_mtime_ns, stat.st_size
+        except FileNotFoundError:
+            return None
+    
     def _load_yaml(self, file_path: Path) -> Any:
-        """Charge un fichier YAML"""
+        """Charge un fichier YAML (depuis le cache tant que mtime et taille sont inchangés)
+        
+        Retourne une copie: l'appelant peut la modifier sans désynchroniser le cache du fichier
+        (une copie profonde reste bien moins coûteuse qu'une nouvelle analyse YAML).
+        """
         try:
-            if file_path.exists():
-                with open(file_path, 'r', encoding='utf-8') as f:
-                    return yaml.safe_load(f) or {}
-            return {}
+            signature = self._file_signature(file_path)
+            if signature is None:
+                self._cache.pop(file_path, None)
+                return {}
+            cached = self._cache.get(file_path)
+            if cached is not None and cached[0] == signature:
+                return copy.deepcopy(cached[1])
+            with open(file_path, 'r', encoding='utf-8') as f:
+                data = yaml.safe_load(f) or {}
+            self._cache[file_path] = (signature, data)
+            return copy.deepcopy(data)
         except Exception as e:
             print(f"❌ Erreur chargement {file_path}: {e}")
             return {}
     
     def _save_yaml(self, file_path: Path, data: Any):
-        """Sauvegarde des données dans un fichier YAML"""
+        """Sauvegarde des données dans un fichier YAML (écriture directe, cache mis à jour)"""
         try:
             with open(file_path, 'w', encoding='utf-8') as f:
                 yaml.dump(data, f, allow_unicode=True, default_flow_style=False, indent=2)
+            self._cache[file_path] = (self._file_signature(file_path), copy.deepcopy(data))
         except Exception as e:
+            self._cache.pop(file_path, None)
             print(f"❌ Erreur sauvegarde {file_path}: {e}")
     
     def set_config(self, key: str, value: Any):
@@ -84,18 +123,46 @@ class YAMLDataManager:
             print(f"❌ Erreur get_config: {e}")
             return default
     
+    def _get_predictions(self) -> Dict[int, Dict]:
+        """Prédictions en mémoire (snapshot + rejeu du journal au premier accès)"""
+        if self._predictions is None:
+            snapshot = self.predictions_journal.load_snapshot(default=[])
+            if not isinstance(snapshot, list):
+                snapshot = []
+            self._predictions = {p.get('game_number'): p for p in snapshot}
+            for entry in self.predictions_journal.replay():
+                self._apply_prediction_entry(entry)
+        return self._predictions
+    
+    def _apply_prediction_entry(self, entry: Dict[str, Any]):
+        """Applique une transition journalisée"""
+        game_number = entry.get('game_number')
+        if entry.get('op') == 'created':
+            if game_number not in self._predictions:
+                self._predictions[game_number] = entry['prediction']
+        elif entry.get('op') == 'status':
+            prediction = self._predictions.get(game_number)
+            if prediction is not None:
+                prediction['status'] = entry['status']
+                prediction['verified_at'] = entry['at']
+    
+    def _journal_prediction(self, op: str, **fields):
+        """Ajoute la transition au journal et l'applique en mémoire, avec compactage périodique"""
+        at = datetime.now().isoformat()
+        self._apply_prediction_entry({'op': op, 'at': at, **fields})
+        self.predictions_journal.append(op, at=at, **fields)
+        if self.predictions_journal.should_compact:
+            self.predictions_journal.compact(list(self._predictions.values()))
+    
     def save_prediction(self, game_number: int, suit_combination: str, 
                        message_id: Optional[int] = None, chat_id: Optional[int] = None, 
                        prediction_type: str = 'manual'):
         """Sauvegarde une prédiction manuelle"""
         try:
-            predictions = self._load_yaml(self.predictions_file)
-            if not isinstance(predictions, list):
-                predictions = []
+            predictions = self._get_predictions()
             
             # Vérifier si la prédiction existe déjà
-            existing = any(p.get('game_number') == game_number for p in predictions)
-            if existing:
+            if game_number in predictions:
                 return
             
             prediction = {
@@ -110,36 +177,24 @@ class YAMLDataManager:
                 'prediction_type': prediction_type
             }
             
-            predictions.append(prediction)
-            self._save_yaml(self.predictions_file, predictions)
+            self._journal_prediction('created', game_number=game_number, prediction=prediction)
         except Exception as e:
             print(f"❌ Erreur save_prediction: {e}")
     
     def update_prediction_status(self, game_number: int, status: str):
         """Met à jour le statut d'une prédiction"""
         try:
-            predictions = self._load_yaml(self.predictions_file)
-            if not isinstance(predictions, list):
+            if game_number not in self._get_predictions():
                 return
             
-            for prediction in predictions:
-                if prediction.get('game_number') == game_number:
-                    prediction['status'] = status
-                    prediction['verified_at'] = datetime.now().isoformat()
-                    break
-            
-            self._save_yaml(self.predictions_file, predictions)
+            self._journal_prediction('status', game_number=game_number, status=status)
         except Exception as e:
             print(f"❌ Erreur update_prediction_status: {e}")
     
     def get_pending_predictions(self) -> List[Dict]:
         """Récupère les prédictions en attente"""
         try:
-            predictions = self._load_yaml(self.predictions_file)
-            if not isinstance(predictions, list):
-                return []
-            
-            return [p for p in predictions if p.get('status') == '⌛']
+            return [p for p in self._get_predictions().values() if p.get('status') == '⌛']
         except Exception as e:
             print(f"❌ Erreur get_pending_predictions: {e}")
             return []
@@ -193,16 +248,21 @@ class YAMLDataManager:
         except Exception as e:
             print(f"❌ Erreur update_auto_prediction: {e}")
     
+    @staticmethod
+    def _message_hash(message_content: str, channel_id: int) -> str:
+        return hashlib.sha256(f"{channel_id}:{message_content}".encode()).hexdigest()
+    
+    def _migrate_message_log(self):
+        """Importe les hachages de l'ancien message_log.yaml (contenu complet des messages)"""
+        message_log = self._load_yaml(self.message_log_file)
+        if isinstance(message_log, list):
+            self.message_dedupe.import_hashes(msg.get('message_hash') for msg in message_log)
+            print(f"✅ Migration message_log.yaml: {len(message_log)} hachages importés")
+    
     def is_message_processed(self, message_content: str, channel_id: int) -> bool:
-        """Vérifie si un message a déjà été traité"""
+        """Vérifie si un message a déjà été traité (O(1), sans accès disque)"""
         try:
-            message_hash = hashlib.sha256(f"{channel_id}:{message_content}".encode()).hexdigest()
-            message_log = self._load_yaml(self.message_log_file)
-            
-            if not isinstance(message_log, list):
-                return False
-            
-            return any(msg.get('message_hash') == message_hash for msg in message_log)
+            return self.message_dedupe.contains(self._message_hash(message_content, channel_id))
         except Exception as e:
             print(f"❌ Erreur is_message_processed: {e}")
             return False
@@ -210,31 +270,7 @@ class YAMLDataManager:
     def mark_message_processed(self, message_content: str, channel_id: int):
         """Marque un message comme traité"""
         try:
-            message_hash = hashlib.sha256(f"{channel_id}:{message_content}".encode()).hexdigest()
-            message_log = self._load_yaml(self.message_log_file)
-            
-            if not isinstance(message_log, list):
-                message_log = []
-            
-            # Vérifier si déjà traité
-            if any(msg.get('message_hash') == message_hash for msg in message_log):
-                return
-            
-            message_entry = {
-                'id': len(message_log) + 1,
-                'message_hash': message_hash,
-                'channel_id': channel_id,
-                'content': message_content,
-                'processed_at': datetime.now().isoformat()
-            }
-            
-            message_log.append(message_entry)
-            
-            # Garder seulement les 1000 derniers messages pour éviter que le fichier devienne trop gros
-            if len(message_log) > 1000:
-                message_log = message_log[-1000:]
-            
-            self._save_yaml(self.message_log_file, message_log)
+            self.message_dedupe.add(self._message_hash(message_content, channel_id))
         except Exception as e:
             print(f"❌ Erreur mark_message_processed: {e}")
     
@@ -242,9 +278,7 @@ class YAMLDataManager:
         """Retourne les statistiques du bot"""
         try:
             # Statistiques des prédictions manuelles
-            predictions = self._load_yaml(self.predictions_file)
-            if not isinstance(predictions, list):
-                predictions = []
+            predictions = list(self._get_predictions().values())
             
             manual_stats = {
                 'total': len(predictions),
@@ -297,11 +331,16 @@ class YAMLDataManager:
 # Instance globale
 yaml_manager = None
 
-def init_yaml_manager():
-    """Initialise le gestionnaire YAML"""
+def init_yaml_manager(backend: Optional[str] = None):
+    """Initialise le gestionnaire de données (backend 'yaml' par défaut, ou 'sqlite' via STORAGE_BACKEND)"""
     global yaml_manager
     try:
-        yaml_manager = YAMLDataManager()
+        backend = backend or os.getenv('STORAGE_BACKEND', 'yaml')
+        if backend == 'sqlite':
+            from sqlite_manager import SQLiteDataManager
+            yaml_manager = SQLiteDataManager()
+        else:
+            yaml_manager = YAMLDataManager()
         return yaml_manager
     except Exception as e:
         print(f"❌ Erreur initialisation gestionnaire YAML: {e}")